@@ -0,0 +1,203 @@
+import argparse
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os.path import splitext
+
+import numpy as np
+
+from json_parser.binary import BinaryLogReader, BinaryMeta
+from json_parser.json_parser import JsonParser
+from json_parser.loader import log_files
+
+
+class AnalyticsMeta(object):
+    CONFIDENCE_BINS = 20
+    # rows, columns of the dwell heatmap
+    GRID = (18, 32)
+
+
+class Aggregate(object):
+    """
+    Aggregations over saved logs (e.g. the directory of windows left by `schedule_output`), computed per file with
+    numpy and merged map-reduce style, see `aggregate_logs`.
+
+    Partial result of one or more log files. Categories are keyed by name, so aggregates of files with different
+    category tables merge.
+
+    category_counts:        detections per category (the first label of every bbox).
+    confidence_histograms:  per category, counts of the first label confidence in `confidence_bins` bins over 0..1.
+    heatmap:                dwell time in seconds (frames when the frame rate is unknown) of the bbox centers per
+                            cell of a `grid` over the frame; top/width are the x axis, as the detector logs them.
+    """
+
+    def __init__(self, confidence_bins: int = AnalyticsMeta.CONFIDENCE_BINS, grid: tuple = AnalyticsMeta.GRID):
+        self.files = 0
+        self.frames = 0
+        self.detections = 0
+        self.first_frame = None
+        self.last_frame = None
+        self.category_counts = {}
+        self.confidence_bins = confidence_bins
+        self.confidence_histograms = {}
+        self.grid = tuple(grid)
+        self.heatmap = np.zeros(self.grid)
+
+    @classmethod
+    def from_columns(cls, frame_ids, boxes, codes, confidences, categories, video_details: dict,
+                     confidence_bins: int = AnalyticsMeta.CONFIDENCE_BINS, grid: tuple = AnalyticsMeta.GRID):
+        """
+        Aggregates the columns of one log: frame_ids (n,), boxes (n, 4) top, left, width, height and the (n, k)
+        label codes and confidences.
+        """
+        aggregate = cls(confidence_bins, grid)
+        aggregate.files = 1
+        frame_ids = np.asarray(frame_ids)
+        unique_frames = np.unique(frame_ids)
+        aggregate.frames = len(unique_frames)
+        aggregate.detections = len(frame_ids)
+        if len(unique_frames):
+            aggregate.first_frame, aggregate.last_frame = int(unique_frames[0]), int(unique_frames[-1])
+        if not len(frame_ids):
+            return aggregate
+
+        codes = np.asarray(codes).reshape(len(frame_ids), -1)
+        confidences = np.asarray(confidences, dtype=np.float64).reshape(codes.shape)
+        if codes.shape[1]:
+            labelled = codes[:, 0] >= 0
+            first_codes, first_confidences = codes[labelled, 0], confidences[labelled, 0]
+            counts = np.bincount(first_codes, minlength=len(categories))
+            bins = np.clip((first_confidences * confidence_bins).astype(np.int64), 0, confidence_bins - 1)
+            histograms = np.zeros((len(categories), confidence_bins), dtype=np.int64)
+            np.add.at(histograms, (first_codes, bins), 1)
+            for code in np.flatnonzero(counts).tolist():
+                aggregate.category_counts[categories[code]] = int(counts[code])
+                aggregate.confidence_histograms[categories[code]] = histograms[code]
+
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        width = video_details.get('frame_width') or max(float((boxes[:, 0] + boxes[:, 2]).max()), 1.0)
+        height = video_details.get('frame_height') or max(float((boxes[:, 1] + boxes[:, 3]).max()), 1.0)
+        rows = np.clip(((boxes[:, 1] + boxes[:, 3] / 2) / height * grid[0]).astype(np.int64), 0, grid[0] - 1)
+        columns = np.clip(((boxes[:, 0] + boxes[:, 2] / 2) / width * grid[1]).astype(np.int64), 0, grid[1] - 1)
+        frame_rate = video_details.get('frame_rate')
+        np.add.at(aggregate.heatmap, (rows, columns), 1.0 / frame_rate if frame_rate else 1.0)
+        return aggregate
+
+    def merge(self, other):
+        # adds `other` to this aggregate and returns it (the reduce step)
+        if other.grid != self.grid or other.confidence_bins != self.confidence_bins:
+            raise ValueError("aggregates with different grids or confidence bins can not be merged")
+        self.files += other.files
+        self.frames += other.frames
+        self.detections += other.detections
+        if other.first_frame is not None:
+            self.first_frame = other.first_frame if self.first_frame is None else \
+                min(self.first_frame, other.first_frame)
+            self.last_frame = other.last_frame if self.last_frame is None else max(self.last_frame, other.last_frame)
+        for category, count in other.category_counts.items():
+            self.category_counts[category] = self.category_counts.get(category, 0) + count
+        for category, histogram in other.confidence_histograms.items():
+            if category in self.confidence_histograms:
+                self.confidence_histograms[category] = self.confidence_histograms[category] + histogram
+            else:
+                self.confidence_histograms[category] = histogram.copy()
+        self.heatmap += other.heatmap
+        return self
+
+    def to_dict(self):
+        return {'files': self.files,
+                'frames': self.frames,
+                'detections': self.detections,
+                'first_frame': self.first_frame,
+                'last_frame': self.last_frame,
+                'category_counts': dict(sorted(self.category_counts.items(), key=lambda item: -item[1])),
+                'confidence_bins': np.linspace(0, 1, self.confidence_bins + 1).tolist(),
+                'confidence_histograms': {category: histogram.tolist()
+                                          for category, histogram in sorted(self.confidence_histograms.items())},
+                'heatmap': self.heatmap.tolist()}
+
+
+def aggregate_file(path: str, confidence_bins: int = AnalyticsMeta.CONFIDENCE_BINS,
+                   grid: tuple = AnalyticsMeta.GRID):
+    """
+    The map step: aggregates one log file. Binary logs are read through mmap, the other formats are loaded into a
+    DetectionStore first.
+    """
+    if splitext(path)[1] == BinaryMeta.EXTENSION:
+        with BinaryLogReader(path) as reader:
+            boxes = reader.boxes
+            aggregate = Aggregate.from_columns(boxes['frame_id'],
+                                               np.stack([boxes[name] for name in ('top', 'left', 'width', 'height')],
+                                                        axis=1),
+                                               reader.codes, reader.confidences, reader.categories,
+                                               reader.video_details, confidence_bins, grid)
+            frame_ids = reader.frame_ids
+            aggregate.frames = len(frame_ids)
+            if len(frame_ids):
+                aggregate.first_frame, aggregate.last_frame = int(frame_ids.min()), int(frame_ids.max())
+            return aggregate
+    json_parser = JsonParser.load(path)
+    store = json_parser.store
+    n = len(store)
+    stride = store.label_stride
+    boxes = np.stack([np.frombuffer(getattr(store, name), dtype=np.float64)
+                      for name in ('top', 'left', 'width', 'height')], axis=1) if n else np.zeros((0, 4))
+    aggregate = Aggregate.from_columns(np.frombuffer(store.frame_ids, dtype=np.int64), boxes,
+                                       np.frombuffer(store.label_codes, dtype=np.int32).reshape(n, stride),
+                                       np.frombuffer(store.label_confidences, dtype=np.float64).reshape(n, stride),
+                                       store.categories, json_parser.video_details, confidence_bins, grid)
+    # frames without any bbox are not in the columns
+    aggregate.frames = len(store.frames)
+    if store.frames:
+        aggregate.first_frame, aggregate.last_frame = min(store.frames), max(store.frames)
+    return aggregate
+
+
+def aggregate_logs(path, workers: int = None, progress=None, confidence_bins: int = AnalyticsMeta.CONFIDENCE_BINS,
+                   grid: tuple = AnalyticsMeta.GRID):
+    """
+    Aggregates every log file in `path` (see `loader.log_files`). Files are mapped on a pool of `workers`
+    processes (all cores if None, in this process if 1) and the partial results are merged as they come in;
+    `progress(done, total, file)` is called after every file.
+    """
+    files = log_files(path)
+    total = Aggregate(confidence_bins, grid)
+    if workers == 1:
+        for done, file in enumerate(files, start=1):
+            total.merge(aggregate_file(file, confidence_bins, grid))
+            if progress is not None:
+                progress(done, len(files), file)
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(aggregate_file, file, confidence_bins, grid): file for file in files}
+        for done, future in enumerate(as_completed(futures), start=1):
+            total.merge(future.result())
+            if progress is not None:
+                progress(done, len(files), futures[future])
+    return total
+
+
+def main(argv=None):
+    # python -m json_parser.analytics jsons --workers 8 --output summary.json
+    ap = argparse.ArgumentParser(description='aggregates saved logs (e.g. the windows of schedule_output)')
+    ap.add_argument('path', nargs='+', help='log files or directories of them')
+    ap.add_argument('-w', '--workers', type=int, default=None, help='processes, all cores by default')
+    ap.add_argument('--confidence-bins', type=int, default=AnalyticsMeta.CONFIDENCE_BINS)
+    ap.add_argument('--grid', type=int, nargs=2, default=list(AnalyticsMeta.GRID), metavar=('ROWS', 'COLUMNS'))
+    ap.add_argument('-o', '--output', default=None, help='JSON file for the result, stdout by default')
+    args = ap.parse_args(argv)
+
+    def progress(done, total, file):
+        print("[INFO] {}/{} {}".format(done, total, file), file=sys.stderr, flush=True)
+
+    aggregate = aggregate_logs(args.path, workers=args.workers, progress=progress,
+                               confidence_bins=args.confidence_bins, grid=tuple(args.grid))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(aggregate.to_dict(), file)
+    else:
+        json.dump(aggregate.to_dict(), sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures how `analytics.aggregate_logs` scales with the number of processes on a directory of synthetic windows.
+
+    python -m json_parser.benchmarks.bench_analytics --windows 48 --frames 1800 --workers 1 2 4 8
+"""
+import argparse
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from json_parser.analytics import aggregate_logs
+from json_parser.benchmarks.synthetic import synthetic_log
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--windows', type=int, default=48)
+    ap.add_argument('--frames', type=int, default=1800, help='frames per window')
+    ap.add_argument('--boxes', type=int, default=20)
+    ap.add_argument('--top-k', type=int, default=3)
+    ap.add_argument('--format', choices=['json', 'jpdb'], default='json')
+    ap.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count()}))
+    args = ap.parse_args()
+
+    out_path = mkdtemp()
+    try:
+        json_parser = synthetic_log(args.frames, args.boxes, args.top_k)
+        for i in range(args.windows):
+            output_name = os.path.join(out_path, 'window_{:04d}.{}'.format(i, args.format))
+            if args.format == 'jpdb':
+                json_parser.binary_output(output_name)
+            else:
+                json_parser.json_output(output_name)
+        print("{} windows of {} frames, {} boxes per frame".format(args.windows, args.frames, args.boxes))
+
+        single = None
+        for workers in args.workers:
+            start = perf_counter()
+            aggregate_logs(out_path, workers=workers)
+            elapsed = perf_counter() - start
+            single = single or elapsed
+            print("{:3d} workers {:8.2f} s  {:5.2f}x".format(workers, elapsed, single / elapsed))
+    finally:
+        rmtree(out_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
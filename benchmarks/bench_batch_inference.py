@@ -0,0 +1,60 @@
+"""
+Measures YOLO inference throughput against the batch size on the bundled example video.
+Needs OpenCV and the YOLO weights in object_detection/yolo-coco.
+
+    python -m json_parser.benchmarks.bench_batch_inference --batch-sizes 1 2 4 8 --frames 64
+"""
+import argparse
+import os
+from time import perf_counter
+
+import cv2
+
+from json_parser.object_detection.model import ModelFactory
+from json_parser.object_detection.yolo_decode import split_batch_outputs
+
+OBJECT_DETECTION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'object_detection')
+
+
+def read_frames(path, num_frames, step):
+    vs = cv2.VideoCapture(path)
+    frames = []
+    frame_counter = 0
+    while len(frames) < num_frames:
+        ret, frame = vs.read()
+        if not ret:
+            break
+        frame_counter += 1
+        if frame_counter % step == 0:
+            frames.append(frame)
+    vs.release()
+    return frames
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--input', default=os.path.join(OBJECT_DETECTION, 'example_videos', 'input.mp4'))
+    ap.add_argument('--yolo', default=os.path.join(OBJECT_DETECTION, 'yolo-coco'))
+    ap.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    ap.add_argument('--frames', type=int, default=64)
+    ap.add_argument('--step', type=int, default=4)
+    args = ap.parse_args()
+
+    # the same net and output layers as the detector, whichever shape getUnconnectedOutLayers returns
+    net, ln = ModelFactory(args.yolo).create()
+    frames = read_frames(args.input, args.frames, args.step)
+    print("{} frames of {}".format(len(frames), args.input))
+
+    for batch_size in args.batch_sizes:
+        start = perf_counter()
+        for i in range(0, len(frames), batch_size):
+            batch = frames[i:i + batch_size]
+            blob = cv2.dnn.blobFromImages(batch, 1 / 255.0, (416, 416), swapRB=True, crop=False)
+            net.setInput(blob)
+            split_batch_outputs(net.forward(ln), len(batch))
+        elapsed = perf_counter() - start
+        print("batch size {:3d}: {:7.2f} frames/s".format(batch_size, len(frames) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Measures the cost of inserting one bbox (and its label) while the number of bboxes in the frame grows.
+With the bbox index the cost per insert stays flat from 10 to 10,000 bboxes per frame.
+
+    python -m json_parser.benchmarks.bench_bbox_index
+"""
+import argparse
+from time import perf_counter
+
+from json_parser.json_parser import Frame, JsonParser
+
+
+def insert_json_parser(num_boxes):
+    json_parser = JsonParser(top_k_labels=1)
+    json_parser.add_frame(0)
+    start = perf_counter()
+    for bbox_id in range(num_boxes):
+        json_parser.add_bbox_to_frame(0, bbox_id, 1, 2, 3, 4)
+        json_parser.add_label_to_bbox(0, bbox_id, 'car', 0.5)
+    return perf_counter() - start
+
+
+def insert_frame(num_boxes):
+    frame = Frame(0)
+    start = perf_counter()
+    for bbox_id in range(num_boxes):
+        frame.add_bbox(bbox_id, 1, 2, 3, 4)
+        frame.find_bbox(bbox_id).add_label('car', 0.5)
+    return perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+
+    print("{:>8} {:>22} {:>22}".format('boxes', 'JsonParser us/insert', 'Frame us/insert'))
+    for size in args.sizes:
+        parser_time = min(insert_json_parser(size) for _ in range(args.repeat))
+        frame_time = min(insert_frame(size) for _ in range(args.repeat))
+        print("{:>8} {:>22.3f} {:>22.3f}".format(size, parser_time / size * 1e6, frame_time / size * 1e6))
+
+
+if __name__ == '__main__':
+    main()
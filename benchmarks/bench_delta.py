@@ -0,0 +1,56 @@
+"""
+Compares the size and write time of the delta encoding against plain json on the log of a fixed camera (see
+`synthetic.synthetic_static_scene`), lossless and with confidences rounded to 2 decimals.
+
+    python -m json_parser.benchmarks.bench_delta --frames 9000 --objects 20
+"""
+import argparse
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from json_parser.benchmarks.synthetic import synthetic_static_scene
+from json_parser.delta import decode_delta
+from json_parser.serializers import DeltaSerializer, JsonSerializer
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--frames', type=int, default=9000)
+    ap.add_argument('--objects', type=int, default=20)
+    ap.add_argument('--top-k', type=int, default=1)
+    ap.add_argument('--move-probability', type=float, default=0.1)
+    ap.add_argument('--keyframe-interval', type=int, default=30)
+    args = ap.parse_args()
+
+    json_parser = synthetic_static_scene(args.frames, args.objects, args.top_k,
+                                         move_probability=args.move_probability)
+    out_path = mkdtemp()
+    try:
+        print("{} frames, {} boxes".format(args.frames, len(json_parser.store)))
+        serializers = [('json', JsonSerializer()),
+                       ('delta', DeltaSerializer(args.keyframe_interval)),
+                       ('delta conf=2', DeltaSerializer(args.keyframe_interval, confidence_decimals=2))]
+        json_size = None
+        for name, serializer in serializers:
+            json_parser.set_serializer(serializer)
+            output_name = os.path.join(out_path, name.replace(' ', '_').replace('=', '') + serializer.extension)
+            start = perf_counter()
+            json_parser.json_output(output_name)
+            elapsed = perf_counter() - start
+            size = os.path.getsize(output_name)
+            json_size = json_size or size
+            decode = ''
+            if name != 'json':
+                start = perf_counter()
+                decode_delta(output_name)
+                decode = "  decode: {:6.2f} s".format(perf_counter() - start)
+            print("{:<14} write: {:6.2f} s {:10.2f} MB {:6.1f}x smaller{}".format(
+                name, elapsed, size / 2 ** 20, json_size / size, decode))
+    finally:
+        rmtree(out_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
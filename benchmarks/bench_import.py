@@ -0,0 +1,74 @@
+"""
+Measures how long a fresh interpreter takes to import modules of the package (the start up cost of a short lived
+worker process) and which heavy dependencies each one pulls in. `-X importtime` lists the slowest imports.
+
+    python -m json_parser.benchmarks.bench_import --repeat 5 --top 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+MODULES = ('json_parser', 'json_parser.json_parser', 'json_parser.streams', 'json_parser.loader',
+           'json_parser.analytics')
+# optional or heavy dependencies that should only be imported when they are used
+HEAVY = ('numpy', 'bunch', 'msgpack', 'cv2', 'tqdm')
+
+_SCRIPT = """
+import json, sys
+from time import perf_counter
+start = perf_counter()
+import {module}
+print(json.dumps([perf_counter() - start, [name for name in {heavy} if name in sys.modules]]))
+"""
+
+
+def _environment():
+    # the child finds the package where this interpreter does
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+
+
+def import_time(module: str):
+    # (seconds, heavy modules loaded) of importing `module` in a new interpreter
+    script = _SCRIPT.format(module=module, heavy=repr(HEAVY))
+    output = subprocess.run([sys.executable, '-c', script], check=True, stdout=subprocess.PIPE,
+                            env=_environment()).stdout
+    seconds, loaded = json.loads(output.decode().strip().splitlines()[-1])
+    return seconds, loaded
+
+
+def slowest_imports(module: str, top: int = 10):
+    # (cumulative microseconds, name) of the slowest imports under `module`, from -X importtime
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], check=True,
+                            stderr=subprocess.PIPE, env=_environment()).stderr
+    imports = []
+    for line in stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--modules', nargs='+', default=list(MODULES))
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--top', type=int, default=0, help='print the N slowest imports of every module')
+    args = ap.parse_args()
+
+    for module in args.modules:
+        times = []
+        for _ in range(args.repeat):
+            seconds, loaded = import_time(module)
+            times.append(seconds)
+        print("{:<26} best: {:7.1f} ms  median: {:7.1f} ms  loads: {}".format(
+            module, min(times) * 1000, median(times) * 1000, ', '.join(loaded) or '-'))
+        for cumulative, name in slowest_imports(module, args.top) if args.top else ():
+            print("    {:9.1f} ms  {}".format(cumulative / 1000, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Compares the serializer backends on a synthetic log (by default one hour at 30 fps with 50 boxes per frame).
+`dict tree` is the old path: json.dump of the dicts returned by output().
+
+    python -m json_parser.benchmarks.bench_serializers --hours 1
+"""
+import argparse
+import json
+import os
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+from json_parser.benchmarks.synthetic import synthetic_log
+from json_parser.serializers import available_serializers
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--hours', type=float, default=1)
+    ap.add_argument('--fps', type=int, default=30)
+    ap.add_argument('--boxes', type=int, default=50)
+    ap.add_argument('--top-k', type=int, default=1)
+    args = ap.parse_args()
+
+    num_frames = int(args.hours * 3600 * args.fps)
+    json_parser = synthetic_log(num_frames, args.boxes, args.top_k)
+    out_path = mkdtemp()
+    try:
+        print("{} frames, {} boxes".format(num_frames, len(json_parser.store)))
+
+        start = perf_counter()
+        output_name = os.path.join(out_path, 'dict_tree.json')
+        with open(output_name, 'w') as file:
+            json.dump(json_parser.output(), file)
+        elapsed = perf_counter() - start
+        print("{:<10} {:8.2f} s {:10.1f} MB".format('dict tree', elapsed, os.path.getsize(output_name) / 2 ** 20))
+
+        for name in available_serializers():
+            json_parser.set_serializer(name)
+            output_name = os.path.join(out_path, name + json_parser.serializer.extension)
+            start = perf_counter()
+            json_parser.json_output(output_name)
+            elapsed = perf_counter() - start
+            print("{:<10} {:8.2f} s {:10.1f} MB".format(name, elapsed, os.path.getsize(output_name) / 2 ** 20))
+    finally:
+        rmtree(out_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the memory and ingest throughput of the columnar JsonParser with the old Frame/Bbox/Label object graph.
+
+    python -m json_parser.benchmarks.bench_storage --frames 1800 --boxes 50 --top-k 3
+"""
+import argparse
+import tracemalloc
+from time import perf_counter
+
+from json_parser.json_parser import Frame, JsonParser
+from json_parser.benchmarks.synthetic import synthetic_detections
+
+
+def ingest_object_graph(detections):
+    frames = {}
+    for frame_id, bboxes in detections:
+        frame = Frame(frame_id)
+        frames[frame_id] = frame
+        for bbox_id, xywh, labels in bboxes:
+            frame.add_bbox(bbox_id, *xywh)
+            bbox = frame.bboxes[-1]
+            for category, confidence in labels:
+                bbox.add_label(category, confidence)
+    return frames
+
+
+def ingest_json_parser(detections, top_k):
+    json_parser = JsonParser(top_k_labels=top_k)
+    for frame_id, bboxes in detections:
+        json_parser.add_frame(frame_id)
+        for bbox_id, xywh, labels in bboxes:
+            json_parser.add_bbox_to_frame(frame_id, bbox_id, *xywh)
+            for category, confidence in labels:
+                json_parser.add_label_to_bbox(frame_id, bbox_id, category, confidence)
+    return json_parser
+
+
+def measure(name, function, *args):
+    tracemalloc.start()
+    start = perf_counter()
+    result = function(*args)
+    elapsed = perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{:<14} time: {:8.3f} s   retained: {:8.2f} MB   peak: {:8.2f} MB".format(
+        name, elapsed, current / 2 ** 20, peak / 2 ** 20))
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--frames', type=int, default=1800)
+    ap.add_argument('--boxes', type=int, default=50)
+    ap.add_argument('--top-k', type=int, default=3)
+    args = ap.parse_args()
+
+    detections = list(synthetic_detections(args.frames, args.boxes, args.top_k))
+    print("{} frames, {} boxes per frame, top_k={}".format(args.frames, args.boxes, args.top_k))
+    measure('object graph', ingest_object_graph, detections)
+    measure('columnar', ingest_json_parser, detections, args.top_k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Simulates many cameras logging into one StreamLogger: every stream is a thread that logs synthetic detections
+at `--fps` for `--seconds`, while the windows are written by the shared writer pool.
+
+    python -m json_parser.benchmarks.bench_streams --streams 32 --seconds 20 --window 5
+"""
+import argparse
+import threading
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter, sleep
+
+import numpy as np
+
+from json_parser.streams import StreamLogger
+
+
+def camera(logger, name, fps, seconds, boxes, top_k, categories, seed, latencies):
+    rnd = np.random.default_rng(seed)
+    frame_time = 1 / fps
+    start = perf_counter()
+    frame_id = 0
+    while perf_counter() - start < seconds:
+        frame_boxes = rnd.integers(0, 1000, size=(boxes, 4))
+        class_ids = rnd.integers(0, len(categories), size=(boxes, top_k))
+        confidences = rnd.random((boxes, top_k))
+        tick = perf_counter()
+        logger.log_frame(name, frame_id, frame_boxes, None, class_ids, confidences, categories)
+        logger.schedule_output()
+        latencies.append(perf_counter() - tick)
+        frame_id += 1
+        sleep(max(0.0, start + frame_id * frame_time - perf_counter()))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--streams', type=int, default=32)
+    ap.add_argument('--fps', type=int, default=30)
+    ap.add_argument('--seconds', type=int, default=20)
+    ap.add_argument('--window', type=int, default=5, help='seconds per window file')
+    ap.add_argument('--boxes', type=int, default=50)
+    ap.add_argument('--top-k', type=int, default=1)
+    ap.add_argument('--threads', type=int, default=2, help='writer threads')
+    args = ap.parse_args()
+
+    categories = ['category_{}'.format(i) for i in range(80)]
+    out_path = mkdtemp()
+    logger = StreamLogger(out_path, threads=args.threads)
+    try:
+        latencies = {}
+        threads = []
+        for i in range(args.streams):
+            name = 'camera_{}'.format(i)
+            logger.add_stream(name, top_k_labels=args.top_k, seconds=args.window,
+                              video_details=dict(frame_width=1920, frame_height=1080, frame_rate=args.fps,
+                                                 video_name=name))
+            latencies[name] = []
+            threads.append(threading.Thread(target=camera, args=(logger, name, args.fps, args.seconds, args.boxes,
+                                                                 args.top_k, categories, i, latencies[name])))
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.close()
+        elapsed = perf_counter() - start
+    finally:
+        rmtree(out_path, ignore_errors=True)
+
+    all_latencies = np.concatenate([np.asarray(values) for values in latencies.values()])
+    stats = logger.writer.stats()
+    print("{} streams, {} frames in {:.1f} s ({:.0f} frames/s, target {} frames/s)".format(
+        args.streams, len(all_latencies), elapsed, len(all_latencies) / elapsed, args.streams * args.fps))
+    print("log call latency ms: p50 {:.3f} p99 {:.3f} max {:.3f}".format(
+        *(np.percentile(all_latencies, [50, 99, 100]) * 1000)))
+    print("writer: {} batches written, max queue depth {}, mean write {:.3f} s".format(
+        stats['written'], stats['max_queue_depth'], stats['mean_write_latency'] or 0))
+
+
+if __name__ == '__main__':
+    main()
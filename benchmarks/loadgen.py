@@ -0,0 +1,295 @@
+"""
+Load generator for soak tests: drives synthetic or recorded detections through the full logging path (add_frame,
+add_detections, schedule_output) and reports the sustained throughput, the latency of inserts and window flushes
+and the memory over time.
+
+    python -m json_parser.benchmarks.loadgen --frames 18000 --objects 40 --speed 4 --window 5
+    python -m json_parser.benchmarks.loadgen --replay jsons --speed 10 --loops 3 --processes 8 --output report.json
+
+Synthetic streams are tracks with a Zipf category mix and bursts of arrivals (see `synthetic.synthetic_tracks`);
+`--replay` plays saved logs (files or directories, see `loader.log_files`) instead. Frames are paced at the frame
+rate times `--speed` (0: as fast as possible). With `--processes` every process runs its own stream (a camera)
+into its own directory; latencies are merged over all of them.
+"""
+import argparse
+import json
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter, sleep
+
+import numpy as np
+
+from json_parser.benchmarks.synthetic import synthetic_tracks
+from json_parser.json_parser import JsonParser
+from json_parser.loader import LogReader
+
+
+class LoadMeta(object):
+    PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+    SAMPLE_SECONDS = 1.0
+
+
+class SyntheticSource(object):
+    # `frames` frames of `synthetic_tracks`, with the video details of a 1080p camera at `frame_rate`
+    def __init__(self, frames: int, objects: int = 20, top_k: int = 1, categories: int = 80, frame_rate: float = 30,
+                 burst_probability: float = 0.001, burst_factor: float = 4, seed: int = 42):
+        self.frames = frames
+        self.top_k = top_k
+        self.frame_rate = frame_rate
+        self.video_details = dict(frame_width=1920, frame_height=1080, frame_rate=frame_rate,
+                                  video_name='synthetic_{}.mp4'.format(seed))
+        self.label_names = ['category_{}'.format(i) for i in range(categories)]
+        self.tracks = synthetic_tracks(objects, top_k, categories, burst_probability=burst_probability,
+                                       burst_factor=burst_factor, seed=seed)
+
+    def __iter__(self):
+        # (frame_id, boxes, bbox_ids, class_ids, confidences, label_names)
+        for frame_id, boxes, bbox_ids, class_ids, confidences in islice(self.tracks, self.frames):
+            yield frame_id, boxes, bbox_ids, class_ids, confidences, self.label_names
+
+
+class ReplaySource(object):
+    """
+    The frames of saved logs, `loops` times; frame ids of later loops are shifted past the last id of the logs.
+    Frames are read one at a time with a LogReader, so logs larger than memory can be replayed.
+    """
+
+    def __init__(self, path, loops: int = 1, top_k: int = None):
+        self.path = path
+        self.loops = loops
+        with LogReader(path) as reader:
+            self.video_details = dict(reader.video_details)
+            self.frames = len(reader) * loops
+            self.last_id = max(reader.frame_ids) if len(reader) else 0
+            if top_k is None:
+                first = next((frame for frame in reader.iter_frame_dicts() if frame['bboxes']), None)
+                top_k = len(first['bboxes'][0]['labels']) if first is not None else 1
+        self.top_k = top_k
+        self.frame_rate = self.video_details.get('frame_rate') or 30
+
+    def __iter__(self):
+        codes = {}
+        label_names = []
+        for loop in range(self.loops):
+            offset = loop * (self.last_id + 1)
+            with LogReader(self.path) as reader:
+                for frame in reader.iter_frame_dicts():
+                    bboxes = frame['bboxes']
+                    class_ids = []
+                    for bbox in bboxes:
+                        for label in bbox['labels']:
+                            if label['category'] not in codes:
+                                codes[label['category']] = len(label_names)
+                                label_names.append(label['category'])
+                        class_ids.append([codes[label['category']] for label in bbox['labels']])
+                    boxes = np.array([[bbox['top'], bbox['left'], bbox['width'], bbox['height']] for bbox in bboxes])
+                    confidences = [[label['confidence'] for label in bbox['labels']] for bbox in bboxes]
+                    # explicit shapes: numpy can not reshape the arrays of a frame without boxes to (0, -1)
+                    shape = (len(bboxes), len(class_ids[0]) if bboxes else self.top_k)
+                    yield (frame['frame_id'] + offset, boxes.reshape(-1, 4), [bbox['bbox_id'] for bbox in bboxes],
+                           np.array(class_ids, dtype=np.int64).reshape(shape), np.array(confidences).reshape(shape),
+                           label_names)
+
+
+def resident_bytes():
+    # resident set size of this process (Linux), or the peak of it where /proc is missing
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def latency_summary(latencies):
+    # count, mean, percentiles and max of latencies in seconds; exact, from the sorted values
+    values = np.sort(np.frombuffer(latencies, dtype=np.float64)) if len(latencies) else np.zeros(0)
+    summary = {'count': len(values), 'mean': float(values.mean()) if len(values) else 0.0,
+               'max': float(values[-1]) if len(values) else 0.0}
+    for fraction in LoadMeta.PERCENTILES:
+        key = 'p' + '{:g}'.format(fraction * 100).replace('.', '')
+        summary[key] = float(values[min(int(fraction * len(values)), len(values) - 1)]) if len(values) else 0.0
+    return summary
+
+
+def drive(source, output_path: str, window: int = 5, speed: float = 1, duration: float = None,
+          serializer: str = None, async_output: bool = False, max_frames: int = None,
+          sample_seconds: float = LoadMeta.SAMPLE_SECONDS):
+    """
+    Logs every frame of `source` into a JsonParser that writes a window to `output_path` every `window` seconds,
+    paced at `source.frame_rate * speed` frames per second (unpaced when speed is 0) and stopped after `duration`
+    seconds. Returns the counts, the insert (add_frame + add_detections) and flush (a schedule_output call that
+    wrote a window) latencies as arrays of seconds, and memory samples of {seconds, frames, window_bytes,
+    resident_bytes}.
+    """
+    json_parser = JsonParser(top_k_labels=source.top_k)
+    json_parser.add_video_details(**source.video_details)
+    if serializer is not None:
+        json_parser.set_serializer(serializer)
+    if async_output:
+        json_parser.set_async_output()
+    if max_frames is not None:
+        json_parser.set_retention(max_frames=max_frames)
+    frame_time = 1 / (source.frame_rate * speed) if speed else 0
+    inserts, flushes = array('d'), array('d')
+    samples = []
+    frames = boxes = 0
+    busy = lag = 0.0
+    start = perf_counter()
+    json_parser.set_start()
+    next_sample = start
+    for i, (frame_id, frame_boxes, bbox_ids, class_ids, confidences, label_names) in enumerate(source):
+        now = perf_counter()
+        if duration is not None and now - start >= duration:
+            break
+        if frame_time:
+            wait = start + i * frame_time - now
+            if wait > 0:
+                sleep(wait)
+            else:
+                # how far the logger fell behind the source
+                lag = max(lag, -wait)
+        tick = perf_counter()
+        json_parser.add_frame(frame_id)
+        json_parser.add_detections(frame_id, frame_boxes, bbox_ids, class_ids, confidences, label_names)
+        inserted = perf_counter()
+        window_start = json_parser.start_time
+        json_parser.schedule_output(output_path, seconds=window)
+        end = perf_counter()
+        inserts.append(inserted - tick)
+        if json_parser.start_time is not window_start:
+            flushes.append(end - inserted)
+        busy += end - tick
+        frames += 1
+        boxes += len(frame_boxes)
+        if end >= next_sample:
+            samples.append({'seconds': end - start, 'frames': frames, 'window_bytes': json_parser.memory_bytes(),
+                            'resident_bytes': resident_bytes()})
+            next_sample = end + sample_seconds
+
+    # the last window and, with async output, the windows still queued
+    tick = perf_counter()
+    if json_parser.store.frames or len(json_parser.segments):
+        json_parser.output_window(output_path)
+    json_parser.close()
+    end = perf_counter()
+    busy += end - tick
+    samples.append({'seconds': end - start, 'frames': frames, 'window_bytes': json_parser.memory_bytes(),
+                    'resident_bytes': resident_bytes()})
+    return {'frames': frames, 'boxes': boxes, 'seconds': end - start, 'busy_seconds': busy, 'close_seconds': end - tick,
+            'max_lag': lag, 'windows': json_parser.metrics.counters.get('windows', 0),
+            'bytes_written': json_parser.metrics.counters.get('bytes_written', 0),
+            'inserts': inserts, 'flushes': flushes, 'memory': samples}
+
+
+def _make_source(params, index: int):
+    if params.replay:
+        return ReplaySource(params.replay, loops=params.loops, top_k=params.top_k)
+    return SyntheticSource(params.frames, params.objects, params.top_k or 1, params.categories, params.fps,
+                           params.burst_probability, params.burst_factor, seed=params.seed + index)
+
+
+def run_stream(params, index: int):
+    # one stream, in its own directory; the entry point of a worker process
+    return drive(_make_source(params, index), join(params.output_path, 'stream_{}'.format(index)),
+                 window=params.window, speed=params.speed, duration=params.duration, serializer=params.serializer,
+                 async_output=params.async_output, max_frames=params.max_frames,
+                 sample_seconds=params.sample_seconds)
+
+
+def report(results: list):
+    # merges the results of every stream
+    seconds = max(result['seconds'] for result in results)
+    frames = sum(result['frames'] for result in results)
+    boxes = sum(result['boxes'] for result in results)
+    busy = sum(result['busy_seconds'] for result in results)
+    inserts, flushes = array('d'), array('d')
+    for result in results:
+        inserts.extend(result['inserts'])
+        flushes.extend(result['flushes'])
+    return {'streams': len(results),
+            'frames': frames,
+            'boxes': boxes,
+            'seconds': seconds,
+            'frames_per_second': frames / seconds if seconds else 0,
+            'boxes_per_second': boxes / seconds if seconds else 0,
+            # what the logger could take if the source were free
+            'logger_frames_per_second': frames / busy if busy else 0,
+            'max_lag': max(result['max_lag'] for result in results),
+            'windows': sum(result['windows'] for result in results),
+            'bytes_written': sum(result['bytes_written'] for result in results),
+            'close_seconds': max(result['close_seconds'] for result in results),
+            'insert': latency_summary(inserts),
+            'flush': latency_summary(flushes),
+            'peak_window_bytes': max(sample['window_bytes'] for result in results for sample in result['memory']),
+            'peak_resident_bytes': max(sample['resident_bytes'] for result in results for sample in result['memory']),
+            'memory': [result['memory'] for result in results]}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='drives synthetic or recorded detections through the logger')
+    ap.add_argument('--replay', nargs='+', default=None, help='log files or directories to replay')
+    ap.add_argument('--loops', type=int, default=1, help='times the replayed logs are played')
+    ap.add_argument('--frames', type=int, default=3000, help='synthetic frames per stream')
+    ap.add_argument('--objects', type=int, default=20, help='synthetic objects in view outside of bursts')
+    ap.add_argument('--categories', type=int, default=80)
+    ap.add_argument('--burst-probability', type=float, default=0.001, help='chance per frame that a burst starts')
+    ap.add_argument('--burst-factor', type=float, default=4, help='arrivals during a burst, times the usual')
+    ap.add_argument('--top-k', type=int, default=None, help='labels per bbox (replay: read from the logs)')
+    ap.add_argument('--fps', type=float, default=30, help='frame rate of the synthetic streams')
+    ap.add_argument('--speed', type=float, default=1, help='times the frame rate, 0 for as fast as possible')
+    ap.add_argument('--duration', type=float, default=None, help='stop every stream after this many seconds')
+    ap.add_argument('--processes', type=int, default=1, help='streams, each in its own process')
+    ap.add_argument('--window', type=int, default=5, help='seconds per window file')
+    ap.add_argument('--serializer', default=None, help='json, msgpack or delta')
+    ap.add_argument('--async-output', action='store_true', help='write windows on a background thread')
+    ap.add_argument('--max-frames', type=int, default=None, help='frames of a window kept in memory')
+    ap.add_argument('--sample-seconds', type=float, default=LoadMeta.SAMPLE_SECONDS)
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--output-path', default=None, help='directory of the windows, a temporary one by default')
+    ap.add_argument('--output', default=None, help='JSON file for the report')
+    params = ap.parse_args(argv)
+
+    temporary = params.output_path is None
+    if temporary:
+        params.output_path = mkdtemp()
+    try:
+        if params.processes == 1:
+            results = [run_stream(params, 0)]
+        else:
+            with ProcessPoolExecutor(max_workers=params.processes) as pool:
+                results = list(pool.map(run_stream, [params] * params.processes, range(params.processes)))
+    finally:
+        if temporary:
+            rmtree(params.output_path, ignore_errors=True)
+
+    summary = report(results)
+    print("{} streams, {} frames, {} boxes in {:.1f} s".format(summary['streams'], summary['frames'],
+                                                               summary['boxes'], summary['seconds']))
+    print("throughput: {:.0f} frames/s, {:.0f} boxes/s (logger alone: {:.0f} frames/s), max lag {:.3f} s".format(
+        summary['frames_per_second'], summary['boxes_per_second'], summary['logger_frames_per_second'],
+        summary['max_lag']))
+    for name in ('insert', 'flush'):
+        latency = summary[name]
+        print("{:<6} n={:<8} mean {:8.3f} ms  p50 {:8.3f} ms  p99 {:8.3f} ms  p99.9 {:8.3f} ms  max {:8.3f} ms".format(
+            name, latency['count'], latency['mean'] * 1000, latency['p50'] * 1000, latency['p99'] * 1000,
+            latency['p999'] * 1000, latency['max'] * 1000))
+    print("windows: {}, written: {:.2f} MB, peak window: {:.2f} MB, peak resident: {:.2f} MB".format(
+        summary['windows'], summary['bytes_written'] / 2 ** 20, summary['peak_window_bytes'] / 2 ** 20,
+        summary['peak_resident_bytes'] / 2 ** 20))
+    if params.output:
+        with open(params.output, 'w') as file:
+            json.dump(summary, file, indent=2)
+    return summary
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Runs the benchmark suite on synthetic detections and writes the results as JSON, optionally compared against a
+stored baseline (a results file of an earlier run). No video or weights are needed: the decode/NMS case runs on
+synthetic YOLO outputs or on outputs recorded with `synthetic.save_outputs`. The import case times
+`import json_parser.json_parser` in a fresh interpreter, see `bench_import`.
+
+    python -m json_parser.benchmarks.suite --output results.json
+    python -m json_parser.benchmarks.suite --baseline results.json --tolerance 0.15
+
+Every case is run `--repeat` times; the best time is compared, since it is the least noisy. Peak memory is the
+tracemalloc peak of one extra run. The exit code is 1 when a case is slower than the baseline by more than the
+tolerance.
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from datetime import datetime
+from os.path import join
+from shutil import rmtree
+from statistics import median
+from tempfile import mkdtemp
+from time import perf_counter
+
+from json_parser.benchmarks.bench_import import import_time
+from json_parser.benchmarks.synthetic import synthetic_detections, synthetic_log, synthetic_yolo_outputs, \
+    load_outputs
+from json_parser.json_parser import JsonParser
+from json_parser.object_detection.yolo_decode import decode_yolo_outputs
+
+
+def ingest_per_call(params):
+    # add_frame / add_bbox_to_frame / add_label_to_bbox, one call per item
+    detections = list(synthetic_detections(params.frames, params.boxes, params.top_k, params.categories))
+
+    def run():
+        json_parser = JsonParser(top_k_labels=params.top_k)
+        for frame_id, bboxes in detections:
+            json_parser.add_frame(frame_id)
+            for bbox_id, xywh, labels in bboxes:
+                json_parser.add_bbox_to_frame(frame_id, bbox_id, *xywh)
+                for category, confidence in labels:
+                    json_parser.add_label_to_bbox(frame_id, bbox_id, category, confidence)
+    return run, params.frames * params.boxes
+
+
+def ingest_batch(params):
+    # add_detections, one call per frame
+    return (lambda: synthetic_log(params.frames, params.boxes, params.top_k, params.categories)), \
+        params.frames * params.boxes
+
+
+def output_dict(params):
+    json_parser = synthetic_log(params.frames, params.boxes, params.top_k, params.categories)
+    return json_parser.output, params.frames * params.boxes
+
+
+def json_output(params):
+    json_parser = synthetic_log(params.frames, params.boxes, params.top_k, params.categories)
+    return (lambda: json_parser.json_output(join(params.out_path, 'output.json'))), params.frames * params.boxes
+
+
+def schedule_output(params):
+    # cost of one window flush: detach, serialize and write the window (synchronously)
+    def run():
+        json_parser = synthetic_log(params.frames, params.boxes, params.top_k, params.categories)
+        start = perf_counter()
+        json_parser.output_window(join(params.out_path, 'windows'))
+        return perf_counter() - start
+    return run, params.frames * params.boxes
+
+
+def decode_nms(params):
+    if params.recorded:
+        frames = load_outputs(params.recorded)
+    else:
+        frames = synthetic_yolo_outputs(params.decode_frames, params.boxes, params.categories)
+    try:
+        import cv2
+        nms = cv2.dnn.NMSBoxes
+    except ImportError:
+        nms = None
+
+    def run():
+        for layerOutputs in frames:
+            detections = decode_yolo_outputs(layerOutputs, 1920, 1080, 0.5, top_k=params.top_k)
+            if nms is not None:
+                nms(detections.boxes.tolist(), detections.confidences.tolist(), 0.5, 0.3)
+    return run, len(frames)
+
+
+def import_json_parser(params):
+    # start up cost of a worker process; the run returns the import time measured in the child
+    return (lambda: import_time('json_parser.json_parser')[0]), 1
+
+
+CASES = {'ingest_per_call': ingest_per_call,
+         'ingest_batch': ingest_batch,
+         'output_dict': output_dict,
+         'json_output': json_output,
+         'schedule_output': schedule_output,
+         'decode_nms': decode_nms,
+         'import': import_json_parser}
+
+
+def measure(case, params):
+    """
+    Runs one case and returns its timings. A run may return its own elapsed time (to leave the setup out),
+    otherwise the whole call is timed.
+    """
+    run, items = case(params)
+    times = []
+    for _ in range(params.repeat):
+        start = perf_counter()
+        elapsed = run()
+        times.append(elapsed if isinstance(elapsed, float) else perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best = min(times)
+    return {'best': best, 'median': median(times), 'items': items, 'items_per_second': items / best if best else 0,
+            'peak_bytes': peak}
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    # {case: time / baseline time} and the cases slower than 1 + tolerance
+    ratios = {}
+    regressions = []
+    for name, result in results['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or not reference['best']:
+            continue
+        ratios[name] = result['best'] / reference['best']
+        if ratios[name] > 1 + tolerance:
+            regressions.append(name)
+    return ratios, regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--frames', type=int, default=300)
+    ap.add_argument('--boxes', type=int, default=20, help='boxes per frame')
+    ap.add_argument('--top-k', type=int, default=3)
+    ap.add_argument('--categories', type=int, default=80, help='number of distinct categories')
+    ap.add_argument('--decode-frames', type=int, default=20, help='frames of synthetic YOLO outputs')
+    ap.add_argument('--recorded', default=None, help='.npz of recorded YOLO outputs for the decode_nms case')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    ap.add_argument('--output', default=None, help='JSON file for the results')
+    ap.add_argument('--baseline', default=None, help='results of an earlier run to compare against')
+    ap.add_argument('--tolerance', type=float, default=0.1)
+    params = ap.parse_args(argv)
+
+    params.out_path = mkdtemp()
+    results = {'meta': {'time': datetime.now().isoformat(),
+                        'python': sys.version.split()[0],
+                        'platform': platform.platform(),
+                        'params': {key: value for key, value in vars(params).items() if key != 'out_path'}},
+               'results': {}}
+    try:
+        for name in params.cases:
+            result = measure(CASES[name], params)
+            results['results'][name] = result
+            print("{:<16} best: {:8.4f} s  median: {:8.4f} s  {:12.0f} items/s  peak: {:8.2f} MB".format(
+                name, result['best'], result['median'], result['items_per_second'], result['peak_bytes'] / 2 ** 20))
+    finally:
+        rmtree(params.out_path, ignore_errors=True)
+
+    regressions = []
+    if params.baseline:
+        with open(params.baseline) as file:
+            ratios, regressions = compare(results, json.load(file), params.tolerance)
+        results['baseline'] = {'path': params.baseline, 'ratios': ratios, 'regressions': regressions}
+        for name, ratio in ratios.items():
+            print("{:<16} {:6.2f}x baseline{}".format(name, ratio, '  REGRESSION' if name in regressions else ''))
+    if params.output:
+        with open(params.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import random
+
+import numpy as np
+
+# rows of the three YOLOv3 output layers for a 416x416 input
+YOLO_LAYER_ROWS = (507, 2028, 8112)
+
+
+def synthetic_detections(num_frames: int = 100, boxes_per_frame: int = 50, top_k: int = 1,
+                         num_categories: int = 80, seed: int = 42):
+    """
+    Yields (frame_id, [(bbox_id, (top, left, width, height), [(category, confidence), ...]), ...]) tuples
+    that look like the output of the example detector.
+    """
+    rnd = random.Random(seed)
+    categories = ['category_{}'.format(i) for i in range(num_categories)]
+    for frame_id in range(num_frames):
+        bboxes = []
+        for bbox_id in range(boxes_per_frame):
+            xywh = (rnd.randint(0, 1920), rnd.randint(0, 1080), rnd.randint(10, 400), rnd.randint(10, 400))
+            labels = [(category, round(rnd.random(), 4)) for category in rnd.sample(categories, top_k)]
+            bboxes.append((bbox_id, xywh, labels))
+        yield frame_id, bboxes
+
+
+def synthetic_log(num_frames: int, boxes_per_frame: int, top_k: int, num_categories: int = 80, seed: int = 42):
+    # a JsonParser filled through `add_detections`, like the example detector does
+    from json_parser.json_parser import JsonParser
+    rnd = np.random.default_rng(seed)
+    json_parser = JsonParser(top_k_labels=top_k)
+    json_parser.add_video_details(1920, 1080, 30, 'synthetic.mp4')
+    categories = ['category_{}'.format(i) for i in range(num_categories)]
+    for frame_id in range(num_frames):
+        json_parser.add_frame(frame_id)
+        boxes = rnd.integers(0, 1000, size=(boxes_per_frame, 4))
+        class_ids = np.argsort(rnd.random((boxes_per_frame, num_categories)), axis=1)[:, :top_k]
+        confidences = rnd.random((boxes_per_frame, top_k)).round(4)
+        json_parser.add_detections(frame_id, boxes, None, class_ids, confidences, categories)
+    return json_parser
+
+
+def synthetic_static_scene(num_frames: int, objects: int = 20, top_k: int = 1, num_categories: int = 80,
+                           move_probability: float = 0.1, churn_probability: float = 0.01, seed: int = 42):
+    """
+    A JsonParser with the log of a fixed camera: `objects` tracks that keep their bbox id and category, move by a
+    few pixels with `move_probability` per frame and are replaced by a new object with `churn_probability`.
+    Confidences jitter a little on every frame.
+    """
+    from json_parser.json_parser import JsonParser
+    rnd = np.random.default_rng(seed)
+    json_parser = JsonParser(top_k_labels=top_k)
+    json_parser.add_video_details(1920, 1080, 30, 'static.mp4')
+    categories = ['category_{}'.format(i) for i in range(num_categories)]
+    bbox_ids = np.arange(objects)
+    boxes = rnd.integers(0, 1000, size=(objects, 4))
+    class_ids = np.argsort(rnd.random((objects, num_categories)), axis=1)[:, :top_k]
+    confidences = rnd.random((objects, top_k))
+    for frame_id in range(num_frames):
+        replaced = rnd.random(objects) < churn_probability
+        bbox_ids[replaced] = bbox_ids.max() + 1 + np.arange(replaced.sum())
+        boxes[replaced] = rnd.integers(0, 1000, size=(replaced.sum(), 4))
+        moved = rnd.random(objects) < move_probability
+        boxes[moved] += rnd.integers(-3, 4, size=(moved.sum(), 4))
+        jittered = np.clip(confidences + rnd.normal(0, 0.002, confidences.shape), 0, 1).round(4)
+        json_parser.add_frame(frame_id)
+        json_parser.add_detections(frame_id, boxes, bbox_ids, class_ids, jittered, categories)
+    return json_parser
+
+
+def synthetic_tracks(objects: int = 20, top_k: int = 1, num_categories: int = 80, frame_size: tuple = (1920, 1080),
+                     track_frames: float = 90, burst_probability: float = 0.001, burst_frames: float = 150,
+                     burst_factor: float = 4, zipf: float = 1.2, seed: int = 42):
+    """
+    Yields (frame_id, boxes, bbox_ids, class_ids, confidences) of an endless stream of moving objects, the arguments
+    of `JsonParser.add_detections` (with the categories 'category_<class id>').
+
+    Every object is a track with its own bbox id, size, velocity and top_k categories; tracks live `track_frames`
+    frames on average (geometric) or until they leave the frame, and new ones arrive so that about `objects` are in
+    view outside of bursts. Categories follow a Zipf mix (category_0 is the most common). With `burst_probability`
+    per frame a burst starts: for `burst_frames` frames on average `burst_factor` times more objects arrive.
+    """
+    rnd = np.random.default_rng(seed)
+    width, height = frame_size
+    weights = 1 / np.arange(1, num_categories + 1) ** zipf
+    weights /= weights.sum()
+    # per track: position (x, y), velocity, size, categories, confidences
+    ids = np.zeros(0, dtype=np.int64)
+    position = np.zeros((0, 2))
+    velocity = np.zeros((0, 2))
+    size = np.zeros((0, 2))
+    class_ids = np.zeros((0, top_k), dtype=np.int64)
+    confidences = np.zeros((0, top_k))
+    next_id = 0
+    burst = False
+    frame_id = 0
+    while True:
+        if burst:
+            burst = rnd.random() >= 1 / burst_frames
+        else:
+            burst = rnd.random() < burst_probability
+        born = rnd.poisson(objects / track_frames * (burst_factor if burst else 1))
+        if frame_id == 0:
+            born = objects
+        if born:
+            ids = np.concatenate([ids, np.arange(next_id, next_id + born)])
+            next_id += born
+            position = np.concatenate([position, rnd.random((born, 2)) * [width, height]])
+            velocity = np.concatenate([velocity, rnd.normal(0, 3, (born, 2))])
+            size = np.concatenate([size, np.clip(rnd.lognormal(4, 0.6, (born, 2)), 8, min(width, height) / 2)])
+            first = rnd.choice(num_categories, size=born, p=weights)
+            # top_k - 1 other categories, all different from the first one
+            shift = 1 + np.argsort(rnd.random((born, num_categories - 1)), axis=1)[:, :top_k - 1]
+            others = (first[:, None] + shift) % num_categories
+            class_ids = np.concatenate([class_ids, np.concatenate([first[:, None], others], axis=1)[:, :top_k]])
+            new_confidences = -np.sort(-rnd.random((born, top_k)), axis=1)
+            new_confidences[:, 0] = np.clip(rnd.normal(0.8, 0.1, born), 0.3, 1)
+            new_confidences[:, 1:] *= 1 - new_confidences[:, :1]
+            confidences = np.concatenate([confidences, new_confidences])
+
+        position += velocity
+        alive = (rnd.random(len(ids)) >= 1 / track_frames) & (position[:, 0] > -size[:, 0]) & \
+                (position[:, 0] < width) & (position[:, 1] > -size[:, 1]) & (position[:, 1] < height)
+        ids, position, velocity, size = ids[alive], position[alive], velocity[alive], size[alive]
+        class_ids, confidences = class_ids[alive], confidences[alive]
+
+        # top/width are the x axis, as the detector logs them
+        boxes = np.concatenate([position, size], axis=1).astype(np.int64)
+        jittered = np.clip(confidences + rnd.normal(0, 0.01, confidences.shape), 0, 1).round(4)
+        yield frame_id, boxes, ids, class_ids, jittered
+        frame_id += 1
+
+
+def synthetic_yolo_outputs(num_frames: int = 10, objects_per_frame: int = 20, num_classes: int = 80,
+                           seed: int = 42):
+    """
+    Returns the layer outputs of `num_frames` images as the YOLOv3 layers of `cv2.dnn` give them: three float32
+    arrays of (rows, 5 + num_classes). Every object is hit by a few neighbouring rows with slightly different
+    boxes, so NMS has work to do; the other rows are background noise below any usual confidence.
+    """
+    rnd = np.random.default_rng(seed)
+    frames = []
+    for _ in range(num_frames):
+        layers = []
+        for rows in YOLO_LAYER_ROWS:
+            output = np.zeros((rows, 5 + num_classes), dtype=np.float32)
+            output[:, 0:4] = rnd.random((rows, 4)) * [1, 1, 0.1, 0.1]
+            output[:, 5:] = rnd.random((rows, num_classes)) * 0.05
+            layers.append(output)
+        for _ in range(objects_per_frame):
+            box = rnd.random(4) * [1, 1, 0.3, 0.3]
+            class_id = rnd.integers(num_classes)
+            for layer in layers:
+                for row in rnd.integers(len(layer), size=3):
+                    layer[row, 0:4] = box + rnd.normal(0, 0.005, 4)
+                    layer[row, 4] = 0.9
+                    layer[row, 5 + class_id] = 0.6 + rnd.random() * 0.4
+        frames.append(layers)
+    return frames
+
+
+def save_outputs(path: str, frames):
+    # records the layer outputs of a run (e.g. collected in `infer`) so the benchmarks need no weights
+    np.savez_compressed(path, **{'{}_{}'.format(i, j): output for i, layers in enumerate(frames)
+                                 for j, output in enumerate(layers)})
+
+
+def load_outputs(path: str):
+    with np.load(path) as data:
+        keys = sorted((tuple(map(int, key.split('_'))) for key in data.files))
+        frames = []
+        for i, j in keys:
+            if j == 0:
+                frames.append([])
+            frames[i].append(data['{}_{}'.format(i, j)])
+    return frames
@@ -0,0 +1,237 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+from json_parser.storage import ALL_INT_COORDS, DetectionStore
+
+
+class BinaryMeta(object):
+    MAGIC = b'JPDB'
+    # version 2: int_coords is a bit mask per coordinate (see storage.ALL_INT_COORDS) and int_confidences marks
+    # the confidences given as integers; version 1 files (int_coords 1 for all four) are still read.
+    VERSION = 2
+    VERSIONS = (1, 2)
+    EXTENSION = '.jpdb'
+    # magic, version, top_k, number of bboxes, number of frames
+    HEADER = struct.Struct('<4sIIQQ')
+    # offsets of: metadata, string table, boxes, confidences, category codes, frame index; magic
+    TRAILER = struct.Struct('<6Q4s')
+    ALIGNMENT = 8
+    BOX_DTYPE = np.dtype([('frame_id', '<i8'),
+                          ('bbox_id', '<i8'),
+                          ('top', '<f8'),
+                          ('left', '<f8'),
+                          ('width', '<f8'),
+                          ('height', '<f8'),
+                          ('int_coords', 'u1'),
+                          ('label_count', '<u2'),
+                          # bit i: label i (of the first 32) has an integer confidence
+                          ('int_confidences', '<u4')], align=True)
+    FRAME_DTYPE = np.dtype([('frame_id', '<i8'), ('first_row', '<i8'), ('num_rows', '<i8')])
+
+
+def _write_section(file, data: bytes):
+    # writes `data` at the next aligned offset and returns that offset.
+    padding = -file.tell() % BinaryMeta.ALIGNMENT
+    file.write(b'\0' * padding)
+    offset = file.tell()
+    file.write(data)
+    return offset
+
+
+def _write_blob(file, data: bytes):
+    # length prefixed section
+    return _write_section(file, struct.pack('<Q', len(data)) + data)
+
+
+def write_binary(store, video_details: dict, top_k: int, output_name: str, skipped_frames: list = None):
+    """
+    Writes the detections of a DetectionStore in the binary format:
+
+    header | metadata (json) | string table (json list of categories) | box records | confidences | category codes
+    | frame index | trailer
+
+    Box records are fixed width (`BinaryMeta.BOX_DTYPE`) and the bboxes of a frame are contiguous. Labels are
+    (num_bboxes, top_k) blocks of float64 confidences and int32 category codes. The frame index holds frame_id,
+    first row and number of rows of every frame and the trailer holds the offsets of every section.
+    Every bbox is expected to have exactly `top_k` labels (see `JsonParser.check_labels`).
+    """
+    order = np.fromiter((row for rows in store.frames.values() for row in rows.values()), dtype=np.int64,
+                        count=len(store))
+    boxes = np.zeros(len(order), dtype=BinaryMeta.BOX_DTYPE)
+    boxes['frame_id'] = np.frombuffer(store.frame_ids, dtype=np.int64)[order]
+    boxes['bbox_id'] = np.frombuffer(store.bbox_ids, dtype=np.int64)[order]
+    for name in ('top', 'left', 'width', 'height'):
+        boxes[name] = np.frombuffer(getattr(store, name), dtype=np.float64)[order]
+    boxes['int_coords'] = np.frombuffer(store.int_coords, dtype=np.int8)[order]
+    boxes['label_count'] = np.frombuffer(store.label_counts, dtype=np.uint16)[order]
+
+    stride = store.label_stride
+    confidences = np.frombuffer(store.label_confidences, dtype=np.float64).reshape(-1, stride)[order, :top_k] \
+        if stride else np.zeros((len(order), 0))
+    if stride:
+        ints = np.frombuffer(store.label_ints, dtype=np.int8).reshape(-1, stride)[order, :min(top_k, 32)]
+        boxes['int_confidences'] = (ints.astype(np.uint32) << np.arange(ints.shape[1], dtype=np.uint32)).sum(
+            axis=1, dtype=np.uint32)
+    codes = np.frombuffer(store.label_codes, dtype=np.int32).reshape(-1, stride)[order, :top_k] \
+        if stride else np.zeros((len(order), 0), dtype=np.int32)
+
+    frames = np.zeros(len(store.frames), dtype=BinaryMeta.FRAME_DTYPE)
+    frames['frame_id'] = list(store.frames)
+    frames['num_rows'] = [len(rows) for rows in store.frames.values()]
+    frames['first_row'] = np.cumsum(frames['num_rows']) - frames['num_rows']
+
+    metadata = json.dumps({'video_details': video_details, 'top_k_labels': top_k,
+                           'skipped_frames': skipped_frames or []}).encode()
+    with open(output_name, 'wb') as file:
+        file.write(BinaryMeta.HEADER.pack(BinaryMeta.MAGIC, BinaryMeta.VERSION, top_k, len(order), len(frames)))
+        offsets = (_write_blob(file, metadata),
+                   _write_blob(file, json.dumps(store.categories).encode()),
+                   _write_section(file, boxes.tobytes()),
+                   _write_section(file, np.ascontiguousarray(confidences, dtype='<f8').tobytes()),
+                   _write_section(file, np.ascontiguousarray(codes, dtype='<i4').tobytes()),
+                   _write_section(file, frames.tobytes()))
+        file.write(BinaryMeta.TRAILER.pack(*offsets, BinaryMeta.MAGIC))
+
+
+class BinaryLogReader(object):
+    """
+    Reads a file written by `write_binary` through mmap. `boxes`, `confidences`, `codes` and `frame_index` are
+    numpy views on the mapped file, nothing is copied until it is indexed with a mask.
+
+        with BinaryLogReader('log.jpdb') as reader:
+            boxes = reader.frame_boxes(10)
+            confidences = reader.category_confidences('car')
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.top_k, num_rows, num_frames = BinaryMeta.HEADER.unpack_from(self._mmap, 0)
+        if magic != BinaryMeta.MAGIC or version not in BinaryMeta.VERSIONS:
+            raise ValueError("{} is not a binary log of version {}".format(path, BinaryMeta.VERSION))
+        self.version = version
+        *offsets, magic = BinaryMeta.TRAILER.unpack_from(self._mmap, len(self._mmap) - BinaryMeta.TRAILER.size)
+        if magic != BinaryMeta.MAGIC:
+            raise ValueError("{} is truncated".format(path))
+        meta_offset, strings_offset, boxes_offset, confidences_offset, codes_offset, frames_offset = offsets
+
+        metadata = json.loads(self._blob(meta_offset))
+        self.video_details = metadata['video_details']
+        self.skipped_frames = metadata.get('skipped_frames', [])
+        self.categories = json.loads(self._blob(strings_offset))
+        self.category_codes = {category: code for code, category in enumerate(self.categories)}
+
+        self.boxes = np.frombuffer(self._mmap, dtype=BinaryMeta.BOX_DTYPE, count=num_rows, offset=boxes_offset)
+        self.confidences = np.frombuffer(self._mmap, dtype='<f8', count=num_rows * self.top_k,
+                                         offset=confidences_offset).reshape(num_rows, self.top_k)
+        self.codes = np.frombuffer(self._mmap, dtype='<i4', count=num_rows * self.top_k,
+                                   offset=codes_offset).reshape(num_rows, self.top_k)
+        self.frame_index = np.frombuffer(self._mmap, dtype=BinaryMeta.FRAME_DTYPE, count=num_frames,
+                                         offset=frames_offset)
+        self._frame_positions = None
+
+    def _blob(self, offset: int):
+        length, = struct.unpack_from('<Q', self._mmap, offset)
+        return self._mmap[offset + 8:offset + 8 + length]
+
+    def __len__(self):
+        return len(self.frame_index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        # the views have to be released before the map can be closed
+        self.boxes = self.confidences = self.codes = self.frame_index = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # views handed out by this reader are still alive, the map is closed when they are collected.
+            pass
+        self._file.close()
+
+    @property
+    def frame_ids(self):
+        return self.frame_index['frame_id']
+
+    def _rows(self, frame_id: int):
+        if self._frame_positions is None:
+            self._frame_positions = {frame_id: i for i, frame_id in enumerate(self.frame_ids.tolist())}
+        position = self._frame_positions.get(frame_id)
+        if position is None:
+            raise ValueError("frame with frame_id: {} does not exist".format(frame_id))
+        first, count = int(self.frame_index['first_row'][position]), int(self.frame_index['num_rows'][position])
+        return slice(first, first + count)
+
+    def frame_boxes(self, frame_id: int):
+        # view on the box records of one frame
+        return self.boxes[self._rows(frame_id)]
+
+    def frame_labels(self, frame_id: int):
+        # views on the (num_bboxes, top_k) codes and confidences of one frame
+        rows = self._rows(frame_id)
+        return self.codes[rows], self.confidences[rows]
+
+    def category_confidences(self, category: str):
+        # confidences of every label of `category`, in file order
+        code = self.category_codes.get(category)
+        if code is None:
+            return np.zeros(0)
+        return self.confidences[self.codes == code]
+
+    def frame_dict(self, frame_id: int):
+        rows = self._rows(frame_id)
+        codes, confidences = self.codes[rows].tolist(), self.confidences[rows].tolist()
+        bboxes = []
+        for box, box_codes, box_confidences in zip(self.boxes[rows].tolist(), codes, confidences):
+            _, bbox_id, top, left, width, height, int_coords, label_count, int_confidences = box
+            if self.version == 1 and int_coords:
+                int_coords = ALL_INT_COORDS
+            top, left, width, height = (int(value) if int_coords >> i & 1 else value
+                                        for i, value in enumerate((top, left, width, height)))
+            bboxes.append({'labels': [{'category': self.categories[code],
+                                       'confidence': int(confidence) if int_confidences >> i & 1 else confidence}
+                                      for i, (code, confidence) in enumerate(zip(box_codes[:label_count],
+                                                                                 box_confidences[:label_count]))],
+                           'bbox_id': bbox_id,
+                           'top': top,
+                           'left': left,
+                           'width': width,
+                           'height': height})
+        return {'frame_id': frame_id, 'bboxes': bboxes}
+
+    def iter_frame_dicts(self):
+        for frame_id in self.frame_ids.tolist():
+            yield self.frame_dict(frame_id)
+
+    def output(self):
+        # the log in the schema of `JsonParser.output()`
+        output = {'video_details': self.video_details, 'frames': list(self.iter_frame_dicts())}
+        if self.skipped_frames:
+            output['skipped_frames'] = self.skipped_frames
+        return output
+
+
+def binary_to_json(binary_name: str, json_name: str):
+    with BinaryLogReader(binary_name) as reader:
+        output = reader.output()
+    with open(json_name, 'w') as file:
+        json.dump(output, file)
+
+
+def json_to_binary(json_name: str, binary_name: str):
+    with open(json_name) as file:
+        output = json.load(file)
+    frames = output['frames']
+    top_k = next((len(bbox['labels']) for frame in frames for bbox in frame['bboxes']), 0)
+    store = DetectionStore(label_stride=top_k)
+    for frame in frames:
+        store.add_frame_dict(frame)
+    write_binary(store, output['video_details'], top_k, binary_name, output.get('skipped_frames'))
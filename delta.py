@@ -0,0 +1,227 @@
+import json
+
+from json_parser.storage import ALL_INT_COORDS, iter_parts
+
+
+class DeltaMeta(object):
+    ENCODING = 'delta'
+    VERSION = 1
+    EXTENSION = '.jdelta'
+    KEYFRAME_INTERVAL = 30
+    # how the coordinates of a bbox are kept: exact floats, exact integers, or floats scaled by
+    # 10 ** coordinate_decimals and rounded
+    FLOAT = 0
+    INT = 1
+    SCALED = 2
+
+
+class DeltaEncoder(object):
+    """
+    Encodes the frames of a DetectionStore as keyframes and deltas, one record (a json line) per frame:
+
+    - keyframe `{"k": frame_id, "n": [...]}` every `keyframe_interval` frames: every bbox in full.
+    - delta `{"d": frame_id, ...}` against the previous frame, with only what changed:
+      "n": bboxes that are new (or can not be expressed as a delta), `[bbox_id, kind, top, left, width, height,
+      labels]`; "u": moved or relabeled bboxes, `[bbox_id, d_top, d_left, d_width, d_height(, labels)]`;
+      "r": removed bbox ids; "o": the bbox order, only when it is not the previous order plus the new bboxes.
+
+    Labels are `[[category code, confidence], ...]`; category names are sent once, in "c", the first time a code
+    is used. Bboxes with integer coordinates (what the detector logs) and exact confidences are lossless; with
+    `coordinate_decimals` float coordinates are rounded to integers of 10 ** -decimals, and with
+    `confidence_decimals` confidences are too, so small changes stop producing updates.
+    """
+
+    def __init__(self, keyframe_interval: int = DeltaMeta.KEYFRAME_INTERVAL, coordinate_decimals: int = None,
+                 confidence_decimals: int = None):
+        self.keyframe_interval = max(keyframe_interval, 1)
+        self.coordinate_decimals = coordinate_decimals
+        self.confidence_decimals = confidence_decimals
+
+    def header(self, video_details: dict):
+        return {'video_details': video_details,
+                'encoding': DeltaMeta.ENCODING,
+                'version': DeltaMeta.VERSION,
+                'keyframe_interval': self.keyframe_interval,
+                'coordinate_decimals': self.coordinate_decimals,
+                'confidence_decimals': self.confidence_decimals}
+
+    def _coordinates(self, store, row: int):
+        if store.int_coords[row] == ALL_INT_COORDS:
+            return DeltaMeta.INT, store.coordinates(row)
+        if self.coordinate_decimals is not None:
+            scale = 10 ** self.coordinate_decimals
+            values = (store.top[row], store.left[row], store.width[row], store.height[row])
+            return DeltaMeta.SCALED, tuple(int(round(v * scale)) for v in values)
+        # the coordinates given as integers stay integers
+        return DeltaMeta.FLOAT, store.coordinates(row)
+
+    def _labels(self, store, row: int, codes: list):
+        start = row * store.label_stride
+        end = start + store.label_counts[row]
+        if self.confidence_decimals is not None:
+            scale = 10 ** self.confidence_decimals
+            confidences = [int(round(confidence * scale)) for confidence in store.label_confidences[start:end]]
+        else:
+            confidences = [store.confidence(slot) for slot in range(start, end)]
+        return tuple(zip([codes[code] for code in store.label_codes[start:end]], confidences))
+
+    def _iter_frames(self, store, segments):
+        # (store, frame_id, rows) of the spilled segments (oldest first) and then of the store in memory
+        for part in iter_parts(store, segments):
+            for frame_id, rows in part.frames.items():
+                yield part, frame_id, rows
+
+    def iter_records(self, store, segments=()):
+        """
+        Yields one record (a dict) per frame, in frame order. `segments` are stores with older frames of the same
+        log (see `retention.SpilledSegments`); their category codes are translated to the codes of the file.
+        """
+        previous = {}
+        previous_order = []
+        file_codes = {}
+        part_codes = None
+        part = None
+        for i, (frame_store, frame_id, rows) in enumerate(self._iter_frames(store, segments)):
+            if frame_store is not part:
+                part = frame_store
+                # codes of this store -> codes of the file, filled in the first time a code is used
+                part_codes = _CodeTable(part.categories, file_codes)
+            keyframe = i % self.keyframe_interval == 0
+            current = {}
+            new, updated = [], []
+            for bbox_id, row in rows.items():
+                kind, coordinates = self._coordinates(part, row)
+                labels = self._labels(part, row, part_codes)
+                current[bbox_id] = (kind, coordinates, labels)
+                before = None if keyframe else previous.get(bbox_id)
+                if before is None or before[0] != kind or kind == DeltaMeta.FLOAT and (
+                        before[1] != coordinates or list(map(type, before[1])) != list(map(type, coordinates))):
+                    new.append([bbox_id, kind, *coordinates, [list(label) for label in labels]])
+                    continue
+                if before[1] == coordinates and before[2] == labels:
+                    continue
+                entry = [bbox_id] + [value - value_before for value, value_before in zip(coordinates, before[1])]
+                if before[2] != labels:
+                    entry.append([list(label) for label in labels])
+                updated.append(entry)
+
+            record = {'k' if keyframe else 'd': frame_id}
+            if part_codes.new:
+                record['c'] = part_codes.new
+                part_codes.new = []
+            if new:
+                record['n'] = new
+            if updated:
+                record['u'] = updated
+            order = list(rows)
+            if not keyframe:
+                removed = [bbox_id for bbox_id in previous_order if bbox_id not in current]
+                if removed:
+                    record['r'] = removed
+                expected = [bbox_id for bbox_id in previous_order if bbox_id in current] + \
+                           [entry[0] for entry in new if entry[0] not in previous]
+                if expected != order:
+                    record['o'] = order
+            previous, previous_order = current, order
+            yield record
+
+
+class _CodeTable(object):
+    # translates the category codes of one store to the codes of a file; names new to the file are kept in `new`
+    def __init__(self, categories: list, file_codes: dict):
+        self.categories = categories
+        self.file_codes = file_codes
+        self.codes = {}
+        self.new = []
+
+    def __getitem__(self, code: int):
+        file_code = self.codes.get(code)
+        if file_code is None:
+            category = self.categories[code]
+            file_code = self.file_codes.get(category)
+            if file_code is None:
+                file_code = self.file_codes[category] = len(self.file_codes)
+                self.new.append(category)
+            self.codes[code] = file_code
+        return file_code
+
+
+def iter_decoded_frames(records):
+    """
+    Decodes the records written by `DeltaEncoder` (the header first, a skipped frames record may follow the
+    frames) and yields ('video_details', dict), ('frame', frame dict) and ('skipped_frames', list) items.
+    """
+    records = iter(records)
+    header = next(records)
+    if header.get('encoding') != DeltaMeta.ENCODING or header.get('version') != DeltaMeta.VERSION:
+        raise ValueError("not a delta encoded log of version {}".format(DeltaMeta.VERSION))
+    yield 'video_details', header['video_details']
+    coordinate_scale = 10 ** (header['coordinate_decimals'] or 0)
+    confidence_scale = 10 ** header['confidence_decimals'] if header['confidence_decimals'] is not None else None
+    categories = []
+    bboxes = {}
+    order = []
+    for record in records:
+        if 'skipped_frames' in record:
+            yield 'skipped_frames', record['skipped_frames']
+            continue
+        categories.extend(record.get('c', ()))
+        keyframe = 'k' in record
+        frame_id = record['k'] if keyframe else record['d']
+        if keyframe:
+            bboxes, order = {}, []
+        for bbox_id in record.get('r', ()):
+            del bboxes[bbox_id]
+        order = [bbox_id for bbox_id in order if bbox_id in bboxes]
+        for bbox_id, kind, top, left, width, height, labels in record.get('n', ()):
+            if bbox_id not in bboxes:
+                order.append(bbox_id)
+            bboxes[bbox_id] = [kind, [top, left, width, height], labels]
+        for entry in record.get('u', ()):
+            bbox = bboxes[entry[0]]
+            bbox[1] = [value + delta for value, delta in zip(bbox[1], entry[1:5])]
+            if len(entry) > 5:
+                bbox[2] = entry[5]
+        if 'o' in record:
+            order = record['o']
+
+        frame_bboxes = []
+        for bbox_id in order:
+            kind, coordinates, labels = bboxes[bbox_id]
+            if kind == DeltaMeta.SCALED:
+                coordinates = [value / coordinate_scale for value in coordinates]
+            frame_bboxes.append({'labels': [{'category': categories[code],
+                                             'confidence': confidence if confidence_scale is None else
+                                             confidence / confidence_scale} for code, confidence in labels],
+                                 'bbox_id': bbox_id,
+                                 'top': coordinates[0],
+                                 'left': coordinates[1],
+                                 'width': coordinates[2],
+                                 'height': coordinates[3]})
+        yield 'frame', {'frame_id': frame_id, 'bboxes': frame_bboxes}
+
+
+def read_records(path: str):
+    with open(path, 'rb') as file:
+        for line in file:
+            yield json.loads(line)
+
+
+def decode_records(records):
+    # the log of delta encoded records in the schema of `JsonParser.output()`
+    output = {'frames': []}
+    for kind, value in iter_decoded_frames(records):
+        if kind == 'frame':
+            output['frames'].append(value)
+        else:
+            output[kind] = value
+    return {key: output[key] for key in ('video_details', 'frames', 'skipped_frames') if key in output}
+
+
+def decode_delta(path: str):
+    return decode_records(read_records(path))
+
+
+def delta_to_json(delta_name: str, json_name: str):
+    with open(json_name, 'w') as file:
+        json.dump(decode_delta(delta_name), file)
@@ -1,9 +1,15 @@
-import json
 from os import makedirs
-from os.path import exists, join
-from bunch import bunchify
+from os.path import exists, getsize, join
+from time import monotonic, perf_counter
 from datetime import datetime
 
+from json_parser.storage import DetectionStore, iter_parts
+from json_parser.metrics import Metrics
+from json_parser.retention import RetentionPolicy, SpilledSegments
+from json_parser.serializers import Serializer, get_serializer
+from json_parser.sinks import JsonLinesSink, SinkMeta
+from json_parser.writers import AsyncWriter, WriterMeta
+
 
 class JsonMeta(object):
     HOURS = 4
@@ -23,6 +29,9 @@ class BaseJsonParser(object):
         # returns dicts of objects
         out = {}
         for k, v in self.__dict__.items():
+            if k.startswith('_'):
+                # private attributes (e.g. indexes) are not part of the output
+                continue
             if hasattr(v, 'dic'):
                 out[k] = v.dic()
             elif isinstance(v, list):
@@ -78,72 +87,336 @@ class Bbox(BaseJsonParser):
         self.height = values['height']
 
 
+class StoredBbox(Bbox):
+    """
+    A bbox logged in a JsonParser, returned by `JsonParser.find_bbox`. It reads and writes the store: changing the
+    coordinates (`set_xywh_tuple`, `set_xywh_dict` or the attributes) or adding a label changes the logged
+    detections, as the Bbox objects of the old object model did.
+    """
+
+    def __init__(self, json_parser, frame_id: int, bbox_id: int):
+        self._json_parser = json_parser
+        self._frame_id = frame_id
+        self._bbox_id = bbox_id
+
+    def _row(self):
+        # looked up on every access: the store of the parser is replaced when a window is written
+        return self._json_parser._bbox_row(self._frame_id, self._bbox_id)
+
+    def _coordinate(index: int):
+        def get(self):
+            return self._json_parser.store.coordinates(self._row())[index]
+
+        def set(self, value):
+            row = self._row()
+            values = list(self._json_parser.store.coordinates(row))
+            values[index] = value
+            self._json_parser.store.set_coordinates(row, *values)
+        return property(get, set)
+
+    top = _coordinate(0)
+    left = _coordinate(1)
+    width = _coordinate(2)
+    height = _coordinate(3)
+    del _coordinate
+
+    @property
+    def bbox_id(self):
+        return self._bbox_id
+
+    @property
+    def labels(self):
+        return [Label(category, confidence) for category, confidence in self._json_parser.store.labels(self._row())]
+
+    def add_label(self, category, confidence):
+        self._json_parser.add_label_to_bbox(self._frame_id, self._bbox_id, category, confidence)
+
+    def set_xywh_tuple(self, values: tuple):
+        self._json_parser.store.set_coordinates(self._row(), *values)
+
+    def set_xywh_dict(self, values: dict):
+        self.set_xywh_tuple((values['top'], values['left'], values['width'], values['height']))
+
+    def dic(self):
+        return self._json_parser.store.bbox_dict(self._row())
+
+
 class Frame(BaseJsonParser):
     def __init__(self, frame_id: int):
         self.frame_id = frame_id
         self.bboxes = []
+        # bbox_id -> Bbox, kept in sync with `bboxes` so lookups do not scan the frame.
+        self._bbox_index = {}
+
+    @classmethod
+    def from_dict(cls, frame: dict):
+        # materializes one frame of the output schema (an item of `JsonParser.output()['frames']`).
+        result = cls(frame['frame_id'])
+        for bbox in frame['bboxes']:
+            result.add_bbox(bbox['bbox_id'], bbox['top'], bbox['left'], bbox['width'], bbox['height'])
+            added = result.find_bbox(bbox['bbox_id'])
+            for label in bbox['labels']:
+                added.add_label(label['category'], label['confidence'])
+        return result
+
+    def has_bbox(self, bbox_id: int):
+        return bbox_id in self._bbox_index
+
+    def find_bbox(self, bbox_id: int):
+        return self._bbox_index.get(bbox_id)
 
     def add_bbox(self, bbox_id: int, top: int, left: int, width: int, height: int):
-        bboxes_ids = [bbox.bbox_id for bbox in self.bboxes]
-        if bbox_id not in bboxes_ids:
-            self.bboxes.append(Bbox(bbox_id, top, left, width, height))
+        if bbox_id not in self._bbox_index:
+            bbox = Bbox(bbox_id, top, left, width, height)
+            self.bboxes.append(bbox)
+            self._bbox_index[bbox_id] = bbox
         else:
             raise ValueError("Frame with id: {} already has a Bbox with id: {}".format(self.frame_id, bbox_id))
 
 
 class JsonParser:
+    """
+    Keeps the detections of a video and writes them out in the json format (see `output`).
+
+    Detections are kept in a columnar `DetectionStore` instead of Frame/Bbox/Label objects, so a long window of
+    frames costs a few typed arrays rather than millions of small python objects.
+    """
+
     def __init__(self, top_k_labels: int = 1):
-        self.frames = {}
+        self.store = DetectionStore(label_stride=top_k_labels)
         self.video_details = dict(frame_width=None,
                                   frame_height=None,
                                   frame_rate=None,
                                   video_name=None)
         self.top_k_labels = top_k_labels
         self.start_time = datetime.now()
+        self.writer = None
+        self.sink = None
+        self.serializer = get_serializer()
+        # runs of frames that were never analysed, see `add_skipped_frames`
+        self.skipped_frames = []
+        self.metrics = Metrics()
+        # frames of the window moved out of memory by the retention policy, see `set_retention`
+        self.retention = None
+        self.segments = SpilledSegments()
+        self._store_started = None
+
+    def set_metrics(self, metrics: Metrics):
+        # shares one metrics registry, e.g. with the detector pipeline; Metrics(enabled=False) turns them off.
+        self.metrics = metrics
+
+    def set_retention(self, max_frames: int = None, max_bytes: int = None, max_age: float = None, spill_path=None):
+        """
+        Bounds the memory of a window: when a new frame is added and the frames in memory reach `max_frames`,
+        an estimated `max_bytes` or are older than `max_age` seconds, they are spilled to a segment file in
+        `spill_path` (a temporary directory by default). The outputs stitch the segments and the frames in memory
+        together, so they are the same as without a limit. Bboxes and labels can only be added to the frames in
+        memory; the frames are spilled when a new frame is added, so the latest frame always is.
+        """
+        self.retention = RetentionPolicy(max_frames=max_frames, max_bytes=max_bytes, max_age=max_age)
+        self.segments.spill_path = spill_path
+
+    def spill(self):
+        # moves the frames in memory to a new segment
+        if not self.store.frames:
+            return
+        self.metrics.count('spilled_frames', len(self.store.frames))
+        with self.metrics.time('spill'):
+            self.segments.spill(self.store, self.top_k_labels)
+        self.store = DetectionStore(label_stride=self.store.label_stride)
+        self._store_started = None
+
+    def memory_bytes(self):
+        # estimated bytes of the frames in memory (spilled segments are not counted)
+        return self.store.memory_estimate()
+
+    def set_metrics_output(self, output_name: str = None, seconds: float = 60):
+        """
+        Emits a metrics snapshot every `seconds` (checked on every `add_frame`): appended to `output_name` as JSON
+        Lines or, without a name, written into the log stream as a `{"metrics": {...}}` record (see
+        `set_stream_output`).
+        """
+        if output_name is None and self.sink is None:
+            raise ValueError("metrics can only go into the log stream when the output is streamed")
+        callback = None if output_name is not None else \
+            lambda snapshot: self.sink.write_record({'metrics': snapshot}, self.video_details)
+        self.metrics.set_output(output_name, interval=seconds, callback=callback)
+
+    def set_serializer(self, name):
+        """
+        One of `serializers.SERIALIZERS`; falls back to the stdlib json backend if the package is missing. A
+        configured Serializer can be passed as well, e.g. `DeltaSerializer(confidence_decimals=2)`.
+        """
+        self.serializer = name if isinstance(name, Serializer) else get_serializer(name)
+
+    @classmethod
+    def from_output(cls, output: dict, top_k_labels: int = None):
+        """
+        Rebuilds a JsonParser from a dict in the format of `output()` (e.g. a json file written by `json_output`).
+        `output['frames']` may be any iterable of frames. top_k_labels defaults to the number of labels of the
+        first bbox.
+        """
+        json_parser = cls(top_k_labels=0 if top_k_labels is None else top_k_labels)
+        json_parser.video_details.update(output['video_details'])
+        for frame in output['frames']:
+            if json_parser.frame_exists(frame['frame_id']):
+                raise ValueError("Frame id: {} already exists".format(frame['frame_id']))
+            if top_k_labels is None and frame['bboxes']:
+                top_k_labels = len(frame['bboxes'][0]['labels'])
+                json_parser.set_top_k(top_k_labels)
+            json_parser.store.add_frame_dict(frame)
+        for run in output.get('skipped_frames', []):
+            json_parser.add_skipped_frames(**run)
+        return json_parser
+
+    @classmethod
+    def load(cls, path, top_k_labels: int = None):
+        """
+        Loads saved logs into a JsonParser. `path` is a .json, .jsonl, .jpdb or .jdelta file, a directory of them
+        (e.g. the windows written by `schedule_output`) or a list of both; files are merged in name (= time) order.
+        Use `loader.LogReader` to open large logs without loading every frame.
+        """
+        from json_parser.loader import LogReader
+        with LogReader(path) as reader:
+            return reader.to_parser(top_k_labels=top_k_labels)
+
+    def get_frame(self, frame_id: int):
+        # materializes one logged frame as Frame/Bbox/Label objects (a copy).
+        if frame_id in self.segments:
+            return Frame.from_dict(self.segments.frame_dict(frame_id))
+        if not self.frame_exists(frame_id):
+            raise ValueError("frame with frame_id: {} does not exist".format(frame_id))
+        return Frame.from_dict(self.store.frame_dict(frame_id))
+
+    def build_index(self, first_frame_id: int = 0):
+        # query index over the logged detections (a snapshot), see `query.DetectionIndex`.
+        from json_parser.query import DetectionIndex
+        return DetectionIndex.from_store(self._merged_store(), self.video_details, first_frame_id)
 
     def set_top_k(self, value):
         self.top_k_labels = value
+        self.store.reserve_labels(value)
 
     def frame_exists(self, frame_id: int):
-        return frame_id in self.frames.keys()
+        return self.store.frame_exists(frame_id) or frame_id in self.segments
 
     def add_frame(self, frame_id: int):
         # Use this function to add frames with index.
         if not self.frame_exists(frame_id):
-            self.frames[frame_id] = Frame(frame_id)
+            # a new frame means the previous ones are complete
+            if self.sink is not None:
+                self.stream_frames()
+            elif self.retention is not None and self.retention.exceeded(self.store, self._store_started):
+                self.spill()
+            if not self.store.frames:
+                self._store_started = monotonic()
+            self.store.add_frame(frame_id)
+            self.metrics.gauge('memory_bytes', self.store.memory_estimate())
+            self.metrics.frame()
         else:
             raise ValueError("Frame id: {} already exists".format(frame_id))
 
     def bbox_exists(self, frame_id, bbox_id):
-        bboxes = []
-        if self.frame_exists(frame_id=frame_id):
-            bboxes = [bbox.bbox_id for bbox in self.frames[frame_id].bboxes]
-        return bbox_id in bboxes
+        return self.store.bbox_row(frame_id, bbox_id) is not None
+
+    def _frame_bboxes(self, frame_id: int):
+        # the bboxes of a frame in memory; spilled frames are on disk and can not be changed any more.
+        bboxes = self.store.frames.get(frame_id)
+        if bboxes is None:
+            if frame_id in self.segments:
+                raise ValueError("frame with frame_id: {} is spilled and can not be changed".format(frame_id))
+            raise ValueError("frame with frame_id: {} does not exist".format(frame_id))
+        return bboxes
 
-    def find_bbox(self, frame_id: int, bbox_id: int):
-        if not self.bbox_exists(frame_id, bbox_id):
+    def _bbox_row(self, frame_id: int, bbox_id: int):
+        row = self.store.bbox_row(frame_id, bbox_id)
+        if row is None:
+            if frame_id in self.segments:
+                self._frame_bboxes(frame_id)
             raise ValueError("frame with id: {} does not contain bbox with id: {}".format(frame_id, bbox_id))
-        bboxes = {bbox.bbox_id: bbox for bbox in self.frames[frame_id].bboxes}
-        return bboxes.get(bbox_id)
+        return row
+
+    def find_bbox(self, frame_id: int, bbox_id: int):
+        # the bbox as a StoredBbox: changes made through it change the logged detections.
+        self._bbox_row(frame_id, bbox_id)
+        return StoredBbox(self, frame_id, bbox_id)
 
     def add_bbox_to_frame(self, frame_id: int, bbox_id: int, top: int, left: int, width: int, height: int):
-        if self.frame_exists(frame_id):
-            frame = self.frames[frame_id]
-            if not self.bbox_exists(frame_id, bbox_id):
-                frame.add_bbox(bbox_id, top, left, width, height)
-            else:
-                raise ValueError(
-                    "frame with frame_id: {} already contains the bbox with id: {} ".format(frame_id, bbox_id))
-        else:
-            raise ValueError("frame with frame_id: {} does not exist".format(frame_id))
+        # the per-frame bbox index of the store is used for both checks, so inserting is O(1).
+        bboxes = self._frame_bboxes(frame_id)
+        if bbox_id in bboxes:
+            raise ValueError(
+                "frame with frame_id: {} already contains the bbox with id: {} ".format(frame_id, bbox_id))
+        self.store.add_bbox(frame_id, bbox_id, top, left, width, height)
+        self.metrics.count('boxes')
 
     def add_label_to_bbox(self, frame_id: int, bbox_id: int, category: str, confidence: float):
-        bbox = self.find_bbox(frame_id, bbox_id)
-        if not bbox.labels_full(self.top_k_labels):
-            bbox.add_label(category, confidence)
+        row = self._bbox_row(frame_id, bbox_id)
+        if self.store.label_count(row) < self.top_k_labels:
+            self.store.add_label(row, category, confidence)
         else:
             raise ValueError("labels in frame_id: {}, bbox_id: {} is fulled".format(frame_id, bbox_id))
 
+    def add_detections(self, frame_id: int, boxes_xywh, bbox_ids=None, class_ids=None, confidences=None,
+                       label_names=None):
+        """
+        Logs all detections of one frame in one call.
+
+        boxes_xywh: (n, 4) array of top, left, width, height (e.g. the boxes kept by `cv2.dnn.NMSBoxes`).
+        bbox_ids: (n,) ids of the bboxes, defaults to 0..n-1.
+        class_ids, confidences: (n,) or (n, k) arrays with the top-k labels of each bbox.
+        label_names: maps class ids to categories (e.g. the list of coco names), defaults to str(class_id).
+        """
+        import numpy as np
+        existing = self._frame_bboxes(frame_id)
+        boxes = np.asarray(boxes_xywh).reshape(-1, 4)
+        n = len(boxes)
+        bbox_ids = np.arange(n) if bbox_ids is None else np.asarray(bbox_ids).reshape(-1)
+        if n == 0:
+            # e.g. nothing survived NMS; numpy can not reshape empty arrays to (0, -1)
+            if len(bbox_ids) or any(a is not None and np.size(a) for a in (class_ids, confidences)):
+                raise ValueError("boxes, bbox_ids, class_ids and confidences of frame_id: {} do not have matching "
+                                 "shapes".format(frame_id))
+            self.metrics.observe('boxes_per_frame', 0)
+            return
+        class_ids = np.zeros((n, 0), dtype=int) if class_ids is None else np.asarray(class_ids).reshape(n, -1)
+        confidences = np.zeros((n, 0)) if confidences is None else np.asarray(confidences).reshape(n, -1)
+        if len(bbox_ids) != n or class_ids.shape != confidences.shape:
+            raise ValueError("boxes, bbox_ids, class_ids and confidences of frame_id: {} do not have matching "
+                             "shapes".format(frame_id))
+        self.metrics.observe('boxes_per_frame', n)
+
+        start = perf_counter()
+        ids, counts = np.unique(bbox_ids, return_counts=True)
+        repeated = ids[counts > 1].tolist() + [bbox_id for bbox_id in ids.tolist() if bbox_id in existing]
+        if repeated:
+            raise ValueError(
+                "frame with frame_id: {} already contains the bbox with id: {} ".format(frame_id, repeated[0]))
+        if class_ids.shape[1] > self.top_k_labels:
+            raise ValueError("labels in frame_id: {}, bbox_id: {} is fulled".format(frame_id, bbox_ids[0]))
+
+        classes, inverse = np.unique(class_ids, return_inverse=True)
+        names = [label_names[c] if label_names is not None else str(c) for c in classes.tolist()]
+        table = np.array([self.store.category_code(name) for name in names], dtype=np.int32)
+        codes = table[inverse.reshape(-1)].reshape(class_ids.shape) if len(classes) else class_ids
+        self.store.add_bboxes(frame_id, bbox_ids, boxes, codes, confidences)
+        self.metrics.add_time('log_insert', perf_counter() - start)
+        self.metrics.count('boxes', n)
+
+    def add_skipped_frames(self, first: int, last: int = None, reason: str = 'step', step: int = None):
+        """
+        Records that the frames first..last (inclusive) were never analysed, e.g. skipped by `--step` or by the
+        adaptive scheduler, with the reason and the step in effect. A run that continues the previous one with the
+        same reason and step is merged into it. The runs are written as `skipped_frames` in the output.
+        """
+        last = first if last is None else last
+        if self.skipped_frames:
+            previous = self.skipped_frames[-1]
+            if previous['last'] + 1 == first and previous['reason'] == reason and previous['step'] == step:
+                previous['last'] = last
+                return
+        self.skipped_frames.append({'first': first, 'last': last, 'reason': reason, 'step': step})
+
     def add_video_details(self, frame_width, frame_height, frame_rate, video_name):
         self.video_details['frame_width'] = frame_width
         self.video_details['frame_height'] = frame_height
@@ -152,32 +425,176 @@ class JsonParser:
 
     def output(self):
         output = {'video_details': self.video_details}
-        result = list(self.frames.values())
+        self.check_labels()
+        output['frames'] = [frame for part in iter_parts(self.store, self.segments)
+                            for frame in part.iter_frame_dicts()]
+        if self.skipped_frames:
+            output['skipped_frames'] = self.skipped_frames
+        return output
 
+    def check_labels(self):
         # Every bbox in each frame has to have `top_k_labels` number of labels otherwise error raises.
-        for frame in result:
-            for bbox in frame.bboxes:
-                if not bbox.labels_full(self.top_k_labels):
-                    raise ValueError(
-                        "labels in frame_id: {}, bbox_id: {} is not fulled before outputting.".format(frame.frame_id,
-                                                                                                      bbox.bbox_id))
-
-        output['frames'] = [item.dic() for item in result]
-        return output
+        incomplete = self.segments.incomplete() or self.store.first_incomplete(self.top_k_labels)
+        if incomplete is not None:
+            raise ValueError("labels in frame_id: {}, bbox_id: {} is not fulled before outputting.".format(*incomplete))
 
     def object_output(self):
-        output = bunchify(self)
+        # bunch is only needed here, so it is imported on the first call
+        from bunch import bunchify
+        output = bunchify(self.output())
         return output
 
     def json_output(self, output_name):
-        if not output_name.endswith('.json'):
-            output_name += '.json'
-        with open(output_name, 'w') as file:
-            json.dump(self.output(), file)
+        # writes the output with the serializer, straight from the store (the output dict is never built).
+        extension = self.serializer.extension
+        if not output_name.endswith(extension):
+            output_name += extension
+        self.check_labels()
+        start = perf_counter()
+        writing = 0.0
+        written = 0
+        with open(output_name, 'wb') as file:
+            for chunk in self.serializer.iter_output(self.store, self.video_details, self.skipped_frames,
+                                                     self.segments):
+                chunk_start = perf_counter()
+                file.write(chunk)
+                writing += perf_counter() - chunk_start
+                written += len(chunk)
+        # the time spent in the serializer and in file writes, measured separately
+        self.metrics.add_time('serialize', perf_counter() - start - writing)
+        self.metrics.add_time('disk_write', writing)
+        self.metrics.count('bytes_written', written)
+        self.metrics.count('outputs')
+
+    def binary_output(self, output_name):
+        # writes the detections in the compact binary format, see `binary.write_binary` and `BinaryLogReader`.
+        from json_parser.binary import BinaryMeta, write_binary
+        if not output_name.endswith(BinaryMeta.EXTENSION):
+            output_name += BinaryMeta.EXTENSION
+        self.check_labels()
+        with self.metrics.time('binary_output'):
+            write_binary(self._merged_store(), self.video_details, self.top_k_labels, output_name,
+                         self.skipped_frames)
+        self.metrics.count('bytes_written', getsize(output_name))
+        self.metrics.count('outputs')
+
+    def _merged_store(self):
+        # the store in memory, or one store with the spilled segments in front of it (for the binary format and
+        # the query index, which need the whole window at once)
+        if not len(self.segments):
+            return self.store
+        merged = DetectionStore(label_stride=self.store.label_stride)
+        for part in iter_parts(self.store, self.segments):
+            merged.extend(part)
+        return merged
 
     def set_start(self):
         self.start_time = datetime.now()
 
+    def set_async_output(self, max_queue: int = WriterMeta.MAX_QUEUE, policy: str = WriterMeta.BLOCK,
+                         spill_path=None):
+        """
+        Makes `schedule_output` hand finished windows to a background writer thread instead of writing them in
+        the calling thread. See `AsyncWriter` for the backpressure policies.
+        """
+        self.close(write_remaining=False)
+        self.writer = AsyncWriter(max_queue=max_queue, policy=policy, spill_path=spill_path)
+
+    def set_stream_output(self, output_path=JsonMeta.PATH_TO_SAVE, seconds: int = 60, max_bytes: int = None,
+                          buffer_size: int = SinkMeta.BUFFER_SIZE, fsync: str = SinkMeta.ROTATE):
+        """
+        Streams every frame to JSON Lines files as soon as the next frame is added, so only the frame being
+        logged is kept in memory. Files are rotated by age (`seconds`) and size (`max_bytes`) instead of by
+        `schedule_output`. See `JsonLinesSink`.
+        """
+        self.close(write_remaining=False)
+        self.sink = JsonLinesSink(output_path, seconds=seconds, max_bytes=max_bytes, buffer_size=buffer_size,
+                                  fsync=fsync, serializer=self.serializer)
+
+    def stream_frames(self):
+        # writes the logged frames to the sink and removes them from memory.
+        self.check_labels()
+        start = perf_counter()
+        written = self.sink.bytes_written
+        for frame_id in self.store.frames:
+            self.sink.write_frame(self.store, frame_id, self.video_details)
+        if self.skipped_frames:
+            self.sink.write_record({'skipped_frames': self.skipped_frames}, self.video_details)
+            self.skipped_frames = []
+        self.store.clear()
+        self.metrics.add_time('stream_write', perf_counter() - start)
+        self.metrics.count('bytes_written', self.sink.bytes_written - written)
+
+    def flush(self):
+        # waits until the background writer has written every window handed to it.
+        self.metrics.count('flushes')
+        if self.writer is not None:
+            self.writer.flush()
+        if self.sink is not None:
+            self.sink.flush()
+
+    def has_window(self):
+        # is there anything in the current window to write: frames in memory or spilled, or runs of skipped frames
+        return bool(self.store.frames or len(self.segments) or self.skipped_frames)
+
+    def close(self, write_remaining: bool = True, output_path=JsonMeta.PATH_TO_SAVE):
+        """
+        Drains and stops the background writer, after handing it the window in progress (to `output_path`, like
+        `output_window`) unless write_remaining is False. Streams the last frame and closes the stream.
+        """
+        if self.writer is not None:
+            try:
+                if write_remaining and self.has_window():
+                    self.output_window(output_path)
+            finally:
+                writer, self.writer = self.writer, None
+                writer.close()
+        if self.sink is not None:
+            self.stream_frames()
+            sink, self.sink = self.sink, None
+            sink.close()
+
+    def discard_segments(self):
+        # removes the spilled segments of a window once it is written (called by the AsyncWriter)
+        self.segments.discard()
+
+    def detach_window(self):
+        """
+        Moves the logged detections into a new JsonParser and leaves this one empty. Nothing is copied; the
+        columns of the store are handed over as they are.
+        """
+        self.check_labels()
+        window = JsonParser(top_k_labels=self.top_k_labels)
+        window.store, self.store = self.store, DetectionStore(label_stride=self.store.label_stride)
+        window.video_details = dict(self.video_details)
+        window.serializer = self.serializer
+        window.start_time = self.start_time
+        window.skipped_frames, self.skipped_frames = self.skipped_frames, []
+        window.metrics = self.metrics
+        window.segments, self.segments = self.segments, SpilledSegments(self.segments.spill_path)
+        self._store_started = None
+        return window
+
+    def window_name(self, output_path=JsonMeta.PATH_TO_SAVE):
+        # the file of the current window: named after its start time, in `output_path` (created if missing).
+        output_name = self.start_time.strftime('%Y-%m-%d %H-%M-%S') + self.serializer.extension
+        makedirs(output_path, exist_ok=True)
+        return join(output_path, output_name)
+
+    def output_window(self, output_path=JsonMeta.PATH_TO_SAVE):
+        # writes the current window to `output_path` (named after its start time) and starts a new window.
+        output = self.window_name(output_path)
+        self.metrics.count('windows')
+        if self.writer is not None:
+            self.writer.submit(output, self.detach_window())
+        else:
+            self.json_output(output_name=output)
+            self.store.clear()
+            self.skipped_frames = []
+            self.segments.discard()
+            self._store_started = None
+        self.start_time = datetime.now()
+
     def schedule_output(self, output_path=JsonMeta.PATH_TO_SAVE, hours: int = 0, minutes: int = 0, seconds: int = 60):
         end = datetime.now()
         interval = 0
@@ -186,14 +603,11 @@ class JsonParser:
         interval += min([seconds, JsonMeta.SECONDS])
         diff = (end - self.start_time).seconds
 
+        if self.sink is not None:
+            # when streaming, frames are already on disk and the sink rotates the files itself.
+            return
         if diff > interval:
-            output_name = self.start_time.strftime('%Y-%m-%d %H-%M-%S') + '.json'
-            output = join(output_path, output_name)
-            if not exists(output_path):
-                makedirs(output_path)
-            self.json_output(output_name=output)
-            self.frames.clear()
-            self.start_time = datetime.now()
+            self.output_window(output_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,324 @@
+import json
+import re
+from collections import OrderedDict
+from importlib import import_module
+from mmap import mmap, ACCESS_READ
+from os import listdir
+from os.path import isdir, join, splitext
+
+from json_parser.binary import BinaryLogReader, BinaryMeta
+from json_parser.delta import DeltaMeta, iter_decoded_frames, read_records
+from json_parser.json_parser import Frame, JsonParser
+from json_parser.serializers import MsgpackSerializer
+from json_parser.sinks import SinkMeta
+
+
+class LoaderMeta(object):
+    JSON = '.json'
+    JSON_LINES = SinkMeta.EXTENSION
+    BINARY = BinaryMeta.EXTENSION
+    DELTA = DeltaMeta.EXTENSION
+    MSGPACK = MsgpackSerializer.extension
+    EXTENSIONS = (JSON, JSON_LINES, BINARY, DELTA, MSGPACK)
+    # every serializer writes frame_id first, so the id of a JSON Lines record is read without parsing it.
+    FRAME_ID = re.compile(rb'^\{"frame_id": ?(-?\d+)')
+    # and the frames of a .json file are found without decoding them.
+    FRAME_START = re.compile(rb'\{\s*"frame_id"\s*:\s*(-?\d+)')
+    JSON_CHUNK = 1 << 12
+    # files a LogReader keeps open at once; the others are reopened when their frames are read
+    OPEN_FILES = 16
+
+
+def log_files(path):
+    """
+    Returns the log files in `path` (a file, a directory or a list of both), sorted by name. Files written by
+    `schedule_output` and the stream sink are named by their start time, so this is also the time order.
+    """
+    if isinstance(path, (list, tuple)):
+        return [file for item in path for file in log_files(item)]
+    if isdir(path):
+        return [join(path, name) for name in sorted(listdir(path))
+                if splitext(name)[1] in LoaderMeta.EXTENSIONS]
+    return [path]
+
+
+class _FileSource(object):
+    """
+    A log file that is only open while it is read: the `index` of the subclass finds the frames when the source is
+    made and the file is closed again; `LogReader` opens it on demand when its frames are asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.video_details = None
+        self.skipped_frames = []
+        self.frames = {}
+        self.open()
+        try:
+            self.index()
+        finally:
+            self.close()
+
+    def open(self):
+        if self.file is None:
+            self.file = open(self.path, 'rb')
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class _JsonSource(_FileSource):
+    # a .json file, mapped instead of read. Frames are found by the frame_id every serializer writes first and only
+    # their byte spans are kept; a frame is decoded when it is asked for.
+    def __init__(self, path):
+        self.buffer = None
+        self.decoder = json.JSONDecoder()
+        super().__init__(path)
+
+    def open(self):
+        # the map keeps its own descriptor, so the file itself is closed right away
+        if self.buffer is None:
+            with open(self.path, 'rb') as file:
+                self.buffer = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+    def index(self):
+        index = self.buffer.find(b'{') + 1
+        while True:
+            index = self._skip(index, b' \n\r\t,')
+            if self.buffer[index] == ord('}'):
+                break
+            key, index = self._decode(index)
+            index = self._skip(index, b' \n\r\t:')
+            if key != 'frames':
+                value, index = self._decode(index)
+                if key == 'video_details':
+                    self.video_details = value
+                elif key == 'skipped_frames':
+                    self.skipped_frames = value
+                continue
+            index = self._skip(index, b' \n\r\t[')
+            while self.buffer[index] != ord(']'):
+                frame_id, end = self._scan_frame(index)
+                self.frames[frame_id] = (index, end)
+                index = self._skip(end, b' \n\r\t,')
+            index += 1
+
+    def _skip(self, index, characters):
+        while self.buffer[index] in characters:
+            index += 1
+        return index
+
+    def _decode(self, index):
+        # decodes the value at `index` from a growing chunk of the file, returns it with the offset of its end
+        size = LoaderMeta.JSON_CHUNK
+        while True:
+            chunk = self.buffer[index:index + size].decode('utf-8', 'ignore')
+            last = index + size >= len(self.buffer)
+            try:
+                value, end = self.decoder.raw_decode(chunk)
+                if end < len(chunk) or last:
+                    return value, index + len(chunk[:end].encode())
+            except ValueError:
+                if last:
+                    raise
+            size *= 4
+
+    def _scan_frame(self, index):
+        # a frame ends at the last brace before the next frame; the last one is decoded to find its end
+        match = LoaderMeta.FRAME_START.match(self.buffer, index)
+        following = match and LoaderMeta.FRAME_START.search(self.buffer, match.end())
+        if following:
+            return int(match.group(1)), self.buffer.rfind(b'}', index, following.start()) + 1
+        frame, end = self._decode(index)
+        return frame['frame_id'], end
+
+    def frame_dict(self, frame_id):
+        start, end = self.frames[frame_id]
+        return json.loads(self.buffer[start:end])
+
+
+class _JsonLinesSource(_FileSource):
+    # a .jsonl file; only the offset of every line is kept.
+    def index(self):
+        self.video_details = json.loads(self.file.readline())['video_details']
+        offset = self.file.tell()
+        for line in self.file:
+            match = LoaderMeta.FRAME_ID.match(line)
+            if match:
+                self.frames[int(match.group(1))] = offset
+            else:
+                record = json.loads(line)
+                if 'frame_id' in record:
+                    self.frames[record['frame_id']] = offset
+                else:
+                    self.skipped_frames.extend(record.get('skipped_frames', []))
+            offset += len(line)
+
+    def frame_dict(self, frame_id):
+        self.file.seek(self.frames[frame_id])
+        return json.loads(self.file.readline())
+
+
+class _BinarySource(_FileSource):
+    def open(self):
+        if self.file is None:
+            self.file = BinaryLogReader(self.path)
+
+    def index(self):
+        self.video_details = self.file.video_details
+        self.skipped_frames = self.file.skipped_frames
+        self.frames = dict.fromkeys(self.file.frame_ids.tolist())
+
+    def frame_dict(self, frame_id):
+        return self.file.frame_dict(frame_id)
+
+
+class _MsgpackSource(_FileSource):
+    # a .msgpack file; frames are skipped over when the file is indexed, only the offset of every frame is kept.
+    def __init__(self, path):
+        try:
+            self.msgpack = import_module('msgpack')
+        except ImportError:
+            raise ImportError("reading {} needs the msgpack package".format(path))
+        super().__init__(path)
+
+    def index(self):
+        unpacker = self.msgpack.Unpacker(self.file, raw=False)
+        for _ in range(unpacker.read_map_header()):
+            key = unpacker.unpack()
+            if key != 'frames':
+                value = unpacker.unpack()
+                if key == 'video_details':
+                    self.video_details = value
+                elif key == 'skipped_frames':
+                    self.skipped_frames = value
+                continue
+            for _ in range(unpacker.read_array_header()):
+                offset = unpacker.tell()
+                frame_id = None
+                for _ in range(unpacker.read_map_header()):
+                    if unpacker.unpack() == 'frame_id':
+                        frame_id = unpacker.unpack()
+                    else:
+                        unpacker.skip()
+                self.frames[frame_id] = offset
+
+    def frame_dict(self, frame_id):
+        self.file.seek(self.frames[frame_id])
+        return self.msgpack.Unpacker(self.file, raw=False).unpack()
+
+
+class _DeltaSource(object):
+    # a delta encoded file; frames depend on the ones before them, so the file is decoded (and closed) when it is
+    # opened and the frames stay in memory.
+    def __init__(self, path):
+        self.video_details = None
+        self.skipped_frames = []
+        self.frames = {}
+        for kind, value in iter_decoded_frames(read_records(path)):
+            if kind == 'frame':
+                self.frames[value['frame_id']] = value
+            else:
+                setattr(self, kind, value)
+
+    def open(self):
+        pass
+
+    def frame_dict(self, frame_id):
+        return self.frames[frame_id]
+
+    def close(self):
+        pass
+
+
+SOURCES = {LoaderMeta.JSON: _JsonSource, LoaderMeta.JSON_LINES: _JsonLinesSource, LoaderMeta.BINARY: _BinarySource,
+           LoaderMeta.DELTA: _DeltaSource, LoaderMeta.MSGPACK: _MsgpackSource}
+
+
+class LogReader(object):
+    """
+    Opens saved logs (.json, .jsonl, .jpdb, .jdelta or .msgpack files or directories of them) without materializing
+    the frames. Only the location of every frame is indexed; `frame` and `frame_dict` decode one frame when asked for.
+    Several files (e.g. the rotated windows of `schedule_output`) are merged into one timeline in file order.
+    """
+
+    def __init__(self, path):
+        self.files = log_files(path)
+        self.sources = []
+        self.frame_sources = {}
+        self._open_sources = OrderedDict()
+        self.video_details = None
+        self.skipped_frames = []
+        for file in self.files:
+            extension = splitext(file)[1]
+            if extension not in SOURCES:
+                raise ValueError("{} is not one of the log formats {}".format(file, LoaderMeta.EXTENSIONS))
+            source = SOURCES[extension](file)
+            self.sources.append(source)
+            if self.video_details is None:
+                self.video_details = source.video_details
+            self.skipped_frames.extend(source.skipped_frames)
+            for frame_id in source.frames:
+                if frame_id in self.frame_sources:
+                    raise ValueError("Frame id: {} already exists".format(frame_id))
+                self.frame_sources[frame_id] = source
+
+    def __len__(self):
+        return len(self.frame_sources)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for source in self._open_sources:
+            source.close()
+        self._open_sources.clear()
+
+    def _open(self, source):
+        # keeps the `LoaderMeta.OPEN_FILES` most recently read sources open, so a directory of many windows does not
+        # run out of file descriptors
+        if source in self._open_sources:
+            self._open_sources.move_to_end(source)
+            return source
+        source.open()
+        self._open_sources[source] = None
+        if len(self._open_sources) > LoaderMeta.OPEN_FILES:
+            self._open_sources.popitem(last=False)[0].close()
+        return source
+
+    @property
+    def frame_ids(self):
+        return list(self.frame_sources)
+
+    def frame_dict(self, frame_id: int):
+        source = self.frame_sources.get(frame_id)
+        if source is None:
+            raise ValueError("frame with frame_id: {} does not exist".format(frame_id))
+        return self._open(source).frame_dict(frame_id)
+
+    def frame(self, frame_id: int):
+        return Frame.from_dict(self.frame_dict(frame_id))
+
+    def iter_frame_dicts(self, frame_ids=None):
+        for frame_id in self.frame_ids if frame_ids is None else frame_ids:
+            yield self.frame_dict(frame_id)
+
+    def to_parser(self, frame_ids=None, top_k_labels: int = None):
+        """
+        Loads the frames (all of them or `frame_ids`) into a JsonParser. top_k_labels defaults to the number of
+        labels of the first bbox.
+        """
+        return JsonParser.from_output({'video_details': self.video_details,
+                                       'frames': self.iter_frame_dicts(frame_ids),
+                                       'skipped_frames': self.skipped_frames}, top_k_labels=top_k_labels)
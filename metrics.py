@@ -0,0 +1,256 @@
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from math import frexp, ldexp
+from time import perf_counter
+
+
+class MetricsMeta(object):
+    EXTENSION = '.metrics.jsonl'
+    # histogram buckets are powers of two; values below 2 ** MIN_EXPONENT (~1 µs as seconds) share the first one
+    MIN_EXPONENT = -20
+    MAX_EXPONENT = 40
+    PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram(object):
+    """
+    Count, sum, min, max and power of two buckets of the observed values; percentiles are read from the buckets,
+    so they are exact up to a factor of 2. Adding a value is a frexp and a few additions.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (MetricsMeta.MAX_EXPONENT - MetricsMeta.MIN_EXPONENT + 1)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        exponent = frexp(value)[1] if value > 0 else MetricsMeta.MIN_EXPONENT
+        self.buckets[min(max(exponent, MetricsMeta.MIN_EXPONENT), MetricsMeta.MAX_EXPONENT) -
+                     MetricsMeta.MIN_EXPONENT] += 1
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float):
+        # upper bound of the bucket holding the value at `fraction`, capped by the largest value seen
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(ldexp(1.0, index + MetricsMeta.MIN_EXPONENT), self.max)
+        return self.max
+
+    def summary(self):
+        summary = {'count': self.count, 'total': self.total, 'mean': self.mean(), 'min': self.min, 'max': self.max}
+        for fraction in MetricsMeta.PERCENTILES:
+            summary['p{}'.format(int(fraction * 100))] = self.percentile(fraction)
+        return summary
+
+
+class Profiler(object):
+    """
+    Opt-in capture window: cProfile (of the thread that starts it) and/or tracemalloc for `frames` calls of
+    `tick`, then the stats are written next to `output_name` (.prof for cProfile, .tracemalloc.txt for the top
+    allocations).
+    """
+
+    def __init__(self, output_name: str, frames: int = 300, cpu: bool = True, memory: bool = False, top: int = 25):
+        self.output_name = output_name
+        self.frames = frames
+        self.cpu = cpu
+        self.memory = memory
+        self.top = top
+        self.remaining = frames
+        self.files = []
+        self._profile = None
+        if cpu:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        if memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    @property
+    def running(self):
+        return self.remaining > 0
+
+    def tick(self):
+        # returns True when this call ended the window
+        if self.remaining <= 0:
+            return False
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.stop()
+            return True
+        return False
+
+    def stop(self):
+        self.remaining = 0
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.output_name + '.prof')
+            self.files.append(self.output_name + '.prof')
+            self._profile = None
+        if self.memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                with open(self.output_name + '.tracemalloc.txt', 'w') as file:
+                    file.write('current: {} bytes, peak: {} bytes\n'.format(current, peak))
+                    for stat in snapshot.statistics('lineno')[:self.top]:
+                        file.write('{}\n'.format(stat))
+                self.files.append(self.output_name + '.tracemalloc.txt')
+
+
+class Metrics(object):
+    """
+    Stage timers, counters, gauges and histograms shared by the threads of a process.
+
+        metrics = Metrics()
+        with metrics.time('forward'):
+            outputs = net.forward(ln)
+        metrics.count('boxes', len(idxs))
+        metrics.gauge('memory_bytes', json_parser.memory_bytes())
+        metrics.snapshot()
+
+    A timer is a histogram of seconds. Every update takes one lock, so the metrics can stay on in production;
+    `enabled=False` turns every call into a no-op. `snapshot` returns everything as one json-ready dict and
+    `maybe_snapshot` emits one every `interval` seconds to `output_name` (appended as JSON Lines) or to a callback
+    (e.g. the log stream of a JsonParser).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counters = {}
+        self.gauges = {}
+        self.timers = {}
+        self.histograms = {}
+        self.start = perf_counter()
+        self.interval = None
+        self.output_name = None
+        self.callback = None
+        self.last_snapshot = self.start
+        self.profiler = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # windows spilled by the async writer are pickled with their metrics; the copy is not shared any more.
+        state = dict(self.__dict__)
+        del state['_lock']
+        state['callback'] = state['profiler'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        # the last value of something, e.g. the memory held by a window
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[name] = value
+
+    def _add(self, histograms: dict, name: str, value: float):
+        with self._lock:
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = Histogram()
+            histogram.add(value)
+
+    def add_time(self, name: str, seconds: float):
+        if self.enabled:
+            self._add(self.timers, name, seconds)
+
+    def observe(self, name: str, value: float):
+        if self.enabled:
+            self._add(self.histograms, name, value)
+
+    @contextmanager
+    def time(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self.timers, name, perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.timers = {}
+            self.histograms = {}
+            self.start = perf_counter()
+
+    def snapshot(self):
+        with self._lock:
+            return {'time': datetime.now().isoformat(),
+                    'uptime': perf_counter() - self.start,
+                    'counters': dict(self.counters),
+                    'gauges': dict(self.gauges),
+                    'timers': {name: timer.summary() for name, timer in self.timers.items()},
+                    'histograms': {name: histogram.summary() for name, histogram in self.histograms.items()}}
+
+    def set_output(self, output_name: str = None, interval: float = 60, callback=None):
+        """
+        Emits a snapshot every `interval` seconds (checked by `maybe_snapshot`): appended to `output_name` as one
+        JSON line and/or handed to `callback(snapshot)`.
+        """
+        self.output_name = output_name
+        self.interval = interval
+        self.callback = callback
+        self.last_snapshot = perf_counter()
+
+    def maybe_snapshot(self):
+        # cheap when no snapshot is due: one perf_counter call
+        if not self.enabled or self.interval is None or perf_counter() - self.last_snapshot < self.interval:
+            return None
+        return self.emit()
+
+    def emit(self):
+        self.last_snapshot = perf_counter()
+        snapshot = self.snapshot()
+        if self.output_name is not None:
+            with open(self.output_name, 'a') as file:
+                file.write(json.dumps(snapshot))
+                file.write('\n')
+        if self.callback is not None:
+            self.callback(snapshot)
+        return snapshot
+
+    def start_profile(self, output_name: str, frames: int = 300, cpu: bool = True, memory: bool = False):
+        # opt-in capture window over the next `frames` calls of `frame`, see `Profiler`
+        self.profiler = Profiler(output_name, frames=frames, cpu=cpu, memory=memory)
+        return self.profiler
+
+    def frame(self):
+        # called once per frame: counts it, advances the capture window and emits a due snapshot
+        self.count('frames')
+        if self.profiler is not None and self.profiler.tick():
+            self.profiler = None
+        self.maybe_snapshot()
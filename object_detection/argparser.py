@@ -1,7 +1,9 @@
 import argparse
 
+from json_parser.writers import WriterMeta
 
-def parser():
+
+def parser(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("-i", "--input",
                     type=str,
@@ -15,6 +17,25 @@ def parser():
                     type=int,
                     default=4,
                     help='indicates how many frames have to be skipped in between')
+    ap.add_argument("--adaptive",
+                    action="store_true",
+                    help="raise the step while inference can not keep up with --target-fps")
+    ap.add_argument("--target-fps",
+                    type=float,
+                    default=None,
+                    help="frames of the input per second to keep up with (defaults to the frame rate of the video)")
+    ap.add_argument("--max-step",
+                    type=int,
+                    default=30,
+                    help="largest step the adaptive and motion based skipping may reach")
+    ap.add_argument("--motion-threshold",
+                    type=float,
+                    default=None,
+                    help="skip frames whose mean pixel difference to the last analysed frame is below this value")
+    ap.add_argument("-b", "--batch-size",
+                    type=int,
+                    default=1,
+                    help="number of analysed frames sent through the network in one forward pass")
     ap.add_argument("-y", "--yolo",
                     default='yolo-coco',
                     help="base path to YOLO directory")
@@ -26,9 +47,42 @@ def parser():
                     type=float,
                     default=0.3,
                     help="threshold when applyong non-maxima suppression")
+    ap.add_argument("-k", "--top-k",
+                    type=int,
+                    default=1,
+                    help="number of labels logged for every box")
     ap.add_argument("-u", "--use-gpu",
                     type=bool,
                     default=0,
                     help="boolean indicating if CUDA GPU should be used")
-    args = ap.parse_args()
+    ap.add_argument("-w", "--workers",
+                    type=int,
+                    default=2,
+                    help="number of inference threads, each with its own network")
+    ap.add_argument("--queue-size",
+                    type=int,
+                    default=8,
+                    help="size of the queues between the pipeline stages")
+    ap.add_argument("--write-policy",
+                    type=str,
+                    default=WriterMeta.BLOCK,
+                    choices=WriterMeta.POLICIES,
+                    help="what happens when the json writer falls behind: wait (block), keep the windows on disk "
+                         "(spill) or lose the oldest pending window (drop_oldest)")
+    ap.add_argument("--metrics-interval",
+                    type=float,
+                    default=60,
+                    help="seconds between two metrics snapshots")
+    ap.add_argument("--metrics-file",
+                    type=str,
+                    default=None,
+                    help="JSON Lines file the metrics snapshots are appended to (defaults to the output dir)")
+    ap.add_argument("--profile-frames",
+                    type=int,
+                    default=0,
+                    help="profile the first N logged frames with cProfile")
+    ap.add_argument("--profile-memory",
+                    action="store_true",
+                    help="trace memory allocations with tracemalloc during the profiled frames")
+    args = ap.parse_args(argv)
     return args
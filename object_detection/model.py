@@ -0,0 +1,71 @@
+import threading
+from functools import lru_cache
+from os.path import join
+
+
+class ModelMeta(object):
+    NAMES = 'coco.names'
+    CONFIG = 'yolov3.cfg'
+    WEIGHTS = 'yolov3.weights'
+
+
+class ModelFactory(object):
+    """
+    Reads the files of a YOLO directory once and builds networks from them.
+
+    The labels, the config and the weights are read on first use (or by `preload`) and kept in memory, so every
+    inference worker builds its own net (a cv2.dnn net can not be shared between threads) without going back to
+    the disk. Worker processes forked after `preload` share the buffers copy-on-write and only build their nets.
+    cv2 and numpy are imported by `create`, so the factory is cheap to make.
+    """
+
+    def __init__(self, yolo_path: str, use_gpu: bool = False):
+        self.yolo_path = yolo_path
+        self.use_gpu = use_gpu
+        self._labels = None
+        self._buffers = None
+        self._lock = threading.Lock()
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            with open(join(self.yolo_path, ModelMeta.NAMES)) as file:
+                self._labels = file.read().strip().split("\n")
+        return self._labels
+
+    def buffers(self):
+        # (config, weights) as bytes; read once, whichever worker asks first
+        with self._lock:
+            if self._buffers is None:
+                with open(join(self.yolo_path, ModelMeta.CONFIG), 'rb') as config, \
+                        open(join(self.yolo_path, ModelMeta.WEIGHTS), 'rb') as weights:
+                    self._buffers = config.read(), weights.read()
+        return self._buffers
+
+    def preload(self):
+        # reads everything now, e.g. before forking worker processes
+        self.labels
+        self.buffers()
+        return self
+
+    def create(self):
+        # a new net and the names of its output layers
+        import cv2
+        import numpy as np
+        config, weights = self.buffers()
+        net = cv2.dnn.readNetFromDarknet(np.frombuffer(config, dtype=np.uint8), np.frombuffer(weights, dtype=np.uint8))
+
+        if self.use_gpu:
+            # set CUDA as the preferable backend and target
+            net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+
+        ln = net.getLayerNames()
+        ln = [ln[i - 1] for i in np.asarray(net.getUnconnectedOutLayers()).flatten()]
+        return net, ln
+
+
+@lru_cache(maxsize=None)
+def get_factory(yolo_path: str, use_gpu: bool = False):
+    # one factory per YOLO directory in a process; forked children inherit it with whatever it has read
+    return ModelFactory(yolo_path, use_gpu)
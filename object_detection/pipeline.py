@@ -0,0 +1,206 @@
+import heapq
+import threading
+from queue import Queue, Full
+from time import perf_counter
+
+
+class PipelineMeta(object):
+    # seconds the decoder waits on a full queue before it checks whether any inference worker is left
+    POLL = 0.1
+
+
+class StageMeter(object):
+    """
+    Counts the items of one pipeline stage and the time the stage spent working on them; every item is also
+    added to the timer of the stage in `metrics`, if given.
+    """
+
+    def __init__(self, name: str, metrics=None):
+        self.name = name
+        self.metrics = metrics
+        self.count = 0
+        self.busy = 0.0
+        self.start = None
+        self.end = None
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, count: int = 1):
+        with self._lock:
+            if self.start is None:
+                self.start = perf_counter() - seconds
+            self.count += count
+            self.busy += seconds
+            self.end = perf_counter()
+        if self.metrics is not None:
+            self.metrics.add_time(self.name, seconds)
+
+    def elapsed(self):
+        return (self.end - self.start) if self.start is not None else 0.0
+
+    def fps(self):
+        elapsed = self.elapsed()
+        return self.count / elapsed if elapsed else 0.0
+
+    def __str__(self):
+        return "[INFO] {:<12} frames: {:6d}  FPS: {:7.2f}  busy: {:7.2f} s".format(self.name, self.count, self.fps(),
+                                                                                 self.busy)
+
+
+class Pipeline(object):
+    """
+    Runs decode -> inference -> post-processing/logging -> video writing as threads connected by bounded queues.
+
+    read():                  returns (ret, frame) like `cv2.VideoCapture.read`; runs on the decoder thread.
+    make_infer():            called once on every inference worker; returns infer(frames) -> a list with the
+                             outputs of every frame. Every worker builds its own network here since a `cv2.dnn`
+                             net can not be shared between threads.
+    postprocess(frame_id, frame, outputs): runs on one thread in frame order (NMS, drawing, JsonParser logging)
+                             and returns the frame to write.
+    write(frame):            runs on the writer thread.
+    step:                    only every `step`-th frame is analysed, like `--step`.
+    batch_size:              number of analysed frames handed to infer in one call.
+    progress():              optional, called for every frame read.
+    select(frame_id, frame): optional, replaces `step`; returns whether a frame is analysed. Runs on the decoder
+                             thread (see `FrameScheduler`).
+    observe(seconds, count): optional, called by the inference workers with the time of every batch.
+    metrics:                 optional `metrics.Metrics`; gets the time of every stage item as a timer of the stage.
+    """
+
+    def __init__(self, read, make_infer, postprocess, write, workers: int = 2, queue_size: int = 8, step: int = 1,
+                 batch_size: int = 1, progress=None, select=None, observe=None, metrics=None):
+        self.read = read
+        self.make_infer = make_infer
+        self.postprocess = postprocess
+        self.write = write
+        self.workers = workers
+        self.step = 1 if step == 0 else step
+        self.batch_size = max(batch_size, 1)
+        self.progress = progress
+        self.select = select
+        self.observe = observe
+        self.frames = Queue(maxsize=queue_size)
+        self.results = Queue(maxsize=queue_size)
+        self.outputs = Queue(maxsize=queue_size)
+        self.meters = {name: StageMeter(name, metrics) for name in ('decode', 'inference', 'postprocess', 'write')}
+        self._error = None
+        self._lock = threading.Lock()
+        self._running_workers = workers
+
+    def _guard(self, function, *args):
+        # keeps the first exception of a thread so that `run` can raise it.
+        try:
+            function(*args)
+        except Exception as error:
+            self._error = self._error or error
+
+    def _decode(self):
+        frame_counter = 0
+        sequence = 0
+        batch = []
+        try:
+            while self._error is None:
+                start = perf_counter()
+                ret, frame = self.read()
+                if not ret:
+                    break
+                frame_counter += 1
+                if self.progress is not None:
+                    self.progress()
+                if self.select(frame_counter, frame) if self.select is not None else frame_counter % self.step == 0:
+                    self.meters['decode'].add(perf_counter() - start)
+                    batch.append((sequence, frame_counter, frame))
+                    sequence += 1
+                    if len(batch) == self.batch_size:
+                        if not self._put_frames(batch):
+                            return
+                        batch = []
+            if batch:
+                self._put_frames(batch)
+        finally:
+            for _ in range(self.workers):
+                if not self._put_frames(None):
+                    break
+
+    def _put_frames(self, item):
+        # gives up once no inference worker is left to take the item, e.g. when make_infer failed on all of them
+        while True:
+            try:
+                self.frames.put(item, timeout=PipelineMeta.POLL)
+                return True
+            except Full:
+                if not self._running_workers:
+                    return False
+
+    def _infer(self):
+        try:
+            infer = self.make_infer()
+            while True:
+                batch = self.frames.get()
+                if batch is None:
+                    break
+                start = perf_counter()
+                outputs = infer([frame for _, _, frame in batch])
+                elapsed = perf_counter() - start
+                self.meters['inference'].add(elapsed, count=len(batch))
+                if self.observe is not None:
+                    self.observe(elapsed, len(batch))
+                for (sequence, frame_id, frame), frame_outputs in zip(batch, outputs):
+                    self.results.put((sequence, frame_id, frame, frame_outputs))
+        finally:
+            with self._lock:
+                self._running_workers -= 1
+            self.results.put(None)
+
+    def _postprocess(self):
+        # restores the frame order before logging, since the workers finish in any order.
+        pending = []
+        expected = 0
+        finished = 0
+        try:
+            while finished < self.workers:
+                item = self.results.get()
+                if item is None:
+                    finished += 1
+                    continue
+                heapq.heappush(pending, (item[0], item[1:]))
+                while pending and pending[0][0] == expected:
+                    _, (frame_id, frame, outputs) = heapq.heappop(pending)
+                    start = perf_counter()
+                    frame = self.postprocess(frame_id, frame, outputs)
+                    self.meters['postprocess'].add(perf_counter() - start)
+                    self.outputs.put(frame)
+                    expected += 1
+        except Exception as error:
+            self._error = self._error or error
+        finally:
+            self.outputs.put(None)
+            # after an error, drains the results so that no worker stays blocked
+            while finished < self.workers:
+                finished += self.results.get() is None
+
+    def _write(self):
+        # keeps draining the queue after an error so that post-processing never blocks on it.
+        while True:
+            frame = self.outputs.get()
+            if frame is None:
+                break
+            if self._error is not None:
+                continue
+            start = perf_counter()
+            self._guard(self.write, frame)
+            self.meters['write'].add(perf_counter() - start)
+
+    def run(self):
+        threads = [threading.Thread(target=self._guard, args=(self._decode,), name='decode')]
+        threads += [threading.Thread(target=self._guard, args=(self._infer,), name='inference-{}'.format(i))
+                    for i in range(self.workers)]
+        threads.append(threading.Thread(target=self._write, name='write'))
+        for thread in threads:
+            thread.start()
+        # post-processing runs on the calling thread
+        self._postprocess()
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.meters
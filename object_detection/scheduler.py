@@ -0,0 +1,117 @@
+import threading
+from math import ceil
+
+import numpy as np
+
+
+class SchedulerMeta(object):
+    STEP = 'step'
+    LOAD = 'load'
+    STATIC = 'static'
+    # width in pixels of the thumbnail the motion score is computed on
+    THUMBNAIL_WIDTH = 64
+
+
+class FrameScheduler(object):
+    """
+    Decides which frames are analysed and keeps the runs of skipped frames for the log.
+
+    step:             analyse every `step`-th frame, like `--step`. With adaptive=False the selection is exactly the
+                      one of `frame_counter % step == 0`.
+    adaptive:         the step is raised while inference can not keep up with `target_fps` (frames of the source per
+                      second) and lowered again when it can, by at most 1 per observed batch, between `step` and
+                      `max_step`. The per frame cost is a moving average of the inference time over `workers`.
+    motion_threshold: frames whose mean absolute difference to the last analysed frame (on a grayscale thumbnail,
+                      0-255) is below the threshold are skipped as well, but never more than `max_step` in a row.
+
+    `select` runs on the decoder thread and `observe` on the inference workers (see `Pipeline`). `pop_skipped`
+    returns the skipped runs as {'first', 'last', 'reason', 'step'} dicts for `JsonParser.add_skipped_frames`.
+    """
+
+    def __init__(self, step: int = 1, adaptive: bool = False, target_fps: float = None, max_step: int = 30,
+                 motion_threshold: float = None, workers: int = 1, smoothing: float = 0.2):
+        self.min_step = max(step, 1)
+        self.max_step = max(max_step, self.min_step)
+        self.step = self.min_step
+        self.adaptive = adaptive and bool(target_fps)
+        self.target_fps = target_fps
+        self.motion_threshold = motion_threshold
+        self.workers = max(workers, 1)
+        self.smoothing = smoothing
+        self.frame_cost = None
+        self.last_selected = 0
+        self.selected = 0
+        self.skipped = 0
+        self._thumbnail = None
+        self._runs = []
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, count: int = 1):
+        # inference time of `count` frames
+        if not self.adaptive or count <= 0:
+            return
+        with self._lock:
+            cost = seconds / count / self.workers
+            self.frame_cost = cost if self.frame_cost is None else \
+                self.smoothing * cost + (1 - self.smoothing) * self.frame_cost
+            wanted = min(max(ceil(self.frame_cost * self.target_fps), self.min_step), self.max_step)
+            if wanted > self.step:
+                self.step += 1
+            elif wanted < self.step:
+                self.step -= 1
+
+    def motion(self, frame):
+        # mean absolute difference of the thumbnail to the one of the last analysed frame
+        thumbnail = self._make_thumbnail(frame)
+        if self._thumbnail is None or thumbnail.shape != self._thumbnail.shape:
+            return float('inf')
+        return float(np.abs(thumbnail - self._thumbnail).mean())
+
+    @staticmethod
+    def _make_thumbnail(frame):
+        frame = np.asarray(frame)
+        stride = max(frame.shape[1] // SchedulerMeta.THUMBNAIL_WIDTH, 1)
+        thumbnail = frame[::stride, ::stride].astype(np.float32)
+        return thumbnail.mean(axis=2) if thumbnail.ndim == 3 else thumbnail
+
+    def select(self, frame_id: int, frame=None):
+        gap = frame_id - self.last_selected
+        step = self.step
+        if gap < step:
+            self._skip(frame_id, SchedulerMeta.STEP if step == self.min_step else SchedulerMeta.LOAD, step)
+            return False
+        if self.motion_threshold is not None and frame is not None and gap < self.max_step and \
+                self.motion(frame) < self.motion_threshold:
+            self._skip(frame_id, SchedulerMeta.STATIC, step)
+            return False
+        if self.motion_threshold is not None and frame is not None:
+            self._thumbnail = self._make_thumbnail(frame)
+        self.last_selected = frame_id
+        self.selected += 1
+        return True
+
+    def _skip(self, frame_id: int, reason: str, step: int):
+        self.skipped += 1
+        with self._lock:
+            if self._runs:
+                run = self._runs[-1]
+                if run['last'] + 1 == frame_id and run['reason'] == reason and run['step'] == step:
+                    run['last'] = frame_id
+                    return
+            self._runs.append({'first': frame_id, 'last': frame_id, 'reason': reason, 'step': step})
+
+    def pop_skipped(self, until: int = None):
+        # the skipped runs before frame `until` (all of them if None); a run crossing `until` is split
+        with self._lock:
+            if until is None:
+                runs, self._runs = self._runs, []
+                return runs
+            runs = []
+            while self._runs and self._runs[0]['first'] < until:
+                run = self._runs[0]
+                if run['last'] < until:
+                    runs.append(self._runs.pop(0))
+                else:
+                    runs.append(dict(run, last=until - 1))
+                    run['first'] = until
+            return runs
@@ -0,0 +1,52 @@
+from collections import namedtuple
+
+import numpy as np
+
+Detections = namedtuple('Detections', ['boxes', 'confidences', 'class_ids', 'top_k_class_ids',
+                                       'top_k_confidences'])
+
+
+def decode_yolo_outputs(layerOutputs, W: int, H: int, conf: float, top_k: int = 1):
+    """
+    Decodes the outputs of the YOLO layers of one image, vectorized.
+
+    Every row of a YOLO output is (center x, center y, width, height, objectness, class scores...), relative to
+    the image. Rows whose best class score is above `conf` are kept and returned as:
+
+    boxes:              (n, 4) int array of x, y, width, height in pixels, ready for `cv2.dnn.NMSBoxes`.
+    confidences:        (n,) best class score of every box.
+    class_ids:          (n,) best class of every box.
+    top_k_class_ids:    (n, top_k) best classes of every box, highest score first.
+    top_k_confidences:  (n, top_k) their scores; both can go to `JsonParser.add_detections`.
+    """
+    detections = np.concatenate([np.asarray(output).reshape(-1, np.shape(output)[-1]) for output in layerOutputs])
+    scores = detections[:, 5:]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+
+    keep = confidences > conf
+    detections, scores, class_ids, confidences = detections[keep], scores[keep], class_ids[keep], confidences[keep]
+
+    box = (detections[:, 0:4] * np.array([W, H, W, H])).astype("int")
+    boxes = np.empty_like(box)
+    boxes[:, 0:2] = (box[:, 0:2] - box[:, 2:4] / 2).astype("int")
+    boxes[:, 2:4] = box[:, 2:4]
+
+    if top_k == 1:
+        top_k_class_ids = class_ids[:, None]
+    else:
+        top_k_class_ids = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        order = np.argsort(-np.take_along_axis(scores, top_k_class_ids, axis=1), axis=1, kind='stable')
+        top_k_class_ids = np.take_along_axis(top_k_class_ids, order, axis=1)
+    top_k_confidences = np.take_along_axis(scores, top_k_class_ids, axis=1)
+    return Detections(boxes, confidences, class_ids, top_k_class_ids, top_k_confidences)
+
+
+def split_batch_outputs(layerOutputs, batch_size: int):
+    """
+    Splits the outputs of one forward pass over `batch_size` images (`cv2.dnn.blobFromImages`) into the layer
+    outputs of every image. Depending on the OpenCV version the YOLO layers return (batch, rows, 85) or
+    (batch * rows, 85) arrays; both are handled.
+    """
+    per_layer = [np.asarray(output).reshape(batch_size, -1, np.shape(output)[-1]) for output in layerOutputs]
+    return [[output[i] for output in per_layer] for i in range(batch_size)]
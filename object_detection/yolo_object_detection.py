@@ -6,49 +6,98 @@
 # --output ../output_videos/yolo_janie.avi --yolo yolo-coco --display 0 --use-gpu 1
 from os.path import splitext, basename, join
 
-from imutils.video import FPS
-from tqdm import tqdm
 from json_parser.json_parser import JsonParser
+from json_parser.metrics import MetricsMeta
 from argparser import parser
+from model import get_factory
+from pipeline import Pipeline
+from scheduler import FrameScheduler
+from yolo_decode import decode_yolo_outputs, split_batch_outputs
 import numpy as np
-import cv2
 import os
 
 
-args = parser()
-labelsPath = os.path.sep.join([args.yolo, "coco.names"])
-LABELS = open(labelsPath).read().strip().split("\n")
-
-np.random.seed(42)
-COLORS = np.random.randint(0, 255, size=(len(LABELS), 3), dtype="uint8")
-weightsPath = os.path.sep.join([args.yolo, "yolov3.weights"])
-configPath = os.path.sep.join([args.yolo, "yolov3.cfg"])
-
-print("[INFO] loading YOLO from disk...")
-net = cv2.dnn.readNetFromDarknet(configPath, weightsPath)
-
-if args.use_gpu:
-    # set CUDA as the preferable backend and target
-    print("[INFO] setting preferable backend and target to CUDA...")
-    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
-
-ln = net.getLayerNames()
-ln = [ln[i[0] - 1] for i in net.getUnconnectedOutLayers()]
-
-# initialize the width and height of the frames in the video file
-W = None
-H = None
-writer = None
-json_logger = JsonParser(top_k_labels=1)
-
-
-print("[INFO] accessing video stream...")
-vs = cv2.VideoCapture()
-codec = cv2.VideoWriter_fourcc(*'XVID')
-fps = FPS().start()
+class Detector(object):
+    # the inference and postprocess steps of the pipeline; cv2 is imported when they first run
+    def __init__(self, args, factory, json_logger, scheduler):
+        self.args = args
+        self.factory = factory
+        self.labels = factory.labels
+        np.random.seed(42)
+        self.colors = np.random.randint(0, 255, size=(len(self.labels), 3), dtype="uint8")
+        self.json_logger = json_logger
+        self.metrics = json_logger.metrics
+        self.scheduler = scheduler
+
+    def make_infer(self):
+        # runs on every inference worker: a cv2.dnn net can not be shared between threads
+        import cv2
+        net, ln = self.factory.create()
+        metrics = self.metrics
+
+        def infer(frames):
+            with metrics.time('blob'):
+                blob = cv2.dnn.blobFromImages(frames, 1 / 255.0, (416, 416),
+                                              swapRB=True, crop=False)
+            net.setInput(blob)
+            with metrics.time('forward'):
+                layerOutputs = net.forward(ln)
+            return split_batch_outputs(layerOutputs, len(frames))
+        return infer
+
+    def postprocess(self, frame_counter, frame, layerOutputs):
+        import cv2
+        args, json_logger, metrics = self.args, self.json_logger, self.metrics
+        (H, W) = frame.shape[:2]
+        for run in self.scheduler.pop_skipped(until=frame_counter):
+            json_logger.add_skipped_frames(**run)
+        # add frame only when you are sure it can be read
+        json_logger.add_frame(frame_counter)
+
+        with metrics.time('decode_outputs'):
+            detections = decode_yolo_outputs(layerOutputs, W, H, args.confidence, top_k=args.top_k)
+        with metrics.time('nms'):
+            idxs = cv2.dnn.NMSBoxes(detections.boxes.tolist(), detections.confidences.tolist(), args.confidence,
+                                    args.threshold)
 
-if vs.open(args.input if args.input else 0):
+        if len(idxs) > 0:
+            idxs = np.asarray(idxs).flatten()
+            for i in idxs:
+                (x, y, w, h) = detections.boxes[i].tolist()
+                classID = detections.class_ids[i]
+
+                color = [int(c) for c in self.colors[classID]]
+                cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+                text = "{}: {:.4f}".format(self.labels[classID],
+                                           detections.confidences[i])
+                cv2.putText(frame, text, (x, y - 5),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+            json_logger.add_detections(frame_counter, detections.boxes[idxs], idxs,
+                                       detections.top_k_class_ids[idxs], detections.top_k_confidences[idxs],
+                                       self.labels)
+        json_logger.schedule_output(output_path=args.output_dir, seconds=5)
+        return frame
+
+
+def main(argv=None):
+    import cv2
+    from tqdm import tqdm
+
+    args = parser(argv)
+    # the config and weights are read once and shared by the inference workers
+    factory = get_factory(args.yolo, bool(args.use_gpu))
+
+    json_logger = JsonParser(top_k_labels=args.top_k)
+    metrics = json_logger.metrics
+    # windows are written by a background thread; dropping windows when it falls behind is opt-in
+    json_logger.set_async_output(policy=args.write_policy)
+
+    print("[INFO] accessing video stream...")
+    vs = cv2.VideoCapture()
+    codec = cv2.VideoWriter_fourcc(*'XVID')
+
+    if not vs.open(args.input if args.input else 0):
+        return
     property_id = int(cv2.CAP_PROP_FRAME_COUNT)
     total_frames = int(cv2.VideoCapture.get(vs, property_id))
 
@@ -58,78 +107,45 @@ if vs.open(args.input if args.input else 0):
     filename, extension = splitext(basename(args.input))
     output_path = join(args.output_dir, filename + '.avi')
     writer = cv2.VideoWriter(output_path, codec, fps_out, (width, height))
-    frame_counter = 0
     pbar = tqdm(total=total_frames + 1)
 
     json_logger.set_start()
-    json_logger.set_top_k(1)
+    json_logger.set_top_k(args.top_k)
     video_details = dict(frame_width=width, frame_height=height, frame_rate=fps_out, video_name=basename(args.input))
     json_logger.add_video_details(**video_details)
+    os.makedirs(args.output_dir, exist_ok=True)
+    json_logger.set_metrics_output(args.metrics_file or join(args.output_dir, filename + MetricsMeta.EXTENSION),
+                                   seconds=args.metrics_interval)
+    if args.profile_frames:
+        # postprocess runs on this thread, so cProfile sees logging and NMS; inference threads are not profiled
+        metrics.start_profile(join(args.output_dir, filename), frames=args.profile_frames,
+                              memory=args.profile_memory)
+
+    scheduler = FrameScheduler(step=args.step, adaptive=args.adaptive, target_fps=args.target_fps or fps_out,
+                               max_step=args.max_step, motion_threshold=args.motion_threshold, workers=args.workers)
+    print("[INFO] loading YOLO from disk with {} inference workers...".format(args.workers))
+    detector = Detector(args, factory.preload(), json_logger, scheduler)
+    pipeline = Pipeline(read=vs.read, make_infer=detector.make_infer, postprocess=detector.postprocess,
+                        write=writer.write, workers=args.workers, queue_size=args.queue_size,
+                        batch_size=args.batch_size, progress=lambda: pbar.update(1), select=scheduler.select,
+                        observe=scheduler.observe, metrics=metrics)
+    meters = pipeline.run()
+    # frames skipped after the last analysed one
+    for run in scheduler.pop_skipped():
+        json_logger.add_skipped_frames(**run)
+    # the last window, with the runs skipped above, then the windows still queued
+    if json_logger.has_window():
+        json_logger.output_window(args.output_dir)
+    json_logger.close()
+    writer.release()
+    pbar.close()
 
-    while vs.isOpened():
-        frame_counter += 1
-        ret, frame = vs.read()
-        if not ret:
-            break
-
-        if W is None or H is None:
-            (H, W) = frame.shape[:2]
-
-        step = 1 if args.step == 0 else args.step
-        if frame_counter % step == 0:
-
-            # add frame only when you are sure it can be read
-            json_logger.add_frame(frame_counter)
-            blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (416, 416),
-                                         swapRB=True, crop=False)
-            net.setInput(blob)
-            layerOutputs = net.forward(ln)
-
-            boxes = []
-            confidences = []
-            classIDs = []
-
-            for output in layerOutputs:
-                for detection in output:
-                    scores = detection[5:]
-                    classID = np.argmax(scores)
-                    confidence = scores[classID]
-
-                    if confidence > args.confidence:
-                        box = detection[0:4] * np.array([W, H, W, H])
-                        (centerX, centerY, width, height) = box.astype("int")
-
-                        x = int(centerX - (width / 2))
-                        y = int(centerY - (height / 2))
-
-                        boxes.append([x, y, int(width), int(height)])
-                        confidences.append(float(confidence))
-                        classIDs.append(classID)
+    for meter in meters.values():
+        print(meter)
+    metrics.emit()
+    print("[INFO] analysed {} frames, skipped {} (final step: {})".format(scheduler.selected, scheduler.skipped,
+                                                                          scheduler.step))
 
-            idxs = cv2.dnn.NMSBoxes(boxes, confidences, args.confidence,
-                                    args.threshold)
-
-            if len(idxs) > 0:
-                for i in idxs.flatten():
-                    (x, y) = (boxes[i][0], boxes[i][1])
-                    (w, h) = (boxes[i][2], boxes[i][3])
-
-                    color = [int(c) for c in COLORS[classIDs[i]]]
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                    text = "{}: {:.4f}".format(LABELS[classIDs[i]],
-                                               confidences[i])
-                    cv2.putText(frame, text, (x, y - 5),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                    json_logger.add_bbox_to_frame(frame_counter, int(i), x, y, w, h)
-                    json_logger.add_label_to_bbox(frame_counter, int(i), category=LABELS[classIDs[i]],
-                                                  confidence=confidences[i])
-            json_logger.schedule_output(output_path=args.output_dir, seconds=5)
-            writer.write(frame)
-            fps.update()
-        pbar.update(1)
-    # json_logger.json_output(output_name='output.json')
-    fps.stop()
-    pbar.close()
 
-    print("[INFO] elasped time: {:.2f}".format(fps.elapsed()))
-    print("[INFO] approx. FPS: {:.2f}".format(fps.fps()))
+if __name__ == '__main__':
+    main()
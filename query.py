@@ -0,0 +1,204 @@
+from os.path import splitext
+
+import numpy as np
+
+from json_parser.binary import BinaryLogReader, BinaryMeta
+
+
+class QueryResult(object):
+    """
+    Bboxes matched by a query. Only the row numbers are kept; the columns are read from the index when asked for.
+    """
+
+    def __init__(self, index, rows):
+        self.index = index
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def frame_ids(self):
+        return self.index.frame_ids[self.rows]
+
+    @property
+    def bbox_ids(self):
+        return self.index.bbox_ids[self.rows]
+
+    @property
+    def boxes(self):
+        # (n, 4) top, left, width, height
+        return self.index.boxes[self.rows]
+
+    @property
+    def codes(self):
+        return self.index.codes[self.rows]
+
+    @property
+    def confidences(self):
+        return self.index.confidences[self.rows]
+
+    def categories(self):
+        # (n, top_k) category names
+        return np.asarray(self.index.categories, dtype=object)[self.codes] if len(self.index.categories) else \
+            np.zeros(self.codes.shape, dtype=object)
+
+    def unique_frames(self):
+        return np.unique(self.frame_ids)
+
+
+class DetectionIndex(object):
+    """
+    Query index over logged detections.
+
+    - frame range index: rows sorted by frame_id, searched with `np.searchsorted`.
+    - category index: every label slot sorted by (category code, confidence), so the labels of a category above a
+      confidence threshold are one contiguous slice.
+
+    Filters without an index (geometry, or frames when a category is given) run vectorized on the candidates only.
+
+        index = DetectionIndex.load('jsons', first_frame_id=1)  # logs of the detector
+        result = index.query(category='truck', min_confidence=0.8, frame_range=(18000, 18150))
+        result.frame_ids, result.boxes
+
+    `first_frame_id` is the frame id at time 0 of the video, used to convert the `time_range` of a query: 0 when
+    frames are numbered from 0, 1 for the logs of the detector. It is not the first frame of the index, since a
+    window of a longer video starts later.
+    """
+
+    def __init__(self, frame_ids, bbox_ids, boxes, codes, confidences, categories, video_details=None,
+                 first_frame_id: int = 0):
+        self.frame_ids = np.asarray(frame_ids)
+        self.bbox_ids = np.asarray(bbox_ids)
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.codes = np.asarray(codes).reshape(len(self.frame_ids), -1)
+        self.confidences = np.asarray(confidences, dtype=np.float64).reshape(self.codes.shape)
+        self.categories = list(categories)
+        self.category_codes = {category: code for code, category in enumerate(self.categories)}
+        self.video_details = video_details or {}
+        self.first_frame_id = first_frame_id
+
+        self._by_frame = np.argsort(self.frame_ids, kind='stable')
+        self._sorted_frame_ids = self.frame_ids[self._by_frame]
+
+        slot_codes = self.codes.reshape(-1)
+        slot_confidences = self.confidences.reshape(-1)
+        valid = np.flatnonzero(slot_codes >= 0)
+        order = valid[np.lexsort((slot_confidences[valid], slot_codes[valid]))]
+        self._slot_rows = order // max(self.codes.shape[1], 1)
+        self._slot_codes = slot_codes[order]
+        self._slot_confidences = slot_confidences[order]
+        # the same slots sorted by confidence only, for thresholds without a category
+        by_confidence = np.argsort(self._slot_confidences, kind='stable')
+        self._confidence_rows = self._slot_rows[by_confidence]
+        self._sorted_confidences = self._slot_confidences[by_confidence]
+
+    @classmethod
+    def from_store(cls, store, video_details=None, first_frame_id: int = 0):
+        # copies the columns of a DetectionStore (numpy views would stop the store from growing).
+        stride = store.label_stride
+        n = len(store)
+        codes = np.frombuffer(store.label_codes, dtype=np.int32).reshape(n, stride).copy() if stride else \
+            np.zeros((n, 0), dtype=np.int32)
+        confidences = np.frombuffer(store.label_confidences, dtype=np.float64).reshape(n, stride).copy() \
+            if stride else np.zeros((n, 0))
+        boxes = np.stack([np.frombuffer(getattr(store, name), dtype=np.float64)
+                          for name in ('top', 'left', 'width', 'height')], axis=1) if n else np.zeros((0, 4))
+        return cls(np.frombuffer(store.frame_ids, dtype=np.int64).copy(),
+                   np.frombuffer(store.bbox_ids, dtype=np.int64).copy(),
+                   boxes, codes, confidences, store.categories, video_details, first_frame_id)
+
+    @classmethod
+    def from_reader(cls, reader: BinaryLogReader, first_frame_id: int = 0):
+        # uses the mmap views of a binary log; only the sort orders of the index are built in memory.
+        boxes = reader.boxes
+        return cls(boxes['frame_id'], boxes['bbox_id'],
+                   np.stack([boxes[name] for name in ('top', 'left', 'width', 'height')], axis=1),
+                   reader.codes, reader.confidences, reader.categories, reader.video_details, first_frame_id)
+
+    @classmethod
+    def load(cls, path, first_frame_id: int = 0):
+        # builds the index of saved logs (see `JsonParser.load`); .jpdb files are read through mmap.
+        if isinstance(path, str) and splitext(path)[1] == BinaryMeta.EXTENSION:
+            return cls.from_reader(BinaryLogReader(path), first_frame_id)
+        from json_parser.json_parser import JsonParser
+        json_parser = JsonParser.load(path)
+        return cls.from_store(json_parser.store, json_parser.video_details, first_frame_id)
+
+    def __len__(self):
+        return len(self.frame_ids)
+
+    def frame_rows(self, first: int, last: int):
+        # rows of the frames with first <= frame_id <= last
+        start = np.searchsorted(self._sorted_frame_ids, first, side='left')
+        end = np.searchsorted(self._sorted_frame_ids, last, side='right')
+        return np.sort(self._by_frame[start:end])
+
+    def category_rows(self, category: str, min_confidence: float = None):
+        # rows with a label of `category` (with confidence >= min_confidence)
+        code = self.category_codes.get(category)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        start, end = np.searchsorted(self._slot_codes, [code, code + 1])
+        if min_confidence is not None:
+            start += np.searchsorted(self._slot_confidences[start:end], min_confidence)
+        return np.unique(self._slot_rows[start:end])
+
+    def category_confidences(self, category: str):
+        # sorted confidences of every label of `category` (a view)
+        code = self.category_codes.get(category)
+        if code is None:
+            return np.zeros(0)
+        start, end = np.searchsorted(self._slot_codes, [code, code + 1])
+        return self._slot_confidences[start:end]
+
+    def time_to_frame(self, seconds: float):
+        frame_rate = self.video_details.get('frame_rate')
+        if not frame_rate:
+            raise ValueError("video_details has no frame_rate to convert times to frame ids")
+        return self.first_frame_id + int(seconds * frame_rate)
+
+    def query(self, category: str = None, min_confidence: float = None, frame_range: tuple = None,
+              time_range: tuple = None, min_area: float = None, max_area: float = None, region: tuple = None):
+        """
+        Returns the bboxes matching every given filter.
+
+        category / min_confidence: a label of `category` with confidence >= min_confidence (any category if None).
+        frame_range: (first, last) frame ids, inclusive. time_range: (start, end) seconds from the start of the
+        video, converted with video_details['frame_rate'].
+        min_area / max_area: width * height. region: (top, left, width, height) the bbox has to overlap.
+        """
+        if time_range is not None:
+            frame_range = (self.time_to_frame(time_range[0]), self.time_to_frame(time_range[1]))
+
+        if category is not None:
+            rows = self.category_rows(category, min_confidence)
+        elif min_confidence is not None:
+            start = np.searchsorted(self._sorted_confidences, min_confidence)
+            rows = np.unique(self._confidence_rows[start:])
+        else:
+            rows = None
+
+        if frame_range is not None:
+            if rows is None:
+                rows = self.frame_rows(*frame_range)
+            else:
+                frame_ids = self.frame_ids[rows]
+                rows = rows[(frame_ids >= frame_range[0]) & (frame_ids <= frame_range[1])]
+        if rows is None:
+            rows = np.arange(len(self))
+
+        if min_area is not None or max_area is not None or region is not None:
+            boxes = self.boxes[rows]
+            keep = np.ones(len(rows), dtype=bool)
+            area = boxes[:, 2] * boxes[:, 3]
+            if min_area is not None:
+                keep &= area >= min_area
+            if max_area is not None:
+                keep &= area <= max_area
+            if region is not None:
+                top, left, width, height = region
+                keep &= (boxes[:, 0] < top + width) & (boxes[:, 0] + boxes[:, 2] > top) & \
+                        (boxes[:, 1] < left + height) & (boxes[:, 1] + boxes[:, 3] > left)
+            rows = rows[keep]
+        return QueryResult(self, rows)
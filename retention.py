@@ -0,0 +1,103 @@
+import pickle
+from os import makedirs, remove
+from os.path import join
+from tempfile import mkdtemp
+from time import monotonic
+
+
+class RetentionMeta(object):
+    EXTENSION = '.segment'
+
+
+class RetentionPolicy(object):
+    """
+    Limits of the frames a JsonParser keeps in memory: a number of frames, an estimate of the bytes they hold
+    (see `DetectionStore.memory_estimate`) and the age in seconds of the oldest of them. Any limit can be None.
+    """
+
+    def __init__(self, max_frames: int = None, max_bytes: int = None, max_age: float = None):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def exceeded(self, store, started: float):
+        # started: monotonic time the oldest frame in memory was added
+        if not store.frames:
+            return False
+        if self.max_frames is not None and len(store.frames) >= self.max_frames:
+            return True
+        if self.max_bytes is not None and store.memory_estimate() >= self.max_bytes:
+            return True
+        return self.max_age is not None and monotonic() - started >= self.max_age
+
+
+class Segment(object):
+    # a spilled DetectionStore: the pickle file, its frame ids and the first bbox without `top_k` labels
+    def __init__(self, path: str, frame_ids, incomplete):
+        self.path = path
+        self.frame_ids = frame_ids
+        self.incomplete = incomplete
+
+    def load(self):
+        with open(self.path, 'rb') as file:
+            return pickle.load(file)
+
+
+class SpilledSegments(object):
+    """
+    Frames of a window that were moved out of memory, oldest first. Every segment is a whole DetectionStore
+    pickled to `spill_path` (a new temporary directory by default); iterating loads one segment at a time, so
+    writing the window never holds more than one segment next to the frames in memory.
+    """
+
+    def __init__(self, spill_path: str = None):
+        self.spill_path = spill_path
+        self.segments = []
+        self.frame_ids = set()
+        self.num_frames = 0
+        self._counter = 0
+
+    def __len__(self):
+        return len(self.segments)
+
+    def __contains__(self, frame_id):
+        return frame_id in self.frame_ids
+
+    def __iter__(self):
+        for segment in self.segments:
+            yield segment.load()
+
+    def spill(self, store, top_k: int):
+        if self.spill_path is None:
+            self.spill_path = mkdtemp(prefix='json_parser_segments_')
+        makedirs(self.spill_path, exist_ok=True)
+        path = join(self.spill_path, '{}-{}{}'.format(id(self), self._counter, RetentionMeta.EXTENSION))
+        self._counter += 1
+        with open(path, 'wb') as file:
+            pickle.dump(store, file, protocol=pickle.HIGHEST_PROTOCOL)
+        frame_ids = list(store.frames)
+        self.segments.append(Segment(path, frame_ids, store.first_incomplete(top_k)))
+        self.frame_ids.update(frame_ids)
+        self.num_frames += len(frame_ids)
+
+    def frame_dict(self, frame_id: int):
+        # loads the segment that holds `frame_id`
+        for segment in self.segments:
+            if frame_id in segment.frame_ids:
+                return segment.load().frame_dict(frame_id)
+        raise ValueError("frame with frame_id: {} does not exist".format(frame_id))
+
+    def incomplete(self):
+        # the first bbox of the spilled frames without `top_k` labels, or None
+        return next((segment.incomplete for segment in self.segments if segment.incomplete is not None), None)
+
+    def discard(self):
+        # removes the segment files; the frames are gone after this.
+        for segment in self.segments:
+            try:
+                remove(segment.path)
+            except FileNotFoundError:
+                pass
+        self.segments = []
+        self.frame_ids = set()
+        self.num_frames = 0
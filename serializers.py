@@ -0,0 +1,224 @@
+import json
+import warnings
+from importlib import import_module
+
+from json_parser.delta import DeltaEncoder, DeltaMeta
+from json_parser.storage import ALL_INT_COORDS, iter_parts
+
+
+def _float(value: float):
+    # same text as the json module: repr for finite values, NaN/Infinity/-Infinity otherwise.
+    if -1e400 < value < 1e400:
+        return repr(value)
+    return json.dumps(value)
+
+
+class Serializer(object):
+    """
+    Base class of the serializer backends.
+
+    `iter_output` encodes a whole log (video_details, the frames of a DetectionStore, preceded by the frames of its
+    spilled `segments`, and the runs of skipped frames if there are any) into chunks of bytes and
+    `encode_frame` encodes a single frame; `encode` encodes any plain python object (e.g. the header of a stream).
+    """
+    name = None
+    extension = '.json'
+    # can frames be written one per line (JSON Lines)?
+    line_based = True
+
+    def encode(self, obj) -> bytes:
+        raise NotImplementedError
+
+    def encode_frame(self, store, frame_id) -> bytes:
+        return self.encode(store.frame_dict(frame_id))
+
+    def iter_output(self, store, video_details: dict, skipped_frames: list = None, segments=()):
+        # compact json by default; backends with another layout override this.
+        yield b'{"video_details":'
+        yield self.encode(video_details)
+        yield b',"frames":['
+        separator = b''
+        for part in iter_parts(store, segments):
+            for frame_id in part.frames:
+                yield separator
+                yield self.encode_frame(part, frame_id)
+                separator = b','
+        yield b']'
+        if skipped_frames:
+            yield b',"skipped_frames":'
+            yield self.encode(skipped_frames)
+        yield b'}'
+
+
+class JsonSerializer(Serializer):
+    """
+    The stdlib backend. Frames are encoded straight from the columns of the store without building dicts, and
+    the bytes are identical to `json.dump(JsonParser.output())`.
+    """
+    name = 'json'
+
+    def encode(self, obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    def iter_output(self, store, video_details: dict, skipped_frames: list = None, segments=()):
+        yield b'{"video_details": '
+        yield self.encode(video_details)
+        yield b', "frames": ['
+        separator = b''
+        for part in iter_parts(store, segments):
+            categories = [json.dumps(category) for category in part.categories]
+            for frame_id in part.frames:
+                yield separator
+                yield self._encode_frame(part, frame_id, categories)
+                separator = b', '
+        yield b']'
+        if skipped_frames:
+            yield b', "skipped_frames": '
+            yield self.encode(skipped_frames)
+        yield b'}'
+
+    def encode_frame(self, store, frame_id) -> bytes:
+        return self._encode_frame(store, frame_id, [json.dumps(category) for category in store.categories])
+
+    @staticmethod
+    def _encode_frame(store, frame_id, categories) -> bytes:
+        stride = store.label_stride
+        codes, confidences, ints, counts = store.label_codes, store.label_confidences, store.label_ints, \
+            store.label_counts
+        bboxes = []
+        for row in store.frames[frame_id].values():
+            start = row * stride
+            labels = ', '.join(['{"category": %s, "confidence": %s}' % (
+                categories[codes[slot]], int(confidences[slot]) if ints[slot] else _float(confidences[slot]))
+                for slot in range(start, start + counts[row])])
+            if store.int_coords[row] == ALL_INT_COORDS:
+                coordinates = (int(store.top[row]), int(store.left[row]), int(store.width[row]),
+                               int(store.height[row]))
+            else:
+                coordinates = tuple(value if isinstance(value, int) else _float(value)
+                                    for value in store.coordinates(row))
+            bboxes.append('{"labels": [%s], "bbox_id": %d, "top": %s, "left": %s, "width": %s, "height": %s}' % (
+                (labels, store.bbox_ids[row]) + coordinates))
+        return ('{"frame_id": %s, "bboxes": [%s]}' % (json.dumps(frame_id), ', '.join(bboxes))).encode()
+
+
+class OrjsonSerializer(Serializer):
+    """
+    orjson backend. Frames are encoded one at a time, so the dict tree of the whole log is never built.
+    The output is compact json (no spaces after separators).
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import_module('orjson')
+
+    def encode(self, obj) -> bytes:
+        return import_module('orjson').dumps(obj)
+
+
+class UjsonSerializer(Serializer):
+    """
+    ujson backend, compact json like orjson.
+    """
+    name = 'ujson'
+
+    def __init__(self):
+        import_module('ujson')
+
+    def encode(self, obj) -> bytes:
+        return import_module('ujson').dumps(obj, escape_forward_slashes=False).encode()
+
+
+class MsgpackSerializer(Serializer):
+    """
+    msgpack backend. The output is one msgpack map with the same keys as the json output.
+    """
+    name = 'msgpack'
+    extension = '.msgpack'
+    line_based = False
+
+    def __init__(self):
+        import_module('msgpack')
+
+    def encode(self, obj) -> bytes:
+        return import_module('msgpack').packb(obj)
+
+    def iter_output(self, store, video_details: dict, skipped_frames: list = None, segments=()):
+        packer = import_module('msgpack').Packer()
+        yield packer.pack_map_header(3 if skipped_frames else 2)
+        yield packer.pack('video_details')
+        yield packer.pack(video_details)
+        yield packer.pack('frames')
+        # the number of frames comes first, without loading the segments
+        num_frames = getattr(segments, 'num_frames', None)
+        if num_frames is None:
+            num_frames = sum(len(part.frames) for part in segments)
+        yield packer.pack_array_header(num_frames + len(store.frames))
+        for part in iter_parts(store, segments):
+            for frame_id in part.frames:
+                yield packer.pack(part.frame_dict(frame_id))
+        if skipped_frames:
+            yield packer.pack('skipped_frames')
+            yield packer.pack(skipped_frames)
+
+
+class DeltaSerializer(JsonSerializer):
+    """
+    Keyframe/delta encoding for cameras whose detections barely change between frames: a header line, then one
+    json line per frame with only the changes against the previous frame (see `delta.DeltaEncoder`), then the
+    skipped frames. `delta.decode_delta` rebuilds the `output()` schema. Frames depend on the ones before them, so
+    the encoding can not be streamed frame by frame.
+    """
+    name = DeltaMeta.ENCODING
+    extension = DeltaMeta.EXTENSION
+    line_based = False
+
+    def __init__(self, keyframe_interval: int = DeltaMeta.KEYFRAME_INTERVAL, coordinate_decimals: int = None,
+                 confidence_decimals: int = None):
+        self.encoder = DeltaEncoder(keyframe_interval, coordinate_decimals, confidence_decimals)
+
+    def encode(self, obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+    def encode_frame(self, store, frame_id) -> bytes:
+        # not line based: a delta encoded frame depends on the frames before it
+        raise ValueError("delta logs can not be streamed frame by frame, frame_id: {}".format(frame_id))
+
+    def iter_output(self, store, video_details: dict, skipped_frames: list = None, segments=()):
+        yield self.encode(self.encoder.header(video_details))
+        for record in self.encoder.iter_records(store, segments):
+            yield b'\n'
+            yield self.encode(record)
+        if skipped_frames:
+            yield b'\n'
+            yield self.encode({'skipped_frames': skipped_frames})
+        yield b'\n'
+
+
+SERIALIZERS = {serializer.name: serializer
+               for serializer in (JsonSerializer, OrjsonSerializer, UjsonSerializer, MsgpackSerializer,
+                                  DeltaSerializer)}
+
+
+def get_serializer(name: str = JsonSerializer.name, fallback: str = JsonSerializer.name):
+    """
+    Returns the serializer called `name`. If its package is not installed, warns and returns `fallback` instead.
+    """
+    if name not in SERIALIZERS:
+        raise ValueError("serializer: {} is not one of {}".format(name, list(SERIALIZERS)))
+    try:
+        return SERIALIZERS[name]()
+    except ImportError:
+        warnings.warn("serializer: {} is not installed, falling back to {}".format(name, fallback))
+        return SERIALIZERS[fallback]()
+
+
+def available_serializers():
+    available = []
+    for name, serializer in SERIALIZERS.items():
+        try:
+            serializer()
+        except ImportError:
+            continue
+        available.append(name)
+    return available
@@ -0,0 +1,109 @@
+from datetime import datetime
+from os import fsync, makedirs
+from os.path import exists, join
+
+from json_parser.serializers import JsonSerializer
+
+
+class SinkMeta(object):
+    EXTENSION = '.jsonl'
+    BUFFER_SIZE = 1 << 16
+    # fsync policies
+    NEVER = 'never'
+    ROTATE = 'rotate'
+    ALWAYS = 'always'
+    FSYNC_POLICIES = (NEVER, ROTATE, ALWAYS)
+
+
+class JsonLinesSink(object):
+    """
+    Streams frames to JSON Lines files as soon as they are complete.
+
+    Every file starts with a header record `{"video_details": {...}}` followed by one `{"frame_id": ..., "bboxes":
+    [...]}` record per line. A new file is started when the current one is older than `seconds` or larger than
+    `max_bytes`; files are named after the time they were started, like the files of `schedule_output`.
+
+    fsync: `never` leaves it to the OS, `rotate` syncs every finished file and `always` syncs after every frame.
+    Records are encoded with `serializer`, which has to be line based (any of the json backends).
+    """
+
+    def __init__(self, output_path: str, seconds: int = 60, max_bytes: int = None,
+                 buffer_size: int = SinkMeta.BUFFER_SIZE, fsync: str = SinkMeta.ROTATE, serializer=None):
+        if fsync not in SinkMeta.FSYNC_POLICIES:
+            raise ValueError("fsync: {} is not one of {}".format(fsync, SinkMeta.FSYNC_POLICIES))
+        serializer = JsonSerializer() if serializer is None else serializer
+        if not serializer.line_based:
+            raise ValueError("serializer: {} can not write JSON Lines".format(serializer.name))
+        self.serializer = serializer
+        self.output_path = output_path
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        self.file = None
+        self.file_name = None
+        self.file_start = None
+        self.file_bytes = 0
+        self.bytes_written = 0
+        self.files = []
+
+    def _open(self, video_details: dict):
+        if not exists(self.output_path):
+            makedirs(self.output_path)
+        self.file_start = datetime.now()
+        name = self.file_start.strftime('%Y-%m-%d %H-%M-%S')
+        file_name = join(self.output_path, name + SinkMeta.EXTENSION)
+        suffix = 1
+        while exists(file_name):
+            # more than one file in the same second when rotating by size; the suffix keeps the name order.
+            file_name = join(self.output_path, '{}_{:03d}{}'.format(name, suffix, SinkMeta.EXTENSION))
+            suffix += 1
+        self.file = open(file_name, 'wb', buffering=self.buffer_size)
+        self.file_name = file_name
+        self.file_bytes = 0
+        self.files.append(file_name)
+        self._write_line(self.serializer.encode({'video_details': video_details}))
+
+    def _write_line(self, line: bytes):
+        self.file.write(line)
+        self.file.write(b'\n')
+        self.file_bytes += len(line) + 1
+        self.bytes_written += len(line) + 1
+
+    def _should_rotate(self):
+        if self.max_bytes is not None and self.file_bytes >= self.max_bytes:
+            return True
+        return self.seconds is not None and (datetime.now() - self.file_start).total_seconds() >= self.seconds
+
+    def write_frame(self, store, frame_id, video_details: dict):
+        # writes one frame of a DetectionStore; video_details goes into the header when a new file is started.
+        self._write_record_line(self.serializer.encode_frame(store, frame_id), video_details)
+
+    def write_record(self, record: dict, video_details: dict):
+        # writes any other record, e.g. {"skipped_frames": [...]}
+        self._write_record_line(self.serializer.encode(record), video_details)
+
+    def _write_record_line(self, line: bytes, video_details: dict):
+        if self.file is not None and self._should_rotate():
+            self.close()
+        if self.file is None:
+            self._open(video_details)
+        self._write_line(line)
+        if self.fsync == SinkMeta.ALWAYS:
+            self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        fsync(self.file.fileno())
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        if self.fsync != SinkMeta.NEVER:
+            self._sync()
+        self.file.close()
+        self.file = None
@@ -0,0 +1,279 @@
+from array import array
+from numbers import Integral
+
+NO_CATEGORY = -1
+# `int_coords` of a row with top, left, width and height all given as integers; bit i is set for coordinate i
+ALL_INT_COORDS = 0b1111
+# rough size of one entry of the frame index (key, dict) and of the bbox index of a frame (key, row)
+FRAME_INDEX_BYTES = 200
+BBOX_INDEX_BYTES = 56
+
+
+class DetectionStore(object):
+    """
+    Columnar storage of detections.
+
+    Every bbox is one row in a set of typed `array.array` columns (frame_id, bbox_id, top, left, width, height).
+    Labels live in a packed block next to the rows: each row owns `label_stride` slots of category codes and
+    confidences, and `label_counts` keeps how many of those slots are filled. Categories are kept once in a
+    string table and referenced by their integer code.
+
+    Frames and bboxes are indexed with `frames`, a dict of frame_id -> {bbox_id: row}; both levels preserve
+    insertion order, which is also the order of the output.
+    """
+
+    def __init__(self, label_stride: int = 1):
+        self.frames = {}
+        self.frame_ids = array('q')
+        self.bbox_ids = array('q')
+        self.top = array('d')
+        self.left = array('d')
+        self.width = array('d')
+        self.height = array('d')
+        # bit mask of the coordinates of the row given as integers (see ALL_INT_COORDS); they are written back as
+        # integers.
+        self.int_coords = array('b')
+
+        self.label_stride = max(label_stride, 0)
+        self._blank_codes = array('i', [NO_CATEGORY]) * self.label_stride
+        self._blank_confidences = array('d', [0.0]) * self.label_stride
+        self._blank_ints = array('b', [0]) * self.label_stride
+        self.label_counts = array('H')
+        self.label_codes = array('i')
+        self.label_confidences = array('d')
+        # 1 for the confidences given as integers, written back as integers like the coordinates
+        self.label_ints = array('b')
+
+        self.categories = []
+        self.category_codes = {}
+
+    def __len__(self):
+        return len(self.bbox_ids)
+
+    def clear(self):
+        self.__init__(label_stride=self.label_stride)
+
+    def frame_exists(self, frame_id: int):
+        return frame_id in self.frames
+
+    def add_frame(self, frame_id: int):
+        self.frames[frame_id] = {}
+
+    def bbox_row(self, frame_id: int, bbox_id: int):
+        # returns the row of the bbox or None if frame or bbox does not exist.
+        bboxes = self.frames.get(frame_id)
+        if bboxes is None:
+            return None
+        return bboxes.get(bbox_id)
+
+    def add_bbox(self, frame_id: int, bbox_id: int, top, left, width, height):
+        # every value is converted before anything is appended, so a bad value leaves the columns as they were.
+        bboxes = self.frames[frame_id]
+        values = (top, left, width, height)
+        try:
+            ids = array('q', (frame_id, bbox_id))
+            coordinates = array('d', values)
+        except (TypeError, OverflowError):
+            raise ValueError("bbox with id: {} of frame_id: {} needs integer ids and numeric top, left, width and "
+                             "height".format(bbox_id, frame_id))
+        row = len(self.bbox_ids)
+        self.frame_ids.append(ids[0])
+        self.bbox_ids.append(ids[1])
+        self.top.append(coordinates[0])
+        self.left.append(coordinates[1])
+        self.width.append(coordinates[2])
+        self.height.append(coordinates[3])
+        self.int_coords.append(sum(1 << i for i, value in enumerate(values) if isinstance(value, Integral)))
+        self.label_counts.append(0)
+        self.label_codes.extend(self._blank_codes)
+        self.label_confidences.extend(self._blank_confidences)
+        self.label_ints.extend(self._blank_ints)
+        bboxes[bbox_id] = row
+        return row
+
+    def set_coordinates(self, row: int, top, left, width, height):
+        values = (top, left, width, height)
+        try:
+            coordinates = array('d', values)
+        except (TypeError, OverflowError):
+            raise ValueError("top, left, width and height of bbox with id: {} have to be numbers".format(
+                self.bbox_ids[row]))
+        self.top[row], self.left[row], self.width[row], self.height[row] = coordinates
+        self.int_coords[row] = sum(1 << i for i, value in enumerate(values) if isinstance(value, Integral))
+
+    def add_bboxes(self, frame_id: int, bbox_ids, boxes, codes, confidences):
+        """
+        Appends a block of bboxes of one frame in one pass.
+
+        bbox_ids is an (n,) integer array, boxes an (n, 4) array of top, left, width, height and codes/confidences
+        are (n, k) arrays of category codes and confidences. Nothing is validated here.
+        """
+        import numpy as np
+        n = len(bbox_ids)
+        k = codes.shape[1]
+        row = len(self.bbox_ids)
+        self.reserve_labels(k)
+        self.frame_ids.extend(array('q', [frame_id]) * n)
+        self.bbox_ids.frombytes(np.ascontiguousarray(bbox_ids, dtype=np.int64).tobytes())
+        for column, values in zip((self.top, self.left, self.width, self.height), boxes.T):
+            column.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        self.int_coords.extend(array('b', [ALL_INT_COORDS if np.issubdtype(boxes.dtype, np.integer) else 0]) * n)
+        self.label_counts.extend(array('H', [k]) * n)
+
+        block_codes = np.full((n, self.label_stride), NO_CATEGORY, dtype=np.int32)
+        block_confidences = np.zeros((n, self.label_stride), dtype=np.float64)
+        block_ints = np.zeros((n, self.label_stride), dtype=np.int8)
+        block_codes[:, :k] = codes
+        block_confidences[:, :k] = confidences
+        block_ints[:, :k] = np.issubdtype(np.asarray(confidences).dtype, np.integer)
+        self.label_codes.frombytes(block_codes.tobytes())
+        self.label_confidences.frombytes(block_confidences.tobytes())
+        self.label_ints.frombytes(block_ints.tobytes())
+
+        self.frames[frame_id].update(zip(bbox_ids.tolist(), range(row, row + n)))
+        return row
+
+    def add_frame_dict(self, frame: dict):
+        # ingests one frame in the format of `frame_dict` (one item of `JsonParser.output()['frames']`).
+        frame_id = frame['frame_id']
+        self.add_frame(frame_id)
+        for bbox in frame['bboxes']:
+            row = self.add_bbox(frame_id, bbox['bbox_id'], bbox['top'], bbox['left'], bbox['width'], bbox['height'])
+            for label in bbox['labels']:
+                self.add_label(row, label['category'], label['confidence'])
+
+    def category_code(self, category: str):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_codes[category] = code
+        return code
+
+    def label_count(self, row: int):
+        return self.label_counts[row]
+
+    def reserve_labels(self, stride: int):
+        # widens the packed label block so that every row has at least `stride` slots.
+        if stride <= self.label_stride:
+            return
+        old = self.label_stride
+        codes = array('i', [NO_CATEGORY]) * (stride * len(self))
+        confidences = array('d', [0.0]) * (stride * len(self))
+        ints = array('b', [0]) * (stride * len(self))
+        for row in range(len(self)):
+            codes[row * stride:row * stride + old] = self.label_codes[row * old:(row + 1) * old]
+            confidences[row * stride:row * stride + old] = self.label_confidences[row * old:(row + 1) * old]
+            ints[row * stride:row * stride + old] = self.label_ints[row * old:(row + 1) * old]
+        self.label_codes = codes
+        self.label_confidences = confidences
+        self.label_ints = ints
+        self.label_stride = stride
+        self._blank_codes = array('i', [NO_CATEGORY]) * stride
+        self._blank_confidences = array('d', [0.0]) * stride
+        self._blank_ints = array('b', [0]) * stride
+
+    def add_label(self, row: int, category: str, confidence: float):
+        try:
+            value = array('d', (confidence,))[0]
+        except (TypeError, OverflowError):
+            raise ValueError("confidence of bbox with id: {} has to be a number, not {!r}".format(
+                self.bbox_ids[row], confidence))
+        count = self.label_counts[row]
+        if count >= self.label_stride:
+            self.reserve_labels(max(count + 1, self.label_stride * 2))
+        slot = row * self.label_stride + count
+        self.label_codes[slot] = self.category_code(category)
+        self.label_confidences[slot] = value
+        self.label_ints[slot] = isinstance(confidence, Integral)
+        self.label_counts[row] = count + 1
+
+    def coordinates(self, row: int):
+        values = (self.top[row], self.left[row], self.width[row], self.height[row])
+        mask = self.int_coords[row]
+        if mask == ALL_INT_COORDS:
+            return tuple(int(v) for v in values)
+        if mask:
+            return tuple(int(v) if mask >> i & 1 else v for i, v in enumerate(values))
+        return values
+
+    def confidence(self, slot: int):
+        confidence = self.label_confidences[slot]
+        return int(confidence) if self.label_ints[slot] else confidence
+
+    def labels(self, row: int):
+        start = row * self.label_stride
+        end = start + self.label_counts[row]
+        return [(self.categories[self.label_codes[slot]], self.confidence(slot)) for slot in range(start, end)]
+
+    def bbox_dict(self, row: int):
+        top, left, width, height = self.coordinates(row)
+        return {'labels': [{'category': category, 'confidence': confidence}
+                           for category, confidence in self.labels(row)],
+                'bbox_id': self.bbox_ids[row],
+                'top': top,
+                'left': left,
+                'width': width,
+                'height': height}
+
+    def frame_dict(self, frame_id: int):
+        return {'frame_id': frame_id,
+                'bboxes': [self.bbox_dict(row) for row in self.frames[frame_id].values()]}
+
+    def iter_frame_dicts(self):
+        for frame_id in self.frames:
+            yield self.frame_dict(frame_id)
+
+    def extend(self, other):
+        # appends every frame of another store (e.g. a spilled segment); its category codes are translated.
+        import numpy as np
+        offset = len(self)
+        for frame_id, rows in other.frames.items():
+            if frame_id in self.frames:
+                raise ValueError("Frame id: {} already exists".format(frame_id))
+            self.frames[frame_id] = {bbox_id: row + offset for bbox_id, row in rows.items()}
+        for name in ('frame_ids', 'bbox_ids', 'top', 'left', 'width', 'height', 'int_coords', 'label_counts'):
+            getattr(self, name).extend(getattr(other, name))
+        stride = max(self.label_stride, other.label_stride)
+        self.reserve_labels(stride)
+        table = np.array([self.category_code(category) for category in other.categories] + [NO_CATEGORY],
+                         dtype=np.int32)
+        codes = np.full((len(other), stride), NO_CATEGORY, dtype=np.int32)
+        confidences = np.zeros((len(other), stride))
+        ints = np.zeros((len(other), stride), dtype=np.int8)
+        if other.label_stride:
+            # NO_CATEGORY (-1) picks the last entry of the table, which is NO_CATEGORY again
+            codes[:, :other.label_stride] = table[np.frombuffer(other.label_codes, dtype=np.int32).reshape(
+                len(other), other.label_stride)]
+            confidences[:, :other.label_stride] = np.frombuffer(other.label_confidences, dtype=np.float64).reshape(
+                len(other), other.label_stride)
+            ints[:, :other.label_stride] = np.frombuffer(other.label_ints, dtype=np.int8).reshape(
+                len(other), other.label_stride)
+        self.label_codes.frombytes(codes.tobytes())
+        self.label_confidences.frombytes(confidences.tobytes())
+        self.label_ints.frombytes(ints.tobytes())
+
+    def first_incomplete(self, top_k: int):
+        # (frame_id, bbox_id) of the first row without exactly `top_k` labels, or None
+        import numpy as np
+        counts = np.frombuffer(self.label_counts, dtype=np.uint16)
+        rows = np.flatnonzero(counts != top_k)
+        if not len(rows):
+            return None
+        return self.frame_ids[rows[0]], self.bbox_ids[rows[0]]
+
+    def memory_estimate(self):
+        # bytes held in memory: the columns plus an estimate of the frame/bbox index dicts.
+        return self.nbytes() + len(self.frames) * FRAME_INDEX_BYTES + len(self) * BBOX_INDEX_BYTES
+
+    def nbytes(self):
+        # size of the column buffers in bytes (index dicts and the string table are not included).
+        columns = (self.frame_ids, self.bbox_ids, self.top, self.left, self.width, self.height, self.int_coords,
+                   self.label_counts, self.label_codes, self.label_confidences, self.label_ints)
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+def iter_parts(store, segments=()):
+    # the spilled segments of a window (oldest first, see `retention.SpilledSegments`) and then the store in memory
+    yield from segments
+    yield store
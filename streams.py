@@ -0,0 +1,177 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from os.path import join
+
+from json_parser.json_parser import JsonMeta, JsonParser
+from json_parser.writers import AsyncWriter, WriterMeta
+
+
+class WindowBatch(object):
+    """
+    The windows of several streams that are due at the same time, written by one writer job.
+    """
+
+    def __init__(self, windows):
+        # windows: list of (output_name, JsonParser)
+        self.windows = windows
+
+    def json_output(self, output_name=None):
+        # every window is written (and its segments discarded) on its own; the first error is raised at the end.
+        error = None
+        for name, window in self.windows:
+            try:
+                window.json_output(name)
+                window.discard_segments()
+            except Exception as exc:
+                error = error or exc
+        if error is not None:
+            raise error
+
+    def discard_segments(self):
+        for name, window in self.windows:
+            window.discard_segments()
+
+
+class Stream(object):
+    def __init__(self, name: str, json_parser: JsonParser, output_path: str, seconds: int):
+        self.name = name
+        self.json_parser = json_parser
+        self.output_path = output_path
+        self.seconds = seconds
+        self.lock = threading.Lock()
+
+
+class StreamLogger(object):
+    """
+    Logs many named streams (e.g. cameras) in one process.
+
+    Every stream has its own JsonParser, video_details, output directory and window length. Ingestion is thread
+    safe per stream, and the finished windows of all streams are written by one shared pool of writer threads:
+    `schedule_output` collects every window that is due and hands them over as one batch. Windows are checked
+    like in `JsonParser.output`, so log a frame and its bboxes with `log_frame` (one locked call) when other
+    threads call `schedule_output`; between two calls the window, with the frame in it, may be detached.
+
+        logger = StreamLogger('jsons', threads=2)
+        logger.add_stream('camera_1', top_k_labels=1, seconds=60)
+        logger.log_frame('camera_1', frame_id, boxes, ids, class_ids, confidences, labels)
+        logger.schedule_output()
+        ...
+        logger.close()
+    """
+
+    def __init__(self, output_path=JsonMeta.PATH_TO_SAVE, threads: int = 2, max_queue: int = WriterMeta.MAX_QUEUE,
+                 policy: str = WriterMeta.BLOCK, spill_path=None):
+        self.output_path = output_path
+        self.streams = {}
+        self._lock = threading.Lock()
+        self.writer = AsyncWriter(max_queue=max_queue, policy=policy, spill_path=spill_path, threads=threads)
+
+    def add_stream(self, name: str, top_k_labels: int = 1, video_details: dict = None, output_path: str = None,
+                   seconds: int = 60):
+        """
+        Adds a stream whose windows are written every `seconds` to `output_path` (default: <output_path>/<name>).
+        """
+        with self._lock:
+            if name in self.streams:
+                raise ValueError("Stream: {} already exists".format(name))
+            json_parser = JsonParser(top_k_labels=top_k_labels)
+            if video_details is not None:
+                json_parser.add_video_details(**video_details)
+            stream = Stream(name, json_parser, output_path or join(self.output_path, name), seconds)
+            self.streams[name] = stream
+        return json_parser
+
+    def _stream(self, name: str):
+        stream = self.streams.get(name)
+        if stream is None:
+            raise ValueError("Stream: {} does not exist".format(name))
+        return stream
+
+    @contextmanager
+    def parser(self, name: str):
+        # locks the stream and yields its JsonParser, for any call that has no shortcut below.
+        stream = self._stream(name)
+        with stream.lock:
+            yield stream.json_parser
+
+    def add_frame(self, name: str, frame_id: int):
+        with self.parser(name) as json_parser:
+            json_parser.add_frame(frame_id)
+
+    def add_bbox_to_frame(self, name: str, frame_id: int, bbox_id: int, top: int, left: int, width: int,
+                          height: int):
+        with self.parser(name) as json_parser:
+            json_parser.add_bbox_to_frame(frame_id, bbox_id, top, left, width, height)
+
+    def add_label_to_bbox(self, name: str, frame_id: int, bbox_id: int, category: str, confidence: float):
+        with self.parser(name) as json_parser:
+            json_parser.add_label_to_bbox(frame_id, bbox_id, category, confidence)
+
+    def add_detections(self, name: str, frame_id: int, boxes_xywh, bbox_ids=None, class_ids=None, confidences=None,
+                       label_names=None):
+        with self.parser(name) as json_parser:
+            json_parser.add_detections(frame_id, boxes_xywh, bbox_ids, class_ids, confidences, label_names)
+
+    def log_frame(self, name: str, frame_id: int, boxes_xywh, bbox_ids=None, class_ids=None, confidences=None,
+                  label_names=None):
+        # adds the frame and its detections under one lock, so the frame never leaves without its bboxes.
+        with self.parser(name) as json_parser:
+            json_parser.add_frame(frame_id)
+            json_parser.add_detections(frame_id, boxes_xywh, bbox_ids, class_ids, confidences, label_names)
+
+    def _detach(self, stream: Stream):
+        # swaps out the window of the stream; must be called with the stream lock held.
+        json_parser = stream.json_parser
+        window = json_parser.detach_window()
+        json_parser.set_start()
+        return window.window_name(stream.output_path), window
+
+    def _submit(self, due):
+        """
+        Hands the windows of every stream for which `due(stream)` holds to the writer pool, as one batch. A window
+        that can not be detached (e.g. a bbox without all its labels) stays in its stream; the windows of the other
+        streams are still submitted before the first error is raised.
+        """
+        windows, error = [], None
+        for stream in list(self.streams.values()):
+            with stream.lock:
+                if not due(stream):
+                    continue
+                try:
+                    windows.append(self._detach(stream))
+                except Exception as exc:
+                    error = error or exc
+        if windows:
+            self.writer.submit(None, WindowBatch(windows))
+        if error is not None:
+            raise error
+        return len(windows)
+
+    def schedule_output(self):
+        # hands the windows of every stream that is due to the writer pool.
+        now = datetime.now()
+        return self._submit(lambda stream: (now - stream.json_parser.start_time).seconds > stream.seconds)
+
+    def output_all(self):
+        # hands the (non empty) windows of every stream to the writer pool, whether they are due or not.
+        return self._submit(lambda stream: stream.json_parser.store.frames)
+
+    def flush(self):
+        self.writer.flush()
+
+    def close(self, write_remaining: bool = True):
+        # writes the windows in progress (unless write_remaining is False) and stops the writer pool.
+        try:
+            if write_remaining:
+                self.output_all()
+        finally:
+            self.writer.close()
+
+    def stats(self):
+        stats = self.writer.stats()
+        stats['streams'] = {name: dict(frames=len(stream.json_parser.store.frames),
+                                       bboxes=len(stream.json_parser.store),
+                                       nbytes=stream.json_parser.store.nbytes())
+                            for name, stream in self.streams.items()}
+        return stats
@@ -0,0 +1,67 @@
+import unittest
+import sys
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+import numpy as np
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.analytics import *
+
+
+class TestAnalytics(TestCase):
+
+    def setUp(self) -> None:
+        self.out_path = mkdtemp()
+        # frame_id, xywh, labels
+        self.windows = [[(0, (0, 0, 10, 10), [('car', 0.95), ('bus', 0.05)]),
+                         (0, (300, 100, 20, 20), [('truck', 0.55), ('car', 0.4)]),
+                         (1, (0, 0, 10, 10), [('car', 0.91), ('bus', 0.09)])],
+                        [(2, (0, 0, 10, 10), [('car', 0.5), ('truck', 0.5)]),
+                         (3, (300, 100, 20, 20), [('person', 0.99), ('car', 0.01)])],
+                        [(4, (300, 100, 20, 20), [('truck', 0.7), ('car', 0.2)])]]
+        for i, (window, extension) in enumerate(zip(self.windows, ('.json', '.jpdb', '.jdelta'))):
+            json_parser = JsonParser(top_k_labels=2)
+            json_parser.add_video_details(400, 200, 10, 'something.mp4')
+            if extension == '.jdelta':
+                json_parser.set_serializer('delta')
+            for bbox_id, (frame_id, xywh, labels) in enumerate(window):
+                if not json_parser.frame_exists(frame_id):
+                    json_parser.add_frame(frame_id)
+                json_parser.add_bbox_to_frame(frame_id, bbox_id, *xywh)
+                for category, confidence in labels:
+                    json_parser.add_label_to_bbox(frame_id, bbox_id, category, confidence)
+            output_name = join(self.out_path, '2026-10-18 10-0{}-00{}'.format(i, extension))
+            if extension == '.jpdb':
+                json_parser.binary_output(output_name)
+            else:
+                json_parser.json_output(output_name)
+
+    def test_aggregate(self):
+        aggregate = aggregate_logs(self.out_path, workers=1, confidence_bins=10, grid=(2, 4))
+        self.assertEqual((aggregate.files, aggregate.frames, aggregate.detections), (3, 5, 6))
+        self.assertEqual((aggregate.first_frame, aggregate.last_frame), (0, 4))
+        self.assertEqual(aggregate.category_counts, {'car': 3, 'truck': 2, 'person': 1})
+        np.testing.assert_array_equal(aggregate.confidence_histograms['car'], [0] * 5 + [1] + [0] * 3 + [2])
+        np.testing.assert_array_equal(aggregate.confidence_histograms['truck'], [0] * 5 + [1, 0, 1, 0, 0])
+        # three detections in the top left cell and three in the right half, 0.1 s each at 10 fps
+        expected = np.zeros((2, 4))
+        expected[0, 0] = 0.3
+        expected[1, 3] = 0.3
+        np.testing.assert_allclose(aggregate.heatmap, expected)
+
+    def test_process_pool(self):
+        progress = []
+        parallel = aggregate_logs(self.out_path, workers=2, progress=lambda *args: progress.append(args))
+        self.assertEqual(parallel.to_dict(), aggregate_logs(self.out_path, workers=1).to_dict())
+        self.assertEqual(sorted(done for done, total, file in progress), [1, 2, 3])
+
+    def test_merge_checks_the_layout(self):
+        with self.assertRaises(ValueError):
+            Aggregate(grid=(2, 2)).merge(Aggregate(grid=(3, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import json
+import unittest
+import sys
+from os import listdir
+from os.path import join
+from tempfile import mkdtemp
+from threading import Event, Thread
+from time import sleep
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.writers import *
+
+
+class BlockedWindow(object):
+    # a window whose write waits until `release` is set
+    def __init__(self, release, written):
+        self.release = release
+        self.written = written
+
+    def json_output(self, output_name):
+        self.release.wait()
+        self.written.append(output_name)
+
+
+class SlowPicklingWindow(object):
+    # releases the blocked window when it starts pickling and finishes after the writer drained the queue
+    written = []
+
+    def __init__(self, release):
+        self.release = release
+
+    def __getstate__(self):
+        self.release.set()
+        sleep(0.2)
+        return {}
+
+    def json_output(self, output_name):
+        SlowPicklingWindow.written.append(output_name)
+
+
+class TestAsyncOutput(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=1)
+        self.out_path = mkdtemp()
+
+    def add_frame(self, frame_id):
+        self.json_parser.add_frame(frame_id)
+        self.json_parser.add_bbox_to_frame(frame_id, 0, 10, 20, 30, 40)
+        self.json_parser.add_label_to_bbox(frame_id, 0, 'car', 0.5)
+
+    def test_window_is_written_in_background(self):
+        self.json_parser.set_async_output()
+        self.add_frame(0)
+        expected = self.json_parser.output()
+        self.json_parser.output_window(self.out_path)
+        # the window is handed over, the parser starts empty
+        self.assertFalse(self.json_parser.frame_exists(0))
+        self.json_parser.close()
+        saved_files = listdir(self.out_path)
+        self.assertEqual(len(saved_files), 1)
+        with open(join(self.out_path, saved_files[0])) as file:
+            self.assertEqual(json.load(file), expected)
+
+    def test_close_writes_remaining_window(self):
+        self.json_parser.set_async_output()
+        self.add_frame(0)
+        self.json_parser.add_skipped_frames(1, 3)
+        expected = self.json_parser.output()
+        self.json_parser.close(output_path=self.out_path)
+        saved_files = listdir(self.out_path)
+        self.assertEqual(len(saved_files), 1)
+        with open(join(self.out_path, saved_files[0])) as file:
+            self.assertEqual(json.load(file), expected)
+
+        json_parser = JsonParser(top_k_labels=1)
+        json_parser.set_async_output()
+        json_parser.add_frame(0)
+        json_parser.close(write_remaining=False, output_path=join(self.out_path, 'dropped'))
+        self.assertEqual(listdir(self.out_path), saved_files)
+
+    def test_drop_oldest(self):
+        release, written = Event(), []
+        writer = AsyncWriter(max_queue=1, policy=WriterMeta.DROP_OLDEST)
+        writer.submit('0', BlockedWindow(release, written))
+        while writer.stats()['queue_depth']:
+            # wait until the writer thread is busy with the first window
+            sleep(0.01)
+        for i in range(1, 4):
+            writer.submit(str(i), BlockedWindow(release, written))
+        release.set()
+        writer.close()
+        # window 0 was being written, 1 and 2 were dropped by the newer windows
+        self.assertEqual(written, ['0', '3'])
+        self.assertEqual(writer.stats()['dropped'], 2)
+
+    def test_spill(self):
+        release, written = Event(), []
+        writer = AsyncWriter(max_queue=1, policy=WriterMeta.SPILL, spill_path=join(self.out_path, 'spill'))
+        windows = []
+        for i in range(4):
+            self.add_frame(i)
+            windows.append(self.json_parser.output())
+            name = join(self.out_path, '{}.json'.format(i))
+            writer.submit(name, BlockedWindow(release, written) if i == 0 else self.json_parser.detach_window())
+        release.set()
+        writer.close()
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 4)
+        self.assertGreaterEqual(stats['spilled'], 1)
+        for i in range(1, 4):
+            with open(join(self.out_path, '{}.json'.format(i))) as file:
+                self.assertEqual(json.load(file), windows[i])
+        self.assertEqual(listdir(join(self.out_path, 'spill')), [])
+
+    def test_spill_wakes_idle_writer(self):
+        release, written = Event(), []
+        writer = AsyncWriter(max_queue=1, policy=WriterMeta.SPILL, spill_path=join(self.out_path, 'spill'))
+        writer.submit('0', BlockedWindow(release, written))
+        while writer.stats()['queue_depth']:
+            sleep(0.01)
+        writer.submit('1', BlockedWindow(release, written))
+        # the queue is full: window 2 is spilled while the writer drains the queue and waits for more
+        writer.submit('2', SlowPicklingWindow(release))
+        flushed = Thread(target=writer.flush, daemon=True)
+        flushed.start()
+        flushed.join(timeout=5)
+        self.assertFalse(flushed.is_alive())
+        self.assertEqual(written, ['0', '1'])
+        self.assertEqual(SlowPicklingWindow.written, ['2'])
+        writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
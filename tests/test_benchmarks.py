@@ -0,0 +1,60 @@
+import json
+import unittest
+import sys
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+import numpy as np
+
+sys.path.append('../..')
+from json_parser.benchmarks.synthetic import *
+from json_parser.benchmarks.suite import *
+from json_parser.benchmarks.bench_import import import_time
+
+
+class TestBenchmarks(TestCase):
+
+    def setUp(self) -> None:
+        self.out_path = mkdtemp()
+
+    def test_synthetic_yolo_outputs(self):
+        frames = synthetic_yolo_outputs(num_frames=2, objects_per_frame=5, num_classes=10)
+        self.assertEqual(len(frames), 2)
+        self.assertEqual([output.shape for output in frames[0]], [(rows, 15) for rows in YOLO_LAYER_ROWS])
+        # 5 objects, hit by 3 rows in each of the 3 layers
+        detections = decode_yolo_outputs(frames[0], 416, 416, 0.5)
+        self.assertEqual(len(detections.boxes), 45)
+
+        path = join(self.out_path, 'outputs.npz')
+        save_outputs(path, frames)
+        loaded = load_outputs(path)
+        self.assertEqual(len(loaded), 2)
+        for layers, loaded_layers in zip(frames, loaded):
+            for output, loaded_output in zip(layers, loaded_layers):
+                np.testing.assert_array_equal(output, loaded_output)
+
+    def test_suite_and_baseline(self):
+        baseline = join(self.out_path, 'baseline.json')
+        argv = ['--frames', '3', '--boxes', '2', '--decode-frames', '1', '--repeat', '1']
+        self.assertEqual(main(argv + ['--output', baseline]), 0)
+        with open(baseline) as file:
+            results = json.load(file)
+        self.assertEqual(set(results['results']), set(CASES))
+
+        slower = {'results': {name: dict(result, best=result['best'] * 2)
+                              for name, result in results['results'].items()}}
+        ratios, regressions = compare(slower, results, tolerance=0.5)
+        self.assertEqual(sorted(regressions), sorted(CASES))
+        self.assertEqual(compare(results, slower, tolerance=0.5)[1], [])
+
+    def test_lazy_imports(self):
+        # numpy, bunch and the serializer backends are imported on first use
+        seconds, loaded = import_time('json_parser.json_parser')
+        self.assertGreater(seconds, 0)
+        self.assertEqual(loaded, [])
+        self.assertNotIn('cv2', import_time('json_parser.object_detection.model')[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
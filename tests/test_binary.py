@@ -0,0 +1,72 @@
+import json
+import unittest
+import sys
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+import numpy as np
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.binary import *
+
+
+class TestBinaryLog(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=2)
+        self.json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        for frame_id in (5, 2, 9):
+            self.json_parser.add_frame(frame_id)
+        # bboxes of frames are interleaved in the store
+        for frame_id, bbox_id, xywh in [(5, 0, (1, 2, 3, 4)), (2, 0, (5, 6, 7, 8)), (5, 1, (1.5, 2, 3, 4))]:
+            self.json_parser.add_bbox_to_frame(frame_id, bbox_id, *xywh)
+            self.json_parser.add_label_to_bbox(frame_id, bbox_id, 'car', 0.75)
+            self.json_parser.add_label_to_bbox(frame_id, bbox_id, 'truck' if bbox_id else 'bus', 0.25)
+        self.out_path = mkdtemp()
+        self.binary_name = join(self.out_path, 'log.jpdb')
+        self.json_parser.binary_output(self.binary_name)
+
+    def test_round_trip(self):
+        with BinaryLogReader(self.binary_name) as reader:
+            # compared as json, so the types of the values count
+            self.assertEqual(json.dumps(reader.output()), json.dumps(self.json_parser.output()))
+
+    def test_value_types(self):
+        # integer confidences and a mix of integer and float coordinates keep their types
+        self.json_parser.add_frame(11)
+        self.json_parser.add_bbox_to_frame(11, 0, 1, 2.5, 3, 4.0)
+        self.json_parser.add_label_to_bbox(11, 0, 'car', 98)
+        self.json_parser.add_label_to_bbox(11, 0, 'bus', 0.5)
+        self.json_parser.binary_output(self.binary_name)
+        with BinaryLogReader(self.binary_name) as reader:
+            self.assertEqual(json.dumps(reader.frame_dict(11)), json.dumps(self.json_parser.get_frame(11).dic()))
+
+    def test_views(self):
+        with BinaryLogReader(self.binary_name) as reader:
+            boxes = reader.frame_boxes(5)
+            self.assertEqual(boxes['bbox_id'].tolist(), [0, 1])
+            self.assertEqual(boxes['top'].tolist(), [1, 1.5])
+            self.assertTrue(np.shares_memory(boxes, reader.boxes))
+            self.assertEqual(len(reader.frame_boxes(9)), 0)
+            self.assertEqual(reader.category_confidences('car').tolist(), [0.75] * 3)
+            self.assertEqual(reader.category_confidences('truck').tolist(), [0.25])
+            self.assertEqual(len(reader.category_confidences('person')), 0)
+            with self.assertRaisesRegex(ValueError, 'frame with frame_id: (.*?) does not exist'):
+                reader.frame_boxes(1)
+
+    def test_json_conversion(self):
+        json_name = join(self.out_path, 'log.json')
+        binary_name = join(self.out_path, 'converted.jpdb')
+        binary_to_json(self.binary_name, json_name)
+        with open(json_name) as file:
+            self.assertEqual(json.load(file), self.json_parser.output())
+        json_to_binary(json_name, binary_name)
+        with BinaryLogReader(binary_name) as reader:
+            # compared as json, so the types of the values count
+            self.assertEqual(json.dumps(reader.output()), json.dumps(self.json_parser.output()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import unittest
+import sys
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.serializers import *
+from json_parser.delta import *
+
+
+class TestDelta(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=2)
+        self.json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        self.out_path = mkdtemp()
+
+    def add_bbox(self, frame_id, bbox_id, xywh, labels):
+        self.json_parser.add_bbox_to_frame(frame_id, bbox_id, *xywh)
+        for category, confidence in labels:
+            self.json_parser.add_label_to_bbox(frame_id, bbox_id, category, confidence)
+
+    def log_scene(self):
+        still = [('car', 0.75), ('bus', 0.25)]
+        for frame_id in range(6):
+            self.json_parser.add_frame(frame_id)
+            if frame_id == 3:
+                # reordered, with a removed, a new and a float bbox
+                self.add_bbox(frame_id, 2, (50.5, 60, 10, 10), still)
+                self.add_bbox(frame_id, 0, (10, 20, 30, 40), still)
+                self.add_bbox(frame_id, 5, (1, 2, 3, 4), [('truck', 0.5), ('car', 0.5)])
+                continue
+            self.add_bbox(frame_id, 0, (10, 20 + frame_id, 30, 40), still)
+            self.add_bbox(frame_id, 1, (100, 120, 30, 40), still if frame_id < 4 else [('bus', 0.5), ('car', 0.1)])
+            self.add_bbox(frame_id, 2, (50.5 + frame_id, 60, 10, 10), still)
+        self.json_parser.add_skipped_frames(6, 9)
+
+    def test_lossless_round_trip(self):
+        self.log_scene()
+        for keyframe_interval in (1, 2, 30):
+            self.json_parser.set_serializer(DeltaSerializer(keyframe_interval=keyframe_interval))
+            output_name = join(self.out_path, 'log{}.jdelta'.format(keyframe_interval))
+            self.json_parser.json_output(output_name)
+            decoded = decode_delta(output_name)
+            self.assertEqual(decoded, self.json_parser.output())
+            self.assertEqual(json.dumps(decoded), json.dumps(self.json_parser.output()))
+            # loaded like the other formats
+            self.assertEqual(JsonParser.load(output_name).output(), self.json_parser.output())
+
+    def test_only_changes_are_written(self):
+        self.log_scene()
+        records = list(DeltaEncoder().iter_records(self.json_parser.store))
+        self.assertEqual(records[0]['c'], ['car', 'bus'])
+        self.assertEqual(len(records[0]['n']), 3)
+        # bbox 0 moved by one pixel, the float bbox 2 is sent in full
+        self.assertEqual(records[1]['u'], [[0, 0, 1, 0, 0]])
+        self.assertEqual([entry[0] for entry in records[1]['n']], [2])
+        self.assertEqual(records[3]['r'], [1])
+        self.assertEqual(records[3]['o'], [2, 0, 5])
+        self.assertEqual(records[3]['c'], ['truck'])
+        # bbox 1 is back as a new bbox with new labels; nothing but bbox 0 changes after that
+        self.assertIn([1, DeltaMeta.INT, 100, 120, 30, 40, [[1, 0.5], [0, 0.1]]], records[4]['n'])
+        self.assertEqual(records[5]['u'], [[0, 0, 1, 0, 0]])
+
+    def test_quantized(self):
+        self.json_parser.add_frame(0)
+        self.add_bbox(0, 0, (10.123, 20, 30, 40), [('car', 0.123456), ('bus', 0.1)])
+        self.json_parser.add_frame(1)
+        self.add_bbox(1, 0, (10.124, 20, 30, 40), [('car', 0.123457), ('bus', 0.1)])
+        records = list(DeltaEncoder(coordinate_decimals=2, confidence_decimals=3).iter_records(
+            self.json_parser.store))
+        # both changes are below the precision
+        self.assertEqual(records[1], {'d': 1})
+        self.json_parser.set_serializer(DeltaSerializer(coordinate_decimals=2, confidence_decimals=3))
+        output_name = join(self.out_path, 'log.jdelta')
+        self.json_parser.json_output(output_name)
+        bbox = decode_delta(output_name)['frames'][1]['bboxes'][0]
+        self.assertEqual(bbox['top'], 10.12)
+        self.assertEqual([label['confidence'] for label in bbox['labels']], [0.123, 0.1])
+
+    def test_not_streamed(self):
+        self.json_parser.set_serializer('delta')
+        with self.assertRaises(ValueError):
+            self.json_parser.set_stream_output(join(self.out_path, 'stream'))
+        self.json_parser.add_frame(0)
+        with self.assertRaisesRegex(ValueError, 'can not be streamed frame by frame'):
+            self.json_parser.serializer.encode_frame(self.json_parser.store, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 import sys
+import numpy as np
 from unittest.case import TestCase
 
 sys.path.append('../..')
@@ -92,6 +93,103 @@ class TestFrame(TestCase):
                                     'labels in frame_id: (.*?), bbox_id: (.*?) is not fulled before outputting.'):
             out = self.json_parser.output()
 
+    def test_add_detections(self):
+        frame_one_id = 0
+        boxes = [(10, 20, 30, 40), (50, 60, 70, 80)]
+        class_ids = [[2, 0], [1, 2]]
+        confidences = [[0.9, 0.05], [0.6, 0.3]]
+        categories = ['car', 'truck', 'bus']
+        self.json_parser.set_top_k(2)
+        self.json_parser.add_frame(frame_one_id)
+        self.json_parser.add_detections(frame_one_id, boxes, [3, 7], class_ids, confidences, categories)
+
+        # same output as logging the bboxes one by one
+        other = JsonParser(top_k_labels=2)
+        other.add_frame(frame_one_id)
+        for bbox_id, xywh, ids, confs in zip([3, 7], boxes, class_ids, confidences):
+            other.add_bbox_to_frame(frame_one_id, bbox_id, *xywh)
+            for class_id, conf in zip(ids, confs):
+                other.add_label_to_bbox(frame_one_id, bbox_id, categories[class_id], conf)
+        self.assertEqual(self.json_parser.output(), other.output())
+
+        with self.assertRaisesRegex(ValueError,
+                                    'frame with frame_id: (.*?) already contains the bbox with id: (.*?) '):
+            self.json_parser.add_detections(frame_one_id, boxes, [7, 8], class_ids, confidences, categories)
+        self.json_parser.add_frame(1)
+        with self.assertRaisesRegex(ValueError,
+                                    'frame with frame_id: (.*?) already contains the bbox with id: (.*?) '):
+            self.json_parser.add_detections(1, boxes, [5, 5], class_ids, confidences, categories)
+        with self.assertRaisesRegex(ValueError, 'labels in frame_id: (.*?), bbox_id: (.*?) is fulled'):
+            self.json_parser.add_detections(1, boxes[:1], [1], [[0, 1, 2]], [[0.5, 0.3, 0.2]], categories)
+        with self.assertRaisesRegex(ValueError, 'frame with frame_id: (.*?) does not exist'):
+            self.json_parser.add_detections(2, boxes, [1, 2], class_ids, confidences, categories)
+
+    def test_add_detections_without_boxes(self):
+        # e.g. a frame where nothing survived NMS
+        self.json_parser.set_top_k(2)
+        self.json_parser.add_frame(0)
+        self.json_parser.add_detections(0, [], [], [], [], ['car'])
+        self.json_parser.add_detections(0, np.zeros((0, 4)), np.zeros(0, dtype=int), np.zeros((0, 2), dtype=int),
+                                        np.zeros((0, 2)))
+        self.json_parser.add_detections(0, [])
+        self.assertEqual(self.json_parser.output()['frames'], [{'frame_id': 0, 'bboxes': []}])
+        with self.assertRaisesRegex(ValueError, 'do not have matching shapes'):
+            self.json_parser.add_detections(0, [], [1])
+
+
+class TestValueTypes(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=2)
+        self.json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        self.json_parser.add_frame(1)
+        self.json_parser.add_bbox_to_frame(1, 0, 1, 2.5, 200, 100)
+        self.json_parser.add_label_to_bbox(1, 0, 'a', 98)
+        self.json_parser.add_label_to_bbox(1, 0, 'b', 0.5)
+
+    def test_output_keeps_value_types(self):
+        # the values come out as they were logged, like the Frame/Bbox/Label objects did
+        bbox = self.json_parser.output()['frames'][0]['bboxes'][0]
+        self.assertEqual(bbox, {'labels': [{'category': 'a', 'confidence': 98}, {'category': 'b', 'confidence': 0.5}],
+                                'bbox_id': 0, 'top': 1, 'left': 2.5, 'width': 200, 'height': 100})
+        self.assertEqual([type(bbox[key]) for key in ('top', 'left', 'width', 'height')], [int, float, int, int])
+        self.assertIsInstance(bbox['labels'][0]['confidence'], int)
+
+    def test_bad_bbox_does_not_break_the_parser(self):
+        with self.assertRaisesRegex(ValueError, 'needs integer ids and numeric top, left, width and height'):
+            self.json_parser.add_bbox_to_frame(1, 1, 1, 2, None, 4)
+        self.json_parser.add_bbox_to_frame(1, 1, 1, 2, 3, 4)
+        self.json_parser.add_label_to_bbox(1, 1, 'a', 0.5)
+        self.json_parser.add_label_to_bbox(1, 1, 'b', 0.25)
+        self.assertEqual(len(self.json_parser.output()['frames'][0]['bboxes']), 2)
+
+    def test_find_bbox_writes_through(self):
+        bbox = self.json_parser.find_bbox(1, 0)
+        self.assertEqual((bbox.top, bbox.left, bbox.width, bbox.height), (1, 2.5, 200, 100))
+        bbox.set_xywh_tuple((5, 6, 7, 8))
+        self.assertEqual(self.json_parser.output()['frames'][0]['bboxes'][0]['top'], 5)
+        bbox.set_xywh_dict({'top': 9, 'left': 10, 'width': 11, 'height': 12})
+        bbox.height = 13.5
+        self.assertEqual(bbox.dic(), self.json_parser.output()['frames'][0]['bboxes'][0])
+        self.assertEqual(bbox.dic()['height'], 13.5)
+        self.assertEqual([label.confidence for label in bbox.labels], [98, 0.5])
+        with self.assertRaisesRegex(ValueError, 'labels in frame_id: (.*?), bbox_id: (.*?) is fulled'):
+            bbox.add_label('c', 0.1)
+
+
+class TestFrameIndex(TestCase):
+
+    def test_bbox_index(self):
+        frame = Frame(0)
+        frame.add_bbox(5, 1, 2, 3, 4)
+        self.assertTrue(frame.has_bbox(5))
+        self.assertIs(frame.find_bbox(5), frame.bboxes[0])
+        self.assertIsNone(frame.find_bbox(6))
+        with self.assertRaisesRegex(ValueError, 'Frame with id: (.*?) already has a Bbox with id: (.*?)'):
+            frame.add_bbox(5, 1, 2, 3, 4)
+        # the index is not part of the output
+        self.assertEqual(list(frame.dic().keys()), ['frame_id', 'bboxes'])
+
 
 if __name__ == '__main__':
     unittest.main()
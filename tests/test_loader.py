@@ -0,0 +1,162 @@
+import json
+import resource
+import unittest
+import sys
+from os import listdir
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.loader import *
+from json_parser.serializers import available_serializers
+
+
+class TestLoader(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=2)
+        self.json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        self.out_path = mkdtemp()
+
+    def log_frames(self, json_parser, frames):
+        for frame_id in frames:
+            json_parser.add_frame(frame_id)
+            for bbox_id in range(2):
+                json_parser.add_bbox_to_frame(frame_id, bbox_id, frame_id, bbox_id, 30, 40.5)
+                json_parser.add_label_to_bbox(frame_id, bbox_id, 'car', 0.75)
+                json_parser.add_label_to_bbox(frame_id, bbox_id, 'bus', 0.25)
+
+    def test_from_output(self):
+        self.log_frames(self.json_parser, range(3))
+        output = self.json_parser.output()
+        loaded = JsonParser.from_output(output)
+        self.assertEqual(loaded.top_k_labels, 2)
+        self.assertEqual(loaded.output(), output)
+
+    def test_load_formats(self):
+        self.log_frames(self.json_parser, range(3))
+        expected = self.json_parser.output()
+        self.json_parser.json_output(join(self.out_path, 'log.json'))
+        self.json_parser.binary_output(join(self.out_path, 'log.jpdb'))
+        for name in ('log.json', 'log.jpdb'):
+            self.assertEqual(JsonParser.load(join(self.out_path, name)).output(), expected)
+
+        stream_path = join(self.out_path, 'stream')
+        streamed = JsonParser(top_k_labels=2)
+        streamed.add_video_details(500, 200, 20, 'something.mp4')
+        streamed.set_stream_output(stream_path, seconds=None, max_bytes=1)
+        self.log_frames(streamed, range(3))
+        streamed.close()
+        # the rotated files are merged into one timeline
+        self.assertEqual(JsonParser.load(stream_path).output(), expected)
+
+    def test_skipped_frames(self):
+        self.json_parser.add_skipped_frames(0, 3, step=4)
+        self.log_frames(self.json_parser, [4])
+        self.json_parser.add_skipped_frames(5)
+        self.json_parser.add_skipped_frames(6, 7)
+        self.json_parser.add_skipped_frames(8, reason='static')
+        expected = self.json_parser.output()
+        self.assertEqual(expected['skipped_frames'], [{'first': 0, 'last': 3, 'reason': 'step', 'step': 4},
+                                                      {'first': 5, 'last': 7, 'reason': 'step', 'step': None},
+                                                      {'first': 8, 'last': 8, 'reason': 'static', 'step': None}])
+        self.json_parser.json_output(join(self.out_path, 'log.json'))
+        self.json_parser.binary_output(join(self.out_path, 'log.jpdb'))
+        for name in ('log.json', 'log.jpdb'):
+            self.assertEqual(JsonParser.load(join(self.out_path, name)).output(), expected)
+
+        stream_path = join(self.out_path, 'stream')
+        streamed = JsonParser(top_k_labels=2)
+        streamed.add_video_details(500, 200, 20, 'something.mp4')
+        streamed.set_stream_output(stream_path, seconds=None)
+        streamed.add_skipped_frames(0, 3, step=4)
+        self.log_frames(streamed, [4])
+        streamed.add_skipped_frames(5, 7)
+        streamed.add_skipped_frames(8, reason='static')
+        streamed.close()
+        self.assertEqual(JsonParser.load(stream_path).output(), expected)
+
+    def test_merge_windows(self):
+        for i, frames in enumerate([range(0, 3), range(3, 5)]):
+            window = JsonParser(top_k_labels=2)
+            window.add_video_details(500, 200, 20, 'something.mp4')
+            self.log_frames(window, frames)
+            self.log_frames(self.json_parser, frames)
+            window.json_output(join(self.out_path, '2026-10-18 10-0{}-00.json'.format(i)))
+        self.assertEqual(JsonParser.load(self.out_path).output(), self.json_parser.output())
+
+        self.json_parser.json_output(join(self.out_path, 'all.json'))
+        with self.assertRaisesRegex(ValueError, "Frame id: (.*?) already exists"):
+            JsonParser.load(self.out_path)
+
+    def test_lazy_frames(self):
+        self.log_frames(self.json_parser, [4, 8])
+        self.json_parser.json_output(join(self.out_path, 'log.json'))
+        with LogReader(join(self.out_path, 'log.json')) as reader:
+            self.assertEqual(reader.frame_ids, [4, 8])
+            frame = reader.frame(8)
+            self.assertIsInstance(frame, Frame)
+            self.assertEqual(frame.dic(), self.json_parser.get_frame(8).dic())
+            self.assertEqual(reader.to_parser(frame_ids=[8]).output()['frames'],
+                             self.json_parser.output()['frames'][1:])
+
+    def test_many_files(self):
+        # more window files than the process may open at once
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (len(listdir('/proc/self/fd')) + 64, hard))
+        try:
+            for frame_id in range(150):
+                window = JsonParser(top_k_labels=2)
+                window.add_video_details(500, 200, 20, 'something.mp4')
+                self.log_frames(window, [frame_id])
+                self.log_frames(self.json_parser, [frame_id])
+                name = join(self.out_path, '{:03d}'.format(frame_id))
+                if frame_id % 2:
+                    window.binary_output(name)
+                else:
+                    window.json_output(name)
+            with LogReader(self.out_path) as reader:
+                self.assertEqual(len(reader), 150)
+                self.assertEqual(reader.to_parser().output(), self.json_parser.output())
+        finally:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    def test_json_layouts(self):
+        # indented, not ascii and with values larger than the chunks the header is decoded from
+        self.json_parser.add_video_details(500, 200, 20, 'x' * 3 * LoaderMeta.JSON_CHUNK + '.mp4')
+        self.log_frames(self.json_parser, [4, 8, 9])
+        self.json_parser.add_bbox_to_frame(9, 2, 1, 2, 3, 4)
+        self.json_parser.add_label_to_bbox(9, 2, 'vélo "frame_id": 1}', 0.5)
+        self.json_parser.add_label_to_bbox(9, 2, 'bus', 0.5)
+        self.json_parser.add_skipped_frames(10, 12)
+        expected = self.json_parser.output()
+        path = join(self.out_path, 'log.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(expected, file, indent=2, ensure_ascii=False)
+        with LogReader(path) as reader:
+            self.assertEqual(reader.frame_ids, [4, 8, 9])
+            self.assertEqual(reader.frame_dict(9), expected['frames'][2])
+            self.assertEqual(reader.to_parser().output(), expected)
+
+    def test_msgpack(self):
+        self.json_parser.add_skipped_frames(0, 3)
+        self.log_frames(self.json_parser, [4, 8])
+        expected = self.json_parser.output()
+        path = join(self.out_path, 'log.msgpack')
+        if 'msgpack' not in available_serializers():
+            open(path, 'wb').close()
+            with self.assertRaisesRegex(ImportError, 'needs the msgpack package'):
+                LogReader(path)
+            return
+        self.json_parser.set_serializer('msgpack')
+        self.json_parser.json_output(path)
+        with LogReader(self.out_path) as reader:
+            self.assertEqual(reader.frame_ids, [4, 8])
+            self.assertEqual(reader.frame_dict(8), expected['frames'][1])
+            self.assertEqual(reader.to_parser().output(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
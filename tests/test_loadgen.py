@@ -0,0 +1,81 @@
+import unittest
+import sys
+from itertools import islice
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+import numpy as np
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.benchmarks.synthetic import *
+from json_parser.benchmarks.loadgen import *
+
+
+class TestLoadGenerator(TestCase):
+
+    def setUp(self) -> None:
+        self.out_path = mkdtemp()
+
+    def test_synthetic_tracks(self):
+        frames = list(islice(synthetic_tracks(objects=10, top_k=3, num_categories=5, burst_probability=0), 300))
+        for frame_id, boxes, bbox_ids, class_ids, confidences in frames:
+            self.assertEqual(len(set(bbox_ids.tolist())), len(bbox_ids))
+            self.assertEqual(boxes.shape, (len(bbox_ids), 4))
+            self.assertTrue(all(len(set(codes)) == 3 for codes in class_ids.tolist()))
+            self.assertTrue(((confidences >= 0) & (confidences <= 1)).all())
+        # tracks keep their bbox id from frame to frame
+        self.assertTrue(set(frames[0][2].tolist()) & set(frames[1][2].tolist()))
+        calm = np.mean([len(frame[1]) for frame in frames])
+        bursty = np.mean([len(frame[1]) for frame in islice(
+            synthetic_tracks(objects=10, top_k=3, num_categories=5, burst_probability=1, burst_frames=1e9), 300)])
+        self.assertGreater(bursty, 2 * calm)
+
+    def test_drive(self):
+        source = SyntheticSource(frames=50, objects=5, top_k=2)
+        result = drive(source, join(self.out_path, 'windows'), speed=0)
+        self.assertEqual(result['frames'], 50)
+        self.assertEqual(len(result['inserts']), 50)
+        self.assertEqual(result['windows'], 1)
+        self.assertGreater(result['memory'][-1]['resident_bytes'], 0)
+        self.assertEqual(len(JsonParser.load(join(self.out_path, 'windows')).store.frames), 50)
+
+        summary = report([result, result])
+        self.assertEqual(summary['frames'], 100)
+        self.assertEqual(summary['insert']['count'], 100)
+        self.assertEqual(summary['insert']['max'], max(result['inserts']))
+
+    def test_replay(self):
+        json_parser = synthetic_log(num_frames=10, boxes_per_frame=3, top_k=2, num_categories=5)
+        json_parser.json_output(join(self.out_path, 'recorded.json'))
+        source = ReplaySource(join(self.out_path, 'recorded.json'), loops=2)
+        self.assertEqual(source.top_k, 2)
+        self.assertEqual(source.frames, 20)
+        result = drive(source, join(self.out_path, 'replayed'), speed=0, serializer='delta')
+        self.assertEqual(result['frames'], 20)
+        frames = JsonParser.load(join(self.out_path, 'replayed')).output()['frames']
+        self.assertEqual(frames[:10], json_parser.output()['frames'])
+        self.assertEqual([frame['frame_id'] for frame in frames[10:]], list(range(10, 20)))
+
+    def test_replay_empty_frames(self):
+        json_parser = synthetic_log(num_frames=2, boxes_per_frame=3, top_k=2, num_categories=5)
+        json_parser.add_frame(2)
+        json_parser.json_output(join(self.out_path, 'recorded.json'))
+        frames = list(ReplaySource(join(self.out_path, 'recorded.json')))
+        frame_id, boxes, bbox_ids, class_ids, confidences, label_names = frames[-1]
+        self.assertEqual((frame_id, boxes.shape, class_ids.shape, confidences.shape), (2, (0, 4), (0, 2), (0, 2)))
+        drive(ReplaySource(join(self.out_path, 'recorded.json')), join(self.out_path, 'replayed'), speed=0)
+        self.assertEqual(JsonParser.load(join(self.out_path, 'replayed')).output()['frames'],
+                         json_parser.output()['frames'])
+
+    def test_processes(self):
+        summary = main(['--frames', '20', '--objects', '3', '--speed', '0', '--processes', '2',
+                        '--output', join(self.out_path, 'report.json')])
+        self.assertEqual(summary['streams'], 2)
+        self.assertEqual(summary['frames'], 40)
+        self.assertEqual(len(summary['memory']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
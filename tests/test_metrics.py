@@ -0,0 +1,100 @@
+import json
+import unittest
+import sys
+from os.path import exists, join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.metrics import *
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self) -> None:
+        self.out_path = mkdtemp()
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for value in (0.001, 0.002, 0.003, 0.1):
+            histogram.add(value)
+        summary = histogram.summary()
+        self.assertEqual(summary['count'], 4)
+        self.assertAlmostEqual(summary['total'], 0.106)
+        self.assertEqual((summary['min'], summary['max']), (0.001, 0.1))
+        # percentiles are bucket upper bounds: within a factor of 2 of the value
+        self.assertTrue(0.002 <= summary['p50'] < 0.004)
+        self.assertEqual(summary['p99'], 0.1)
+
+    def test_timers_and_counters(self):
+        metrics = Metrics()
+        with metrics.time('forward'):
+            pass
+        metrics.add_time('forward', 0.5)
+        metrics.count('boxes', 3)
+        metrics.observe('boxes_per_frame', 3)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['timers']['forward']['count'], 2)
+        self.assertEqual(snapshot['counters'], {'boxes': 3})
+        self.assertEqual(snapshot['histograms']['boxes_per_frame']['max'], 3)
+        json.dumps(snapshot)
+
+        disabled = Metrics(enabled=False)
+        with disabled.time('forward'):
+            disabled.count('boxes')
+        self.assertEqual(disabled.snapshot()['timers'], {})
+        self.assertEqual(disabled.snapshot()['counters'], {})
+
+    def test_parser_metrics(self):
+        json_parser = JsonParser(top_k_labels=1)
+        json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        metrics_name = join(self.out_path, 'run' + MetricsMeta.EXTENSION)
+        json_parser.set_metrics_output(metrics_name, seconds=0)
+        for frame_id in range(3):
+            json_parser.add_frame(frame_id)
+            json_parser.add_detections(frame_id, [[1, 2, 3, 4], [5, 6, 7, 8]], class_ids=[1, 2],
+                                       confidences=[0.5, 0.25])
+        json_parser.json_output(join(self.out_path, 'log.json'))
+        counters = json_parser.metrics.snapshot()['counters']
+        self.assertEqual(counters['frames'], 3)
+        self.assertEqual(counters['boxes'], 6)
+        self.assertEqual(counters['bytes_written'], len(json.dumps(json_parser.output())))
+        self.assertEqual(set(json_parser.metrics.snapshot()['timers']), {'log_insert', 'serialize', 'disk_write'})
+        with open(metrics_name) as file:
+            snapshots = [json.loads(line) for line in file]
+        # one snapshot per frame with an interval of 0
+        self.assertEqual([snapshot['counters']['frames'] for snapshot in snapshots], [1, 2, 3])
+
+    def test_metrics_in_the_log_stream(self):
+        json_parser = JsonParser(top_k_labels=1)
+        json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        with self.assertRaises(ValueError):
+            json_parser.set_metrics_output()
+        stream_path = join(self.out_path, 'stream')
+        json_parser.set_stream_output(stream_path, seconds=None)
+        json_parser.set_metrics_output(seconds=0)
+        sink = json_parser.sink
+        for frame_id in range(2):
+            json_parser.add_frame(frame_id)
+        json_parser.close()
+        with open(sink.files[0]) as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(sum('metrics' in record for record in records), 2)
+        self.assertEqual(list(JsonParser.load(stream_path).store.frames), [0, 1])
+
+    def test_profile_window(self):
+        metrics = Metrics()
+        name = join(self.out_path, 'profile')
+        profiler = metrics.start_profile(name, frames=2, memory=True)
+        metrics.frame()
+        self.assertTrue(profiler.running)
+        metrics.frame()
+        self.assertFalse(profiler.running)
+        self.assertIsNone(metrics.profiler)
+        self.assertTrue(exists(name + '.prof'))
+        self.assertTrue(exists(name + '.tracemalloc.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
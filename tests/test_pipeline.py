@@ -0,0 +1,113 @@
+import unittest
+import sys
+from random import Random
+from time import sleep
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.object_detection.pipeline import *
+
+
+class TestPipeline(TestCase):
+
+    def setUp(self) -> None:
+        self.num_frames = 40
+        self.read_frames = iter(range(self.num_frames))
+
+    def read(self):
+        frame = next(self.read_frames, None)
+        return frame is not None, frame
+
+    @staticmethod
+    def make_infer():
+        rnd = Random(threading.get_ident())
+
+        def infer(frames):
+            # workers finish out of order
+            sleep(rnd.random() / 200)
+            return [frame * 10 for frame in frames]
+        return infer
+
+    def test_frames_stay_in_order(self):
+        logged, written = [], []
+
+        def postprocess(frame_id, frame, outputs):
+            logged.append((frame_id, frame, outputs))
+            return frame
+
+        pipeline = Pipeline(self.read, self.make_infer, postprocess, written.append, workers=4, queue_size=2,
+                            step=2)
+        meters = pipeline.run()
+        # frame_counter starts at 1, every second frame is analysed
+        self.assertEqual(logged, [(i + 1, i, i * 10) for i in range(1, self.num_frames, 2)])
+        self.assertEqual(written, list(range(1, self.num_frames, 2)))
+        self.assertEqual(meters['inference'].count, self.num_frames // 2)
+        self.assertEqual(meters['write'].count, self.num_frames // 2)
+
+    def test_batches(self):
+        batches, logged = [], []
+
+        def make_infer():
+            def infer(frames):
+                batches.append(len(frames))
+                return [frame * 10 for frame in frames]
+            return infer
+
+        def postprocess(frame_id, frame, outputs):
+            logged.append(outputs)
+            return frame
+
+        Pipeline(self.read, make_infer, postprocess, lambda frame: None, workers=3, step=3, batch_size=4).run()
+        # 13 analysed frames: three batches of 4 and the rest
+        self.assertEqual(sorted(batches), [1, 4, 4, 4])
+        self.assertEqual(logged, [i * 10 for i in range(2, self.num_frames, 3)])
+
+    def test_select_and_observe(self):
+        logged, observed = [], []
+
+        def select(frame_id, frame):
+            return frame_id in (3, 4, 20)
+
+        def postprocess(frame_id, frame, outputs):
+            logged.append(frame_id)
+            return frame
+
+        Pipeline(self.read, self.make_infer, postprocess, lambda frame: None, workers=2, step=2, select=select,
+                 observe=lambda seconds, count: observed.append(count)).run()
+        self.assertEqual(logged, [3, 4, 20])
+        self.assertEqual(sum(observed), 3)
+
+    def test_errors_are_raised(self):
+        def postprocess(frame_id, frame, outputs):
+            if frame_id == 10:
+                raise ValueError("frame with frame_id: 10 does not exist")
+            return frame
+
+        pipeline = Pipeline(self.read, self.make_infer, postprocess, lambda frame: None, workers=2, queue_size=1)
+        with self.assertRaises(ValueError):
+            pipeline.run()
+
+    def test_failing_workers(self):
+        def make_infer():
+            raise ValueError("no network")
+
+        # the decoder is left with a full queue and nobody to take the frames
+        pipeline = Pipeline(self.read, make_infer, lambda frame_id, frame, outputs: frame, lambda frame: None,
+                            workers=2, queue_size=1)
+        errors = []
+
+        def run():
+            try:
+                pipeline.run()
+            except ValueError as error:
+                errors.append(error)
+
+        runner = threading.Thread(target=run, daemon=True)
+        runner.start()
+        runner.join(timeout=5)
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(str(errors[0]), 'no network')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import sys
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.query import *
+
+
+class TestQuery(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=2)
+        self.json_parser.add_video_details(500, 200, 10, 'something.mp4')
+        # frame_id, bbox_id, xywh, labels
+        self.detections = [(0, 0, (0, 0, 10, 10), [('car', 0.9), ('truck', 0.1)]),
+                           (0, 1, (50, 50, 100, 100), [('truck', 0.85), ('car', 0.1)]),
+                           (10, 0, (0, 0, 10, 10), [('truck', 0.5), ('bus', 0.4)]),
+                           (20, 0, (200, 100, 20, 20), [('truck', 0.95), ('car', 0.05)]),
+                           (30, 3, (0, 0, 10, 10), [('person', 0.99), ('car', 0.01)])]
+        for frame_id, bbox_id, xywh, labels in self.detections:
+            if not self.json_parser.frame_exists(frame_id):
+                self.json_parser.add_frame(frame_id)
+            self.json_parser.add_bbox_to_frame(frame_id, bbox_id, *xywh)
+            for category, confidence in labels:
+                self.json_parser.add_label_to_bbox(frame_id, bbox_id, category, confidence)
+        self.index = self.json_parser.build_index()
+
+    def test_category_and_confidence(self):
+        result = self.index.query(category='truck', min_confidence=0.8)
+        self.assertEqual(list(zip(result.frame_ids.tolist(), result.bbox_ids.tolist())), [(0, 1), (20, 0)])
+        self.assertEqual(len(self.index.query(category='truck')), 4)
+        self.assertEqual(len(self.index.query(category='plane')), 0)
+        self.assertEqual(self.index.category_confidences('car').tolist(), [0.01, 0.05, 0.1, 0.9])
+        self.assertEqual(self.index.query(min_confidence=0.9).frame_ids.tolist(), [0, 20, 30])
+
+    def test_frames_and_geometry(self):
+        self.assertEqual(self.index.query(frame_range=(5, 20)).frame_ids.tolist(), [10, 20])
+        # frame_rate is 10, so 1 to 2 seconds are frames 10 to 20
+        self.assertEqual(self.index.query(time_range=(1, 2)).frame_ids.tolist(), [10, 20])
+        self.assertEqual(self.index.query(category='truck', frame_range=(0, 10)).frame_ids.tolist(), [0, 0, 10])
+        # frames numbered from 1, like the detector: 1 to 2 seconds are frames 11 to 21
+        index = self.json_parser.build_index(first_frame_id=1)
+        self.assertEqual(index.query(time_range=(1, 2)).frame_ids.tolist(), [20])
+        self.assertEqual(index.query(time_range=(0, 1)).frame_ids.tolist(), [10])
+        self.assertEqual(index.time_to_frame(0), 1)
+        self.assertEqual(self.index.query(min_area=1000).bbox_ids.tolist(), [1])
+        result = self.index.query(region=(195, 95, 10, 10))
+        self.assertEqual(result.frame_ids.tolist(), [20])
+        self.assertEqual(result.boxes.tolist(), [[200, 100, 20, 20]])
+        self.assertEqual(result.categories().tolist(), [['truck', 'car']])
+
+    def test_binary_log(self):
+        path = join(mkdtemp(), 'log.jpdb')
+        self.json_parser.binary_output(path)
+        index = DetectionIndex.load(path)
+        for kwargs in [dict(category='truck', min_confidence=0.8), dict(frame_range=(5, 20)), dict(min_area=1000)]:
+            self.assertEqual(index.query(**kwargs).frame_ids.tolist(),
+                             self.index.query(**kwargs).frame_ids.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
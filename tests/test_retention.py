@@ -0,0 +1,109 @@
+import unittest
+import sys
+from os import listdir
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.serializers import *
+
+
+class TestRetention(TestCase):
+
+    def setUp(self) -> None:
+        self.out_path = mkdtemp()
+        self.spill_path = join(self.out_path, 'segments')
+        self.unbounded = JsonParser(top_k_labels=2)
+        self.bounded = JsonParser(top_k_labels=2)
+        self.bounded.set_retention(max_frames=3, spill_path=self.spill_path)
+
+    def log_frames(self, json_parser, frames):
+        for frame_id in frames:
+            json_parser.add_video_details(500, 200, 20, 'something.mp4')
+            json_parser.add_frame(frame_id)
+            for bbox_id in range(2):
+                json_parser.add_bbox_to_frame(frame_id, bbox_id, frame_id, bbox_id + 0.5, 30, 40)
+                # a category per frame, so every segment has its own category table
+                json_parser.add_label_to_bbox(frame_id, bbox_id, 'category_{}'.format(frame_id % 4), 0.75)
+                json_parser.add_label_to_bbox(frame_id, bbox_id, 'bus', 0.25)
+
+    def read(self, name):
+        with open(join(self.out_path, name), 'rb') as file:
+            return file.read()
+
+    def test_outputs_are_identical(self):
+        for json_parser in (self.unbounded, self.bounded):
+            self.log_frames(json_parser, range(10))
+        self.assertEqual(len(self.bounded.segments), 3)
+        self.assertEqual(len(self.bounded.store.frames), 1)
+        self.assertEqual(self.bounded.output(), self.unbounded.output())
+
+        for serializer in available_serializers():
+            for name, json_parser in (('unbounded', self.unbounded), ('bounded', self.bounded)):
+                json_parser.set_serializer(serializer)
+                json_parser.json_output(join(self.out_path, name + serializer))
+                json_parser.binary_output(join(self.out_path, name))
+            self.assertEqual(self.read('bounded' + serializer + self.bounded.serializer.extension),
+                             self.read('unbounded' + serializer + self.unbounded.serializer.extension), serializer)
+        self.assertEqual(self.read('bounded.jpdb'), self.read('unbounded.jpdb'))
+
+        self.assertEqual(self.bounded.get_frame(1).dic(), self.unbounded.get_frame(1).dic())
+        self.assertEqual(len(self.bounded.build_index().query(category='category_1')), 6)
+        with self.assertRaisesRegex(ValueError, "Frame id: (.*?) already exists"):
+            self.bounded.add_frame(1)
+
+    def test_spilled_frames_are_read_only(self):
+        self.log_frames(self.bounded, range(4))
+        self.assertIn(0, self.bounded.segments)
+        with self.assertRaisesRegex(ValueError, 'frame with frame_id: 0 is spilled and can not be changed'):
+            self.bounded.add_bbox_to_frame(0, 5, 1, 2, 3, 4)
+        with self.assertRaisesRegex(ValueError, 'frame with frame_id: 0 is spilled and can not be changed'):
+            self.bounded.add_label_to_bbox(0, 0, 'car', 0.5)
+        with self.assertRaisesRegex(ValueError, 'frame with frame_id: 0 is spilled and can not be changed'):
+            self.bounded.add_detections(0, [(1, 2, 3, 4)], [5], [[0, 1]], [[0.5, 0.5]], ['car', 'bus'])
+        with self.assertRaisesRegex(ValueError, 'frame with frame_id: 9 does not exist'):
+            self.bounded.add_bbox_to_frame(9, 5, 1, 2, 3, 4)
+        # the frame in memory can still be changed
+        self.bounded.add_detections(3, [(1, 2, 3, 4)], [5], [[0, 1]], [[0.5, 0.5]], ['car', 'bus'])
+
+    def test_limits(self):
+        json_parser = JsonParser(top_k_labels=2)
+        json_parser.set_retention(max_bytes=1, spill_path=self.spill_path)
+        self.log_frames(json_parser, range(3))
+        # every complete frame is over the limit
+        self.assertEqual(len(json_parser.segments), 2)
+        self.assertEqual(json_parser.metrics.snapshot()['counters']['spilled_frames'], 2)
+        self.assertIn('memory_bytes', json_parser.metrics.snapshot()['gauges'])
+
+        json_parser = JsonParser(top_k_labels=2)
+        json_parser.set_retention(max_age=0, spill_path=self.spill_path)
+        self.log_frames(json_parser, range(3))
+        self.assertEqual(len(json_parser.segments), 2)
+
+    def test_incomplete_labels(self):
+        self.log_frames(self.bounded, range(2))
+        self.bounded.add_frame(2)
+        self.bounded.add_bbox_to_frame(2, 0, 1, 2, 3, 4)
+        self.log_frames(self.bounded, range(3, 6))
+        self.assertIn(2, self.bounded.segments)
+        with self.assertRaisesRegex(ValueError, "labels in frame_id: 2, bbox_id: 0 is not fulled"):
+            self.bounded.output()
+
+    def test_segments_are_removed(self):
+        self.log_frames(self.bounded, range(5))
+        self.bounded.output_window(join(self.out_path, 'windows'))
+        self.assertEqual(listdir(self.spill_path), [])
+
+        self.bounded.set_async_output()
+        self.log_frames(self.bounded, range(5, 10))
+        self.bounded.output_window(join(self.out_path, 'async'))
+        self.bounded.flush()
+        self.assertEqual(listdir(self.spill_path), [])
+        self.log_frames(self.unbounded, range(5, 10))
+        self.assertEqual(JsonParser.load(join(self.out_path, 'async')).output(), self.unbounded.output())
+
+
+if __name__ == '__main__':
+    unittest.main()
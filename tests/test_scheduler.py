@@ -0,0 +1,64 @@
+import unittest
+import sys
+from unittest.case import TestCase
+
+import numpy as np
+
+sys.path.append('../..')
+from json_parser.object_detection.scheduler import *
+
+
+class TestFrameScheduler(TestCase):
+
+    def test_fixed_step(self):
+        scheduler = FrameScheduler(step=4)
+        selected = [frame_id for frame_id in range(1, 13) if scheduler.select(frame_id)]
+        self.assertEqual(selected, [frame_id for frame_id in range(1, 13) if frame_id % 4 == 0])
+        self.assertEqual(scheduler.pop_skipped(until=8), [{'first': 1, 'last': 3, 'reason': 'step', 'step': 4},
+                                                          {'first': 5, 'last': 7, 'reason': 'step', 'step': 4}])
+        self.assertEqual(scheduler.pop_skipped(), [{'first': 9, 'last': 11, 'reason': 'step', 'step': 4}])
+
+    def test_pop_splits_runs(self):
+        scheduler = FrameScheduler(step=10)
+        scheduler.select(1)
+        scheduler.select(2)
+        scheduler.select(3)
+        self.assertEqual(scheduler.pop_skipped(until=3), [{'first': 1, 'last': 2, 'reason': 'step', 'step': 10}])
+        self.assertEqual(scheduler.pop_skipped(), [{'first': 3, 'last': 3, 'reason': 'step', 'step': 10}])
+
+    def test_adaptive_step(self):
+        scheduler = FrameScheduler(step=1, adaptive=True, target_fps=30, max_step=5, smoothing=1)
+        # 0.1 s per frame at 30 fps needs a step of 3, reached one step at a time
+        for expected in (2, 3, 3):
+            scheduler.observe(0.1)
+            self.assertEqual(scheduler.step, expected)
+        scheduler.observe(10.0)
+        self.assertEqual(scheduler.step, 4)
+        for _ in range(10):
+            scheduler.observe(0.001)
+        self.assertEqual(scheduler.step, 1)
+
+        scheduler.step = 3
+        self.assertTrue(scheduler.select(3))
+        self.assertFalse(scheduler.select(4))
+        self.assertEqual(scheduler.pop_skipped(), [{'first': 4, 'last': 4, 'reason': 'load', 'step': 3}])
+
+    def test_not_adaptive_without_target(self):
+        scheduler = FrameScheduler(step=2, adaptive=True)
+        scheduler.observe(10.0)
+        self.assertEqual(scheduler.step, 2)
+
+    def test_static_frames(self):
+        scheduler = FrameScheduler(motion_threshold=5, max_step=3)
+        still = np.zeros((48, 64, 3), dtype=np.uint8)
+        moving = np.full((48, 64, 3), 50, dtype=np.uint8)
+        decisions = [scheduler.select(frame_id, frame) for frame_id, frame in
+                     enumerate([still, still, still, still, moving, moving], start=1)]
+        # a still scene is still analysed every max_step frames
+        self.assertEqual(decisions, [True, False, False, True, True, False])
+        self.assertEqual(scheduler.pop_skipped(), [{'first': 2, 'last': 3, 'reason': 'static', 'step': 1},
+                                                   {'first': 6, 'last': 6, 'reason': 'static', 'step': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import unittest
+import sys
+from os.path import join
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+from json_parser.serializers import *
+from json_parser.delta import *
+
+
+class TestSerializers(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=2)
+        self.json_parser.add_video_details(500, 200, 20.5, 'something.mp4')
+        self.json_parser.add_frame(0)
+        self.json_parser.add_frame(3)
+        self.json_parser.add_bbox_to_frame(3, 0, 10, 20, 30, 40)
+        self.json_parser.add_bbox_to_frame(3, 7, 10.5, 20, 30.25, 40)
+        for bbox_id in (0, 7):
+            self.json_parser.add_label_to_bbox(3, bbox_id, 'car', 0.1 + 0.2)
+            self.json_parser.add_label_to_bbox(3, bbox_id, 'véhicule "x"', 1e-07)
+        # integer confidences and a mix of integer and float coordinates keep their types
+        self.json_parser.add_bbox_to_frame(0, 1, 1, 2.5, 3, 4.0)
+        self.json_parser.add_label_to_bbox(0, 1, 'car', 98)
+        self.json_parser.add_label_to_bbox(0, 1, 'bus', 2)
+        self.out_path = mkdtemp()
+
+    def test_json_is_byte_identical(self):
+        self.json_parser.add_frame(4)
+        self.json_parser.add_bbox_to_frame(4, 0, 10, 20, 30, 40)
+        self.json_parser.add_label_to_bbox(4, 0, 'car', float('nan'))
+        self.json_parser.add_label_to_bbox(4, 0, 'bus', float('inf'))
+        output_name = join(self.out_path, 'out.json')
+        self.json_parser.json_output(output_name)
+        with open(output_name, 'rb') as file:
+            self.assertEqual(file.read(), json.dumps(self.json_parser.output()).encode())
+
+    def test_skipped_frames_are_byte_identical(self):
+        self.json_parser.add_skipped_frames(1, 2, reason='static', step=1)
+        output_name = join(self.out_path, 'out.json')
+        self.json_parser.json_output(output_name)
+        with open(output_name, 'rb') as file:
+            self.assertEqual(file.read(), json.dumps(self.json_parser.output()).encode())
+
+    def test_backends_keep_the_schema(self):
+        self.json_parser.add_skipped_frames(1, 2, reason='static', step=1)
+        expected = self.json_parser.output()
+        for name in available_serializers():
+            serializer = get_serializer(name)
+            data = b''.join(serializer.iter_output(self.json_parser.store, self.json_parser.video_details,
+                                                   self.json_parser.skipped_frames))
+            if name == 'msgpack':
+                import msgpack
+                decoded = msgpack.unpackb(data)
+            elif name == 'delta':
+                decoded = decode_records(json.loads(line) for line in data.splitlines())
+            else:
+                decoded = json.loads(data)
+            # compared as json, so 98 and 98.0 differ
+            self.assertEqual(json.dumps(decoded), json.dumps(expected), name)
+
+    def test_fallback(self):
+        if 'msgpack' in available_serializers():
+            self.skipTest('msgpack is installed')
+        with self.assertWarns(UserWarning):
+            self.assertIsInstance(get_serializer('msgpack'), JsonSerializer)
+        with self.assertRaises(ValueError):
+            get_serializer('xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
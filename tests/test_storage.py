@@ -0,0 +1,69 @@
+import unittest
+import sys
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.storage import *
+
+
+class TestDetectionStore(TestCase):
+
+    def setUp(self) -> None:
+        self.store = DetectionStore(label_stride=1)
+        self.store.add_frame(0)
+        self.store.add_frame(1)
+
+    def test_rows_keep_frame_order(self):
+        self.store.add_bbox(1, 5, 1, 2, 3, 4)
+        self.store.add_bbox(0, 7, 10, 20, 30, 40)
+        self.store.add_bbox(1, 6, 5, 6, 7, 8)
+        frames = list(self.store.iter_frame_dicts())
+        self.assertEqual([frame['frame_id'] for frame in frames], [0, 1])
+        self.assertEqual([bbox['bbox_id'] for bbox in frames[1]['bboxes']], [5, 6])
+        self.assertEqual(frames[0]['bboxes'][0]['top'], 10)
+
+    def test_coordinate_types_are_kept(self):
+        int_row = self.store.add_bbox(0, 0, 1, 2, 3, 4)
+        mixed_row = self.store.add_bbox(0, 1, 0.5, 2, 3.0, 4)
+        self.assertTrue(all(isinstance(v, int) for v in self.store.coordinates(int_row)))
+        self.assertEqual([type(v) for v in self.store.coordinates(mixed_row)], [float, int, float, int])
+        self.store.add_label(int_row, 'car', 98)
+        self.store.add_label(mixed_row, 'car', 0.5)
+        self.assertEqual([type(self.store.labels(row)[0][1]) for row in (int_row, mixed_row)], [int, float])
+
+    def test_bad_values_leave_the_columns_intact(self):
+        row = self.store.add_bbox(0, 0, 1, 2, 3, 4)
+        for bbox_id, width in [(1, None), ('1', 3), (1.5, 3)]:
+            with self.assertRaisesRegex(ValueError, 'needs integer ids and numeric top, left, width and height'):
+                self.store.add_bbox(0, bbox_id, 1, 2, width, 4)
+        with self.assertRaisesRegex(ValueError, 'has to be a number'):
+            self.store.add_label(row, 'car', '0.5')
+        self.assertEqual(len(self.store.frames[0]), 1)
+        columns = (self.store.frame_ids, self.store.bbox_ids, self.store.top, self.store.left, self.store.width,
+                   self.store.height, self.store.int_coords, self.store.label_counts)
+        self.assertEqual({len(column) for column in columns}, {1})
+
+        row = self.store.add_bbox(0, 1, 1, 2, 3, 4)
+        self.store.add_label(row, 'car', 0.5)
+        self.assertEqual(self.store.frame_dict(0)['bboxes'][1]['labels'], [{'category': 'car', 'confidence': 0.5}])
+
+    def test_labels_grow_past_stride(self):
+        first = self.store.add_bbox(0, 0, 1, 2, 3, 4)
+        second = self.store.add_bbox(0, 1, 1, 2, 3, 4)
+        self.store.add_label(second, 'car', 0.9)
+        for category, confidence in [('car', 0.9), ('truck', 0.5), ('bus', 0.1)]:
+            self.store.add_label(first, category, confidence)
+        self.assertGreaterEqual(self.store.label_stride, 3)
+        self.assertEqual(self.store.labels(first), [('car', 0.9), ('truck', 0.5), ('bus', 0.1)])
+        self.assertEqual(self.store.labels(second), [('car', 0.9)])
+        self.assertEqual(self.store.categories, ['car', 'truck', 'bus'])
+
+    def test_clear(self):
+        self.store.add_bbox(0, 0, 1, 2, 3, 4)
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+        self.assertFalse(self.store.frame_exists(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
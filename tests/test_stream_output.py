@@ -0,0 +1,62 @@
+import json
+import unittest
+import sys
+from os import listdir
+from tempfile import mkdtemp
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.json_parser import *
+
+
+class TestStreamOutput(TestCase):
+
+    def setUp(self) -> None:
+        self.json_parser = JsonParser(top_k_labels=1)
+        self.json_parser.add_video_details(500, 200, 20, 'something.mp4')
+        self.out_path = mkdtemp()
+
+    def log_frames(self, json_parser, frames):
+        for frame_id in frames:
+            json_parser.add_frame(frame_id)
+            for bbox_id in range(3):
+                json_parser.add_bbox_to_frame(frame_id, bbox_id, 10, 20, 30, 40)
+                json_parser.add_label_to_bbox(frame_id, bbox_id, 'car', 0.5)
+
+    @staticmethod
+    def read_lines(file_name):
+        with open(file_name) as file:
+            return [json.loads(line) for line in file]
+
+    def test_frames_are_streamed(self):
+        self.json_parser.set_stream_output(self.out_path, seconds=None)
+        self.log_frames(self.json_parser, range(5))
+        # only the frame being logged is kept in memory
+        self.assertEqual(list(self.json_parser.store.frames), [4])
+        self.json_parser.close()
+
+        expected = JsonParser(top_k_labels=1)
+        expected.add_video_details(500, 200, 20, 'something.mp4')
+        self.log_frames(expected, range(5))
+        expected = expected.output()
+
+        self.assertEqual(len(listdir(self.out_path)), 1)
+        lines = self.read_lines(join(self.out_path, listdir(self.out_path)[0]))
+        self.assertEqual(lines[0], {'video_details': expected['video_details']})
+        self.assertEqual(lines[1:], expected['frames'])
+
+    def test_rotation_by_size(self):
+        self.json_parser.set_stream_output(self.out_path, seconds=None, max_bytes=1)
+        sink = self.json_parser.sink
+        self.log_frames(self.json_parser, range(3))
+        self.json_parser.close()
+        # every file has the header and one frame
+        self.assertEqual(len(sink.files), 3)
+        for frame_id, file_name in enumerate(sink.files):
+            lines = self.read_lines(file_name)
+            self.assertIn('video_details', lines[0])
+            self.assertEqual([line['frame_id'] for line in lines[1:]], [frame_id])
+
+
+if __name__ == '__main__':
+    unittest.main()
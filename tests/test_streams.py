@@ -0,0 +1,124 @@
+import json
+import unittest
+import sys
+from os import listdir
+from os.path import join
+from tempfile import mkdtemp
+from threading import Thread
+from unittest.case import TestCase
+
+sys.path.append('../..')
+from json_parser.streams import *
+
+
+class TestStreamLogger(TestCase):
+
+    def setUp(self) -> None:
+        self.out_path = mkdtemp()
+        self.logger = StreamLogger(self.out_path, threads=2)
+        self.names = ['camera_{}'.format(i) for i in range(4)]
+        for name in self.names:
+            self.logger.add_stream(name, video_details=dict(frame_width=500, frame_height=200, frame_rate=20,
+                                                            video_name=name + '.mp4'))
+
+    def ingest(self, name, frames):
+        for frame_id in frames:
+            self.logger.log_frame(name, frame_id, [(1, 2, 3, 4), (5, 6, 7, 8)], [0, 1], [0, 1], [0.9, 0.8],
+                                  ['car', 'bus'])
+
+    def test_concurrent_streams(self):
+        threads = [Thread(target=self.ingest, args=(name, range(50))) for name in self.names]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.logger.close()
+
+        for name in self.names:
+            files = listdir(join(self.out_path, name))
+            self.assertEqual(len(files), 1)
+            with open(join(self.out_path, name, files[0])) as file:
+                output = json.load(file)
+            self.assertEqual(output['video_details']['video_name'], name + '.mp4')
+            self.assertEqual([frame['frame_id'] for frame in output['frames']], list(range(50)))
+
+    def test_output_while_logging(self):
+        # every call of schedule_output detaches the windows; they are kept instead of written, since windows
+        # started in the same second would share a file name
+        for stream in self.logger.streams.values():
+            stream.seconds = -1
+        batches, errors = [], []
+        self.logger.writer.submit = lambda output_name, batch: batches.append(batch)
+
+        def ingest(name):
+            try:
+                self.ingest(name, range(500))
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [Thread(target=ingest, args=(name,)) for name in self.names]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            self.logger.schedule_output()
+        for thread in threads:
+            thread.join()
+        self.logger.output_all()
+        self.logger.close()
+        self.assertEqual(errors, [])
+        self.assertGreater(len(batches), 2)
+
+        frames = {name: [] for name in self.names}
+        for batch in batches:
+            for output_name, window in batch.windows:
+                frames[window.video_details['video_name'][:-4]] += window.output()['frames']
+        for name in self.names:
+            self.assertEqual(sorted(frame['frame_id'] for frame in frames[name]), list(range(500)))
+            self.assertTrue(all(len(frame['bboxes']) == 2 for frame in frames[name]))
+
+    def test_streams_are_separate(self):
+        self.ingest(self.names[0], range(3))
+        self.assertEqual(self.logger.stats()['streams'][self.names[0]]['frames'], 3)
+        self.assertEqual(self.logger.stats()['streams'][self.names[1]]['frames'], 0)
+        # the same frame id can be used in every stream
+        self.ingest(self.names[1], range(3))
+        with self.assertRaisesRegex(ValueError, 'Stream: (.*?) already exists'):
+            self.logger.add_stream(self.names[0])
+        with self.assertRaisesRegex(ValueError, 'Stream: (.*?) does not exist'):
+            self.logger.add_frame('camera_x', 0)
+        # windows of the two streams with frames are written as one batch
+        self.assertEqual(self.logger.output_all(), 2)
+        self.logger.close()
+        self.assertEqual(sorted(listdir(self.out_path)), self.names[:2])
+
+    def test_incomplete_window(self):
+        self.ingest(self.names[0], range(3))
+        self.ingest(self.names[2], range(3))
+        with self.logger.parser(self.names[1]) as json_parser:
+            json_parser.set_top_k(2)
+            json_parser.add_frame(0)
+            json_parser.add_bbox_to_frame(0, 0, 1, 2, 3, 4)
+            json_parser.add_label_to_bbox(0, 0, 'car', 0.9)
+        with self.assertRaisesRegex(ValueError, 'is not fulled before outputting'):
+            self.logger.output_all()
+        self.logger.flush()
+        # the complete windows are written, the incomplete one stays in its stream
+        self.assertEqual(sorted(listdir(self.out_path)), [self.names[0], self.names[2]])
+        self.assertEqual(self.logger.stats()['streams'][self.names[1]]['frames'], 1)
+        self.logger.close(write_remaining=False)
+
+    def test_batch_writes_every_window(self):
+        windows = []
+        for i in range(3):
+            window = JsonParser(top_k_labels=1)
+            window.add_frame(i)
+            windows.append((join(self.out_path, '{}.json'.format(i)), window))
+        windows[1] = (join(self.out_path, 'missing', '1.json'), windows[1][1])
+        with self.assertRaises(FileNotFoundError):
+            WindowBatch(windows).json_output()
+        self.assertEqual(sorted(listdir(self.out_path)), ['0.json', '2.json'])
+        self.logger.close(write_remaining=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
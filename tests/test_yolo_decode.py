@@ -0,0 +1,65 @@
+import unittest
+import sys
+from unittest.case import TestCase
+
+import numpy as np
+
+sys.path.append('../..')
+from json_parser.object_detection.yolo_decode import *
+
+
+class TestYoloDecode(TestCase):
+
+    def setUp(self) -> None:
+        rnd = np.random.default_rng(0)
+        # three YOLO layers of 80 classes
+        self.layer_outputs = [rnd.random((n, 85), dtype=np.float32) ** 4 for n in (507, 2028, 8112)]
+        self.W, self.H, self.conf = 1280, 720, 0.9
+
+    def reference(self):
+        # the per detection loop of the example detector
+        boxes, confidences, class_ids = [], [], []
+        for output in self.layer_outputs:
+            for detection in output:
+                scores = detection[5:]
+                class_id = np.argmax(scores)
+                confidence = scores[class_id]
+                if confidence > self.conf:
+                    box = detection[0:4] * np.array([self.W, self.H, self.W, self.H])
+                    (centerX, centerY, width, height) = box.astype("int")
+                    boxes.append([int(centerX - (width / 2)), int(centerY - (height / 2)), int(width), int(height)])
+                    confidences.append(float(confidence))
+                    class_ids.append(class_id)
+        return boxes, confidences, class_ids
+
+    def test_same_as_loop(self):
+        boxes, confidences, class_ids = self.reference()
+        detections = decode_yolo_outputs(self.layer_outputs, self.W, self.H, self.conf)
+        self.assertGreater(len(boxes), 0)
+        self.assertEqual(detections.boxes.tolist(), boxes)
+        self.assertEqual(detections.confidences.tolist(), confidences)
+        self.assertEqual(detections.class_ids.tolist(), class_ids)
+        self.assertEqual(detections.top_k_class_ids.tolist(), [[class_id] for class_id in class_ids])
+
+    def test_top_k(self):
+        detections = decode_yolo_outputs(self.layer_outputs, self.W, self.H, self.conf, top_k=3)
+        self.assertEqual(detections.top_k_class_ids.shape, (len(detections.boxes), 3))
+        self.assertEqual(detections.top_k_class_ids[:, 0].tolist(), detections.class_ids.tolist())
+        # highest score first, and they are the three best classes
+        self.assertTrue(np.all(np.diff(detections.top_k_confidences, axis=1) <= 0))
+        scores = np.concatenate(self.layer_outputs)[:, 5:]
+        scores = scores[scores.max(axis=1) > self.conf]
+        self.assertTrue(np.allclose(np.sort(scores, axis=1)[:, ::-1][:, :3], detections.top_k_confidences))
+
+    def test_split_batch(self):
+        batch = [np.concatenate([output, output * 0.5]) for output in self.layer_outputs]
+        first, second = split_batch_outputs(batch, 2)
+        for output, first_output, second_output in zip(self.layer_outputs, first, second):
+            self.assertTrue(np.array_equal(first_output, output))
+            self.assertTrue(np.array_equal(second_output, output * 0.5))
+        stacked = split_batch_outputs([np.stack([output, output]) for output in self.layer_outputs], 2)
+        self.assertTrue(np.array_equal(stacked[1][2], self.layer_outputs[2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+import pickle
+import threading
+from collections import deque
+from os import makedirs, remove
+from os.path import join
+from queue import Queue, Full, Empty
+from tempfile import mkdtemp
+from time import perf_counter
+
+
+class WriterMeta(object):
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    SPILL = 'spill'
+    POLICIES = (BLOCK, DROP_OLDEST, SPILL)
+    MAX_QUEUE = 4
+
+
+# queued after a window is spilled so an idle worker wakes up and writes it
+_WAKE = object()
+
+
+def _discard_segments(window):
+    # lets a window remove its spilled segments (see `JsonParser.set_retention`) once it is written or dropped
+    discard_segments = getattr(window, 'discard_segments', None)
+    if discard_segments is not None:
+        discard_segments()
+
+
+class AsyncWriter(object):
+    """
+    Writes finished windows on a background thread so the capture loop never waits for serialization or disk.
+
+    A window is any object with a `json_output(output_name)` method (a JsonParser that owns the detections of
+    the window) and optionally a `discard_segments()` method, called after the window is written or
+    dropped. When the queue is full `policy` decides what happens:
+
+    - block: wait until the writer thread has room.
+    - drop_oldest: discard the oldest queued window.
+    - spill: pickle the window to `spill_path`; spilled windows are written once the queue has drained.
+
+    With `threads` > 1 the queue is shared by a pool of writer threads.
+    """
+
+    def __init__(self, max_queue: int = WriterMeta.MAX_QUEUE, policy: str = WriterMeta.BLOCK, spill_path=None,
+                 threads: int = 1):
+        if policy not in WriterMeta.POLICIES:
+            raise ValueError("policy: {} is not one of {}".format(policy, WriterMeta.POLICIES))
+        self.policy = policy
+        self.spill_path = spill_path
+        self._queue = Queue(maxsize=max_queue)
+        self._spilled = deque()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._closed = False
+        self._error = None
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.write_latencies = deque(maxlen=1000)
+
+        self._threads = [threading.Thread(target=self._run, name='json-parser-writer-{}'.format(i), daemon=True)
+                         for i in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, output_name: str, window):
+        if self._closed:
+            raise ValueError("writer is closed")
+        with self._lock:
+            self._pending += 1
+            self.submitted += 1
+        job = (output_name, window)
+        if self.policy == WriterMeta.BLOCK:
+            self._queue.put(job)
+        elif self.policy == WriterMeta.DROP_OLDEST:
+            while True:
+                try:
+                    self._queue.put_nowait(job)
+                    break
+                except Full:
+                    try:
+                        _, dropped = self._queue.get_nowait()
+                    except Empty:
+                        continue
+                    _discard_segments(dropped)
+                    self._done('dropped')
+        else:
+            try:
+                self._queue.put_nowait(job)
+            except Full:
+                self._spill(job)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def _spill(self, job):
+        if self.spill_path is None:
+            self.spill_path = mkdtemp(prefix='json_parser_spill_')
+        makedirs(self.spill_path, exist_ok=True)
+        with self._lock:
+            path = join(self.spill_path, '{}.pickle'.format(self.spilled))
+            self.spilled += 1
+        with open(path, 'wb') as file:
+            pickle.dump(job, file, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._spilled.append(path)
+        try:
+            # a worker may already wait on the drained queue
+            self._queue.put_nowait(_WAKE)
+        except Full:
+            # the workers are busy and look at the spilled windows once the queue is empty
+            pass
+
+    def _next_job(self):
+        # queued windows come first, spilled windows are picked up when the queue is empty.
+        with self._lock:
+            path = self._spilled.popleft() if self._spilled and self._queue.empty() else None
+        if path is None:
+            return self._queue.get()
+        with open(path, 'rb') as file:
+            job = pickle.load(file)
+        remove(path)
+        return job
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if job is _WAKE:
+                continue
+            output_name, window = job
+            start = perf_counter()
+            outcome = 'written'
+            try:
+                window.json_output(output_name)
+                _discard_segments(window)
+            except Exception as error:
+                outcome = 'errors'
+                self._error = error
+            self.write_latencies.append(perf_counter() - start)
+            self._done(outcome)
+
+    def _done(self, outcome: str):
+        # outcome is the name of the counter to increment: written, dropped or errors.
+        with self._lock:
+            self._pending -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self._idle.notify_all()
+
+    def flush(self):
+        # waits until every submitted window is written (or dropped) and re-raises the last write error.
+        with self._lock:
+            while self._pending:
+                self._idle.wait()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            for thread in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self):
+        latencies = list(self.write_latencies)
+        return dict(queue_depth=self._queue.qsize(),
+                    max_queue_depth=self.max_queue_depth,
+                    spilled_depth=len(self._spilled),
+                    submitted=self.submitted,
+                    written=self.written,
+                    dropped=self.dropped,
+                    spilled=self.spilled,
+                    errors=self.errors,
+                    last_write_latency=latencies[-1] if latencies else None,
+                    mean_write_latency=sum(latencies) / len(latencies) if latencies else None,
+                    max_write_latency=max(latencies) if latencies else None)